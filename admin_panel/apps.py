@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class AdminPanelConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'admin_panel'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        if getattr(settings, 'PRECOMPILE_TEMPLATES', False):
+            from .template_cache import precompile_templates
+            precompile_templates()
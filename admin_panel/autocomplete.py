@@ -0,0 +1,92 @@
+import string
+
+from django.contrib.auth.decorators import login_required
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.db.models.lookups import GreaterThanOrEqual, LessThan
+from django.http import Http404, JsonResponse
+
+from courses.models import Course
+from instructors.models import Instructor
+from students.models import Enrollment, Student
+
+AUTOCOMPLETE_LIMIT = 20
+MAX_TERMS = 4
+# SQLite's lower() only folds ASCII, so the search terms are folded the same way
+ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def _students(request, instructor):
+    students = Student.objects.all()
+    course_id = request.GET.get('course', '')
+    if course_id.isdigit():
+        students = students.filter(
+            pk__in=Enrollment.objects.filter(course_id=course_id).exclude(
+                completion_status='dropped'
+            ).values('student_id')
+        )
+    if instructor:
+        # Trainers only see students of the courses they teach
+        students = students.filter(
+            pk__in=Enrollment.objects.filter(course__instructor=instructor).values('student_id')
+        )
+    return students
+
+
+def _courses(request, instructor):
+    courses = Course.objects.all()
+    if instructor:
+        courses = courses.filter(instructor=instructor)
+    return courses
+
+
+def _instructors(request, instructor):
+    if instructor:
+        return Instructor.objects.filter(pk=instructor.pk)
+    return Instructor.objects.all()
+
+
+# Source name -> (queryset builder, prefix-searched columns, ordering)
+SOURCES = {
+    'students': (_students, ('student_id', 'first_name', 'last_name', 'email'), ('last_name', 'first_name')),
+    'courses': (_courses, ('code', 'title'), ('title',)),
+    'instructors': (_instructors, ('instructor_id', 'first_name', 'last_name', 'email'), ('last_name', 'first_name')),
+}
+
+
+def prefix_filter(queryset, query, fields):
+    """Every word of the query must start one of the fields (e.g. "ada lov").
+
+    A prefix is matched as a range on Lower(field) so the expression
+    indexes on the searched columns are used; istartswith becomes LIKE,
+    which SQLite can only answer with a full table scan.
+    """
+    for term in query.translate(ASCII_LOWER).split()[:MAX_TERMS]:
+        # Everything starting with the term sorts before the term with its last character bumped
+        upper = term[:-1] + chr(ord(term[-1]) + 1)
+        condition = Q()
+        for field in fields:
+            condition |= Q(GreaterThanOrEqual(Lower(field), term), LessThan(Lower(field), upper))
+        queryset = queryset.filter(condition)
+    return queryset
+
+
+@login_required
+def autocomplete(request, source):
+    """JSON search results for the autocomplete widget: {"results": [{"id", "text"}]}"""
+    if source not in SOURCES:
+        raise Http404('Unknown autocomplete source.')
+
+    instructor = None
+    if not request.user.is_staff:
+        instructor = Instructor.objects.filter(user=request.user).first()
+        if instructor is None:
+            return JsonResponse({'error': 'Not allowed.'}, status=403)
+
+    build, fields, ordering = SOURCES[source]
+    query = request.GET.get('q', '').strip()
+    results = build(request, instructor)
+    if query:
+        results = prefix_filter(results, query, fields)
+    results = results.order_by(*ordering)[:AUTOCOMPLETE_LIMIT]
+    return JsonResponse({'results': [{'id': obj.pk, 'text': str(obj)} for obj in results]})
@@ -0,0 +1,105 @@
+import datetime
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from courses.models import Category
+from students.models import Enrollment
+
+CATEGORY_COLORS = ['#4e73df', '#1cc88a', '#36b9cc', '#f6c23e', '#e74a3b', '#8b4513', '#9370db', '#20b2aa']
+
+# Chart payloads are rebuilt at most this often even without an invalidation
+CHART_CACHE_TIMEOUT = 60 * 15
+CHART_CACHE_PREFIX = 'admin_panel:chart:'
+
+
+def enrollment_series():
+    """Enrollment counts for each of the last 12 calendar months"""
+    today = timezone.localdate()
+    year, month = today.year, today.month
+    month_starts = []
+    for _ in range(12):
+        month_starts.append(datetime.date(year, month, 1))
+        month -= 1
+        if month == 0:
+            month = 12
+            year -= 1
+    month_starts.reverse()
+
+    # One grouped query instead of a count per month
+    window_start = timezone.make_aware(
+        datetime.datetime.combine(month_starts[0], datetime.time.min)
+    )
+    rows = Enrollment.objects.filter(
+        enrollment_date__gte=window_start
+    ).annotate(
+        month=TruncMonth('enrollment_date')
+    ).values('month').annotate(count=Count('id'))
+    counts = {row['month'].date(): row['count'] for row in rows}
+
+    return {
+        'labels': [start.strftime('%b') for start in month_starts],
+        'data': [counts.get(start, 0) for start in month_starts],
+    }
+
+
+def category_series():
+    """Number of courses per category, skipping empty categories"""
+    categories = Category.objects.annotate(
+        course_count=Count('courses')
+    ).filter(course_count__gt=0).order_by('id')
+
+    labels = []
+    data = []
+    for category in categories:
+        labels.append(category.name)
+        data.append(category.course_count)
+
+    colors = [CATEGORY_COLORS[i % len(CATEGORY_COLORS)] for i in range(len(labels))]
+    return {
+        'labels': labels,
+        'data': data,
+        'colors': colors,
+    }
+
+
+CHARTS = {
+    'enrollments': enrollment_series,
+    'categories': category_series,
+}
+
+
+def _cache_key(name):
+    # The enrollment window moves with the calendar month
+    return f'{CHART_CACHE_PREFIX}{name}:{timezone.localdate():%Y-%m}'
+
+
+def get_chart(name):
+    """Return {'payload': ..., 'etag': ...} for a chart, or None if unknown.
+
+    Payloads are computed once and served from the cache until one of the
+    models they are built from changes (see admin_panel.signals).
+    """
+    builder = CHARTS.get(name)
+    if builder is None:
+        return None
+
+    key = _cache_key(name)
+    chart = cache.get(key)
+    if chart is None:
+        payload = builder()
+        body = json.dumps(payload, sort_keys=True).encode()
+        chart = {
+            'payload': payload,
+            'etag': hashlib.md5(body).hexdigest(),
+        }
+        cache.set(key, chart, CHART_CACHE_TIMEOUT)
+    return chart
+
+
+def invalidate_charts():
+    cache.delete_many([_cache_key(name) for name in CHARTS])
@@ -1,12 +1,16 @@
 from django import forms
-from courses.models import Course, Category, Material, Video
+from django.db.models import Q
+from courses.models import Course, Category, Material, Video, ChunkedUpload
+from courses.uploads import attach_upload
 from instructors.models import Instructor
+from students.enrollments import parse_student_ids, resolve_student_ids
 from students.models import Student, Enrollment
+from .widgets import AutocompleteSelect
 
 class CourseForm(forms.ModelForm):
     class Meta:
         model = Course
-        fields = ['title', 'code', 'description', 'category', 'instructor', 'thumbnail', 'price', 'is_published']
+        fields = ['title', 'code', 'description', 'category', 'instructor', 'thumbnail', 'price', 'max_seats', 'is_published']
         widgets = {
             'title': forms.TextInput(attrs={'class': 'form-control'}),
             'code': forms.TextInput(attrs={'class': 'form-control'}),
@@ -15,6 +19,7 @@ class CourseForm(forms.ModelForm):
             'instructor': forms.Select(attrs={'class': 'form-control'}),
             'thumbnail': forms.FileInput(attrs={'class': 'form-control'}),
             'price': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
+            'max_seats': forms.NumberInput(attrs={'class': 'form-control', 'min': 1, 'placeholder': 'Unlimited'}),
             'is_published': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
         }
 
@@ -45,6 +50,9 @@ class MaterialForm(forms.ModelForm):
 
 
 class VideoForm(forms.ModelForm):
+    # Set by the chunked uploader instead of posting the file itself
+    upload_id = forms.UUIDField(required=False, widget=forms.HiddenInput())
+
     class Meta:
         model = Video
         fields = ['title', 'description', 'video_file', 'video_url', 'video_type', 'course', 'module', 'duration', 'thumbnail', 'is_active']
@@ -62,6 +70,8 @@ class VideoForm(forms.ModelForm):
         }
 
     def __init__(self, *args, **kwargs):
+        # Only chunked uploads made by this user can be attached
+        self.user = kwargs.pop('user', None)
         super().__init__(*args, **kwargs)
         # Make video_file and video_url not required together
         self.fields['video_file'].required = False
@@ -71,14 +81,35 @@ class VideoForm(forms.ModelForm):
         cleaned_data = super().clean()
         video_file = cleaned_data.get('video_file')
         video_url = cleaned_data.get('video_url')
+        upload_id = cleaned_data.get('upload_id')
+
+        # A finished chunked upload stands in for the file field
+        self.chunked_upload = None
+        if upload_id:
+            self.chunked_upload = ChunkedUpload.objects.filter(
+                id=upload_id,
+                uploaded_by=self.user,
+                status='complete',
+            ).first()
+            if self.chunked_upload is None:
+                raise forms.ValidationError("The uploaded video file could not be found. Please upload it again.")
 
         # Either video_file or video_url must be provided
-        if not video_file and not video_url:
+        if not video_file and not video_url and not self.chunked_upload:
             raise forms.ValidationError("Either upload a video file or provide a video URL.")
 
         # If both are provided, that's also acceptable
         return cleaned_data
 
+    def save(self, commit=True):
+        video = super().save(commit=False)
+        if self.chunked_upload is not None:
+            attach_upload(video, self.chunked_upload)
+        if commit:
+            video.save()
+            self._save_m2m()
+        return video
+
 
 class StudentForm(forms.ModelForm):
     # Add a password field for the user account
@@ -213,6 +244,111 @@ class EnrollmentForm(forms.ModelForm):
         model = Enrollment
         fields = ['student', 'course']
         widgets = {
-            'student': forms.Select(attrs={'class': 'form-control'}),
-            'course': forms.Select(attrs={'class': 'form-control'}),
+            'student': AutocompleteSelect('students'),
+            'course': AutocompleteSelect('courses'),
         }
+
+    def validate_unique(self):
+        # Duplicates are caught by the database constraint when enrolling
+        pass
+
+
+class CohortEnrollmentForm(forms.Form):
+    ACTIONS = [
+        ('enroll', 'Enroll'),
+        ('dropped', 'Drop'),
+        ('completed', 'Mark as completed'),
+    ]
+
+    course = forms.ModelChoiceField(
+        queryset=Course.objects.all(),
+        widget=AutocompleteSelect('courses')
+    )
+    action = forms.ChoiceField(
+        choices=ACTIONS,
+        initial='enroll',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    student_ids = forms.CharField(
+        required=False,
+        widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 4, 'placeholder': 'S001, S002, ...'}),
+        help_text='Student IDs separated by commas, spaces or new lines'
+    )
+    student_file = forms.FileField(
+        required=False,
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.txt'}),
+        help_text='Or upload a CSV/text file of student IDs'
+    )
+    search = forms.CharField(
+        required=False,
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Name, email or student ID'})
+    )
+    from_course = forms.ModelChoiceField(
+        queryset=Course.objects.all(),
+        required=False,
+        widget=AutocompleteSelect('courses'),
+        help_text='Students actively enrolled in this course'
+    )
+    joined_after = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+    joined_before = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+    active_only = forms.BooleanField(
+        required=False,
+        initial=True,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+
+    FILTER_FIELDS = ('search', 'from_course', 'joined_after', 'joined_before')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        codes = parse_student_ids(cleaned_data.get('student_ids') or '')
+        upload = cleaned_data.get('student_file')
+        if upload:
+            try:
+                codes += parse_student_ids(upload.read().decode('utf-8-sig'))
+            except UnicodeDecodeError:
+                self.add_error('student_file', 'The file must be UTF-8 text.')
+        cleaned_data['codes'] = list(dict.fromkeys(codes))
+        if not cleaned_data['codes'] and not any(cleaned_data.get(name) for name in self.FILTER_FIELDS):
+            raise forms.ValidationError('List student IDs or set at least one filter to choose the cohort.')
+        return cleaned_data
+
+    def get_students(self):
+        """Return (student primary keys, unknown IDs) for the chosen cohort.
+
+        Listed IDs take precedence over the filters. A filtered cohort is
+        returned as a values_list() queryset, so the bulk writes can use it
+        as a subquery instead of a long IN list.
+        """
+        data = self.cleaned_data
+        if data['codes']:
+            return resolve_student_ids(data['codes'])
+
+        students = Student.objects.all()
+        if data.get('active_only'):
+            students = students.filter(is_active=True)
+        if data.get('search'):
+            query = data['search']
+            students = students.filter(
+                Q(first_name__icontains=query) |
+                Q(last_name__icontains=query) |
+                Q(email__icontains=query) |
+                Q(student_id__icontains=query)
+            )
+        if data.get('from_course'):
+            students = students.filter(
+                pk__in=Enrollment.objects.filter(course=data['from_course']).exclude(
+                    completion_status='dropped'
+                ).values('student_id')
+            )
+        if data.get('joined_after'):
+            students = students.filter(enrollment_date__gte=data['joined_after'])
+        if data.get('joined_before'):
+            students = students.filter(enrollment_date__lte=data['joined_before'])
+        return students.values_list('pk', flat=True), []
@@ -0,0 +1,100 @@
+import json
+import time
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+from django.test import RequestFactory
+
+from admin_panel.template_cache import iter_template_names
+
+
+class Command(BaseCommand):
+    help = 'Compile and render every project template with a sample context and report the time spent on each'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            help='Number of renders to average per template',
+            default=10
+        )
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Username to attach to the sample request (defaults to an anonymous user)',
+            default=None
+        )
+        parser.add_argument(
+            '--context',
+            type=str,
+            help='Path to a JSON file with extra context variables for every template',
+            default=None
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Only show the N slowest templates',
+            default=None
+        )
+
+    def handle(self, *args, **options):
+        repeat = max(options['repeat'], 1)
+
+        # Build the sample request and context shared by every template
+        request = RequestFactory().get('/')
+        if options['user']:
+            try:
+                request.user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f'User "{options["user"]}" does not exist.')
+        else:
+            request.user = AnonymousUser()
+
+        sample_context = {}
+        if options['context']:
+            with open(options['context']) as fh:
+                sample_context = json.load(fh)
+
+        # Drop anything the cached loader already holds so compile times are real
+        engine = engines['django'].engine
+        for loader in engine.template_loaders:
+            if hasattr(loader, 'reset'):
+                loader.reset()
+
+        results = []
+        for name in iter_template_names():
+            start = time.perf_counter()
+            template = engines['django'].get_template(name)
+            compile_ms = (time.perf_counter() - start) * 1000
+
+            error = None
+            start = time.perf_counter()
+            try:
+                for _ in range(repeat):
+                    template.render(dict(sample_context), request)
+                render_ms = (time.perf_counter() - start) * 1000 / repeat
+            except Exception as exc:
+                render_ms = None
+                error = f'{type(exc).__name__}: {exc}'
+
+            results.append((name, compile_ms, render_ms, error))
+
+        results.sort(key=lambda row: row[2] if row[2] is not None else -1, reverse=True)
+        rendered = [row for row in results if row[3] is None]
+
+        self.stdout.write(f'{"Template":<55} {"Compile ms":>11} {"Render ms":>10}')
+        for name, compile_ms, render_ms, error in results[:options['limit']]:
+            if error:
+                self.stdout.write(
+                    self.style.WARNING(f'{name:<55} {compile_ms:>11.2f} {"-":>10}  {error}')
+                )
+            else:
+                self.stdout.write(f'{name:<55} {compile_ms:>11.2f} {render_ms:>10.2f}')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Profiled {len(results)} templates ({len(rendered)} rendered, '
+                f'{len(results) - len(rendered)} failed with the sample context)'
+            )
+        )
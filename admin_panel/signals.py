@@ -0,0 +1,14 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from courses.models import Category, Course
+from students.models import Enrollment
+from .charts import invalidate_charts
+
+
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Enrollment)
+def refresh_chart_cache(sender, **kwargs):
+    """Drop cached chart payloads whenever the data behind them changes"""
+    invalidate_charts()
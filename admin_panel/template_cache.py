@@ -0,0 +1,27 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.template import engines
+
+
+def iter_template_names():
+    """Yield the name of every template found in the TEMPLATES 'DIRS' folders"""
+    for config in settings.TEMPLATES:
+        for directory in config.get('DIRS', []):
+            directory = Path(directory)
+            for path in sorted(directory.rglob('*.html')):
+                yield path.relative_to(directory).as_posix()
+
+
+def precompile_templates():
+    """Load every project template through the cached loader.
+
+    Any TemplateSyntaxError is left to propagate so that a broken template
+    stops the process at startup. Returns the number of templates compiled.
+    """
+    engine = engines['django']
+    count = 0
+    for name in iter_template_names():
+        engine.get_template(name)
+        count += 1
+    return count
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import autocomplete, views
 
 app_name = 'admin_panel'
 
@@ -33,10 +33,13 @@ urlpatterns = [
     path('videos/delete/<int:video_id>/', views.delete_video, name='delete_video'),
     path('enrollments/', views.enrollment_list, name='enrollment_list'),
     path('enrollments/add/', views.add_enrollment, name='add_enrollment'),
+    path('enrollments/cohort/', views.cohort_enrollment, name='cohort_enrollment'),
     path('enrollments/delete/<int:enrollment_id>/', views.delete_enrollment, name='delete_enrollment'),
     path('analytics/', views.analytics, name='analytics'),
+    path('api/charts/<slug:chart>/', views.chart_data, name='chart_data'),
     path('settings/', views.settings, name='settings'),
     path('contact/', views.contact, name='contact'),
     path('about/', views.about, name='about'),
     path('daily-attendance/', views.daily_attendance, name='daily_attendance'),
+    path('autocomplete/<str:source>/', autocomplete.autocomplete, name='autocomplete'),
 ]
\ No newline at end of file
@@ -3,19 +3,32 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.core.paginator import Paginator
-from django.db.models import Q, Count
+from django.http import Http404, JsonResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.db.models import Q, Count, Sum
 from django.utils import timezone
 from courses.models import Course, Category, Material, Video
+from courses.counters import material_downloads, video_views
 from students.models import Student, Enrollment, AssignmentSubmission, Attendance, TrainerAttendance
+from students.enrollments import EXISTING, FULL, bulk_enroll, bulk_set_status, enroll
 from students.forms import AttendanceForm, BulkAttendanceForm, TrainerAttendanceForm
 from instructors.models import Instructor
-from .forms import CourseForm, StudentForm, InstructorForm, CategoryForm, MaterialForm, VideoForm, EnrollmentForm
+from .forms import CourseForm, StudentForm, InstructorForm, CategoryForm, MaterialForm, VideoForm, EnrollmentForm, CohortEnrollmentForm
+from .charts import get_chart
 
 
 def is_admin(user):
     return user.is_staff
 
 
+def _selected(model, pk):
+    """Return the object a filter dropdown has selected, if any"""
+    if not pk or not str(pk).isdigit():
+        return None
+    return model.objects.filter(pk=pk).first()
+
+
 @login_required
 @user_passes_test(is_admin)
 def dashboard(request):
@@ -31,55 +44,6 @@ def dashboard(request):
     recent_students = Student.objects.order_by('-created_at')[:5]
     recent_enrollments = Enrollment.objects.select_related('student', 'course').order_by('-enrollment_date')[:5]
     
-    # Get category distribution for pie chart
-    categories = Category.objects.prefetch_related('courses').all()
-    category_data = []
-    category_labels = []
-    category_colors = ['#4e73df', '#1cc88a', '#36b9cc', '#f6c23e', '#e74a3b', '#8b4513', '#9370db', '#20b2aa']
-    
-    for i, category in enumerate(categories):
-        course_count = category.courses.count()
-        if course_count > 0:
-            category_labels.append(category.name)
-            category_data.append(course_count)
-    
-    # Ensure we have enough colors
-    while len(category_colors) < len(category_labels):
-        category_colors.extend(['#4e73df', '#1cc88a', '#36b9cc', '#f6c23e', '#e74a3b'])
-    
-    # Create category legend HTML
-    category_legend_html = ''
-    for i, label in enumerate(category_labels):
-        color = category_colors[i] if i < len(category_colors) else '#4e73df'
-        category_legend_html += f'<span class="mr-2"><i class="bi bi-circle-fill" style="color: {color};"></i> {label}</span>'
-    
-    # Get enrollment data for area chart (last 12 months)
-    import datetime
-    from django.db.models import Count
-    
-    # Create a list of the last 12 months
-    today = datetime.date.today()
-    months = []
-    enrollment_data = []
-    
-    for i in range(11, -1, -1):
-        date = today - datetime.timedelta(days=30*i)
-        month_name = date.strftime('%b')
-        months.append(month_name)
-        
-        # Count enrollments for this month
-        start_date = date.replace(day=1)
-        if date.month == 12:
-            end_date = date.replace(year=date.year+1, month=1, day=1)
-        else:
-            end_date = date.replace(month=date.month+1, day=1)
-            
-        count = Enrollment.objects.filter(
-            enrollment_date__gte=start_date,
-            enrollment_date__lt=end_date
-        ).count()
-        enrollment_data.append(count)
-    
     context = {
         'total_courses': total_courses,
         'total_students': total_students,
@@ -89,12 +53,6 @@ def dashboard(request):
         'recent_courses': recent_courses,
         'recent_students': recent_students,
         'recent_enrollments': recent_enrollments,
-        'category_labels': category_labels,
-        'category_data': category_data,
-        'category_colors': category_colors[:len(category_labels)],
-        'category_legend_html': category_legend_html,
-        'months': months,
-        'enrollment_data': enrollment_data,
     }
     return render(request, 'admin_panel/dashboard.html', context)
 
@@ -243,18 +201,25 @@ def video_list(request):
     if course_id:
         videos = videos.filter(course_id=course_id)
     
+    # Sort by most viewed when requested
+    sort = request.GET.get('sort')
+    if sort == 'views':
+        videos = videos.order_by('-view_count', '-created_at')
+    
     paginator = Paginator(videos, 10)  # Show 10 videos per page
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     
-    # Get all courses for filter dropdown
-    courses = Course.objects.all()
+    # Include views this process has counted but not written yet
+    page_obj.object_list = video_views.with_pending(list(page_obj.object_list))
     
+    # The course filter only renders the current choice, the rest are searched
     context = {
         'page_obj': page_obj,
-        'courses': courses,
+        'selected_course': _selected(Course, course_id),
         'search_query': search_query,
         'current_course': course_id,
+        'current_sort': sort,
     }
     return render(request, 'admin_panel/video_list.html', context)
 
@@ -263,7 +228,7 @@ def video_list(request):
 @user_passes_test(is_admin)
 def add_video(request):
     if request.method == 'POST':
-        form = VideoForm(request.POST, request.FILES)
+        form = VideoForm(request.POST, request.FILES, user=request.user)
         if form.is_valid():
             video = form.save(commit=False)
             video.uploaded_by = request.user
@@ -287,7 +252,7 @@ def edit_video(request, video_id):
     video = get_object_or_404(Video, id=video_id)
     
     if request.method == 'POST':
-        form = VideoForm(request.POST, request.FILES, instance=video)
+        form = VideoForm(request.POST, request.FILES, instance=video, user=request.user)
         if form.is_valid():
             form.save()
             messages.success(request, 'Video updated successfully.')
@@ -355,49 +320,6 @@ def analytics(request):
         else:
             course.completion_rate = 0
     
-    # Get category distribution for pie chart
-    categories = Category.objects.prefetch_related('courses').all()
-    category_data = []
-    category_labels = []
-    category_colors = ['#4e73df', '#1cc88a', '#36b9cc', '#f6c23e', '#e74a3b', '#8b4513', '#9370db', '#20b2aa']
-    
-    for i, category in enumerate(categories):
-        course_count = category.courses.count()
-        if course_count > 0:
-            category_labels.append(category.name)
-            category_data.append(course_count)
-    
-    # Ensure we have enough colors
-    while len(category_colors) < len(category_labels):
-        category_colors.extend(['#4e73df', '#1cc88a', '#36b9cc', '#f6c23e', '#e74a3b'])
-    
-    # Get enrollment data for area chart (last 12 months)
-    import datetime
-    from django.db.models import Count
-    
-    # Create a list of the last 12 months
-    today = datetime.date.today()
-    months = []
-    enrollment_data = []
-    
-    for i in range(11, -1, -1):
-        date = today - datetime.timedelta(days=30*i)
-        month_name = date.strftime('%b')
-        months.append(month_name)
-        
-        # Count enrollments for this month
-        start_date = date.replace(day=1)
-        if date.month == 12:
-            end_date = date.replace(year=date.year+1, month=1, day=1)
-        else:
-            end_date = date.replace(month=date.month+1, day=1)
-            
-        count = Enrollment.objects.filter(
-            enrollment_date__gte=start_date,
-            enrollment_date__lt=end_date
-        ).count()
-        enrollment_data.append(count)
-    
     # Calculate completion rate
     completed_enrollments = Enrollment.objects.filter(completion_status='completed').count()
     if total_enrollments > 0:
@@ -408,11 +330,13 @@ def analytics(request):
     # Get pending assignments
     pending_assignments = AssignmentSubmission.objects.filter(is_graded=False).count()
     
-    # Create category legend HTML
-    category_legend_html = ''
-    for i, label in enumerate(category_labels):
-        color = category_colors[i] if i < len(category_colors) else '#4e73df'
-        category_legend_html += f'<span class="mr-2"><i class="bi bi-circle-fill" style="color: {color};"></i> {label}</span>'
+    # Get content engagement, including counts not yet flushed to the database
+    total_video_views = (Video.objects.aggregate(total=Sum('view_count'))['total'] or 0) + video_views.pending_total()
+    total_downloads = (Material.objects.aggregate(total=Sum('download_count'))['total'] or 0) + material_downloads.pending_total()
+    top_videos = video_views.with_pending(list(
+        Video.objects.select_related('course').order_by('-view_count', '-created_at')[:5]
+    ))
+    top_videos.sort(key=lambda video: video.view_count, reverse=True)
     
     context = {
         'total_courses': total_courses,
@@ -426,16 +350,30 @@ def analytics(request):
         'recent_students': recent_students,
         'recent_enrollments': recent_enrollments,
         'top_courses': top_courses,
-        'category_labels': category_labels,
-        'category_data': category_data,
-        'category_colors': category_colors[:len(category_labels)],
-        'category_legend_html': category_legend_html,
-        'months': months,
-        'enrollment_data': enrollment_data,
+        'total_video_views': total_video_views,
+        'total_downloads': total_downloads,
+        'top_videos': top_videos,
     }
     return render(request, 'admin_panel/analytics.html', context)
 
 
+def _chart_etag(request, chart):
+    cached = get_chart(chart)
+    return cached['etag'] if cached else None
+
+
+@login_required
+@user_passes_test(is_admin)
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_chart_etag)
+def chart_data(request, chart):
+    """JSON series for the dashboard and analytics charts"""
+    cached = get_chart(chart)
+    if cached is None:
+        raise Http404('Unknown chart.')
+    return JsonResponse(cached['payload'])
+
+
 @login_required
 @user_passes_test(is_admin)
 def settings(request):
@@ -852,26 +790,23 @@ def enrollment_list(request):
     
     # Filter by course
     course_id = request.GET.get('course')
-    if course_id:
+    if course_id and course_id.isdigit():
         enrollments = enrollments.filter(course_id=course_id)
     
     # Filter by student
     student_id = request.GET.get('student')
-    if student_id:
+    if student_id and student_id.isdigit():
         enrollments = enrollments.filter(student_id=student_id)
     
     paginator = Paginator(enrollments, 10)  # Show 10 enrollments per page
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     
-    # Get all courses and students for filter dropdowns
-    courses = Course.objects.all()
-    students = Student.objects.all()
-    
+    # Filter dropdowns only render the current choices, the rest are searched
     context = {
         'page_obj': page_obj,
-        'courses': courses,
-        'students': students,
+        'selected_course': _selected(Course, course_id),
+        'selected_student': _selected(Student, student_id),
         'search_query': search_query,
         'current_course': course_id,
         'current_student': student_id,
@@ -885,17 +820,16 @@ def add_enrollment(request):
     if request.method == 'POST':
         form = EnrollmentForm(request.POST)
         if form.is_valid():
-            # Check if enrollment already exists
+            # Insert first and let the unique constraint catch duplicates
             student = form.cleaned_data['student']
             course = form.cleaned_data['course']
+            enrollment, outcome = enroll(student, course)
             
-            if Enrollment.objects.filter(student=student, course=course).exists():
+            if outcome == EXISTING:
                 messages.error(request, 'This student is already enrolled in this course.')
+            elif outcome == FULL:
+                messages.error(request, f'{course.title} has no seats left.')
             else:
-                enrollment = form.save(commit=False)
-                enrollment.completion_status = 'enrolled'
-                enrollment.progress = 0
-                enrollment.save()
                 messages.success(request, 'Enrollment added successfully.')
                 return redirect('admin_panel:enrollment_list')
     else:
@@ -909,6 +843,53 @@ def add_enrollment(request):
     return render(request, 'admin_panel/enrollment_form.html', context)
 
 
+@login_required
+@user_passes_test(is_admin)
+def cohort_enrollment(request):
+    summary = None
+    if request.method == 'POST':
+        form = CohortEnrollmentForm(request.POST, request.FILES)
+        if form.is_valid():
+            course = form.cleaned_data['course']
+            action = form.cleaned_data['action']
+            student_ids, unknown = form.get_students()
+            
+            # One set-based write for the whole cohort
+            if action == 'enroll':
+                inserted, reactivated, skipped = bulk_enroll(course, student_ids)
+                messages.success(
+                    request,
+                    f'Enrolled {inserted} students in {course.title} and re-enrolled {reactivated} who had dropped; '
+                    f'{skipped} were already enrolled.'
+                )
+                inserted += reactivated
+            else:
+                inserted = bulk_set_status(course, student_ids, action)
+                skipped = len(student_ids) - inserted
+                messages.success(
+                    request,
+                    f'Updated {inserted} enrollments in {course.title}; {skipped} were unchanged or not enrolled.'
+                )
+            if unknown:
+                messages.warning(request, f'{len(unknown)} student IDs were not found.')
+            summary = {
+                'course': course,
+                'action': dict(form.fields['action'].choices)[action],
+                'selected': len(student_ids),
+                'changed': inserted,
+                'skipped': skipped,
+                'unknown': unknown,
+            }
+    else:
+        form = CohortEnrollmentForm()
+    
+    context = {
+        'form': form,
+        'summary': summary,
+    }
+    return render(request, 'admin_panel/cohort_enrollment.html', context)
+
+
 @login_required
 @user_passes_test(is_admin)
 def delete_enrollment(request, enrollment_id):
@@ -0,0 +1,43 @@
+from django import forms
+from django.urls import reverse
+
+
+class AutocompleteSelect(forms.Select):
+    """Select that renders only its selected option.
+
+    The other choices are fetched from the autocomplete endpoint as the user
+    types (see static/js/autocomplete.js), so large tables are never
+    rendered into the page. `params` are sent along with each search, e.g.
+    {'course': 3} to limit students to one course.
+    """
+
+    def __init__(self, source, attrs=None, params=None):
+        super().__init__({'class': 'form-control', **(attrs or {})})
+        self.source = source
+        self.params = params or {}
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        widget_attrs = context['widget']['attrs']
+        widget_attrs['data-autocomplete-url'] = reverse('admin_panel:autocomplete', args=[self.source])
+        for key, param in self.params.items():
+            widget_attrs[f'data-autocomplete-{key}'] = param
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        selected = [v for v in value if v not in ('', None)]
+        options = []
+        field = getattr(self.choices, 'field', None)
+        if field is None:
+            return super().optgroups(name, value, attrs)
+        if field.empty_label is not None:
+            options.append(self.create_option(name, '', field.empty_label, not selected, 0, attrs=attrs))
+        if selected:
+            try:
+                objects = list(self.choices.queryset.filter(pk__in=selected))
+            except (TypeError, ValueError):
+                objects = []
+            for index, obj in enumerate(objects, start=len(options)):
+                label = field.label_from_instance(obj)
+                options.append(self.create_option(name, obj.pk, label, True, index, attrs=attrs))
+        return [(None, options, 0)]
@@ -0,0 +1,110 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Category, Course, Lesson, Module
+
+# How long a cached catalog page may live without being invalidated
+CATALOG_CACHE_TIMEOUT = 60 * 10
+CATALOG_STATE_KEY = 'courses:catalog:state'
+COURSES_PER_PAGE = 6
+
+
+def _new_version():
+    # Millisecond timestamps never repeat after the state key is evicted
+    return int(time.time() * 1000)
+
+
+def get_catalog_state():
+    """Return {'version': int, 'last_modified': datetime} for the public catalog.
+
+    Every cached catalog entry embeds the version in its key, so bumping the
+    version invalidates all of them at once.
+    """
+    state = cache.get(CATALOG_STATE_KEY)
+    if state is None:
+        timestamps = [
+            model.objects.aggregate(latest=Max('updated_at'))['latest']
+            for model in (Category, Course, Module, Lesson)
+        ]
+        timestamps = [ts for ts in timestamps if ts is not None]
+        state = {
+            'version': _new_version(),
+            'last_modified': max(timestamps) if timestamps else timezone.now(),
+        }
+        cache.set(CATALOG_STATE_KEY, state, None)
+    return state
+
+
+def invalidate_catalog():
+    cache.set(CATALOG_STATE_KEY, {
+        'version': _new_version(),
+        'last_modified': timezone.now(),
+    }, None)
+
+
+def catalog_etag(*parts):
+    """Build an ETag from the catalog version and any request-specific parts"""
+    raw = ':'.join(str(part) for part in (get_catalog_state()['version'],) + parts)
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def _key(*parts):
+    version = get_catalog_state()['version']
+    raw = ':'.join(str(part) for part in parts)
+    return f'courses:catalog:{version}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def get_categories():
+    key = _key('categories')
+    categories = cache.get(key)
+    if categories is None:
+        categories = list(Category.objects.all())
+        cache.set(key, categories, CATALOG_CACHE_TIMEOUT)
+    return categories
+
+
+def get_course_page(category_id=None, search_query=None, page_number=None):
+    """Return a Page of published courses for the given filters.
+
+    The courses on the page and the total count are cached per
+    (category, search, page) so repeat requests do not touch the database.
+    """
+    key = _key('list', category_id or '', search_query or '', page_number or '')
+    entry = cache.get(key)
+    if entry is None:
+        courses = Course.objects.filter(is_published=True).select_related('category', 'instructor')
+        if category_id:
+            courses = courses.filter(category_id=category_id)
+        if search_query:
+            courses = courses.filter(title__icontains=search_query)
+
+        page_obj = Paginator(courses.order_by('id'), COURSES_PER_PAGE).get_page(page_number)
+        entry = {
+            'courses': list(page_obj.object_list),
+            'number': page_obj.number,
+            'count': page_obj.paginator.count,
+        }
+        cache.set(key, entry, CATALOG_CACHE_TIMEOUT)
+
+    paginator = Paginator([], COURSES_PER_PAGE)
+    paginator.count = entry['count']
+    return Page(entry['courses'], entry['number'], paginator)
+
+
+def get_published_course(course_id):
+    """Return a published course with its category and instructor, or None"""
+    key = _key('detail', course_id)
+    course = cache.get(key)
+    if course is None:
+        course = Course.objects.filter(
+            id=course_id, is_published=True
+        ).select_related('category', 'instructor').first()
+        if course is None:
+            return None
+        cache.set(key, course, CATALOG_CACHE_TIMEOUT)
+    return course
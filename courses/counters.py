@@ -0,0 +1,158 @@
+import atexit
+import threading
+import time
+from collections import defaultdict
+
+from django.db import close_old_connections
+from django.db.models import F
+
+from .models import Material, Video
+
+# Buffered counts are written at least this often (seconds) ...
+COUNTER_FLUSH_INTERVAL = 30
+# ... or as soon as this many increments are waiting
+COUNTER_FLUSH_THRESHOLD = 500
+# Repeat views of the same video within one session count once per window (seconds)
+VIEW_DEDUP_WINDOW = 30 * 60
+
+_registry = []
+_flusher = None
+_flusher_lock = threading.Lock()
+
+
+class BufferedCounter:
+    """Per-process buffer of increments for an integer model field.
+
+    Hot rows would serialize on row locks if every hit ran its own UPDATE.
+    Instead increments are summed in memory and written in batches as
+    `UPDATE ... SET field = field + n`, one statement per distinct n.
+    """
+
+    def __init__(self, model, field, flush_interval=COUNTER_FLUSH_INTERVAL, flush_threshold=COUNTER_FLUSH_THRESHOLD):
+        self.model = model
+        self.field = field
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._lock = threading.Lock()
+        self._pending = defaultdict(int)
+        self._pending_total = 0
+        self._last_flush = time.monotonic()
+        _registry.append(self)
+
+    def increment(self, pk, amount=1):
+        _start_flusher()
+        with self._lock:
+            self._pending[pk] += amount
+            self._pending_total += amount
+            due = (
+                self._pending_total >= self.flush_threshold
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if due:
+            self.flush()
+
+    def pending(self, pk):
+        """Increments for this row that have not been written yet"""
+        with self._lock:
+            return self._pending.get(pk, 0)
+
+    def with_pending(self, objects):
+        """Add not-yet-written increments to the counter field of loaded objects"""
+        with self._lock:
+            pending = dict(self._pending)
+        for obj in objects:
+            setattr(obj, self.field, getattr(obj, self.field) + pending.get(obj.pk, 0))
+        return objects
+
+    def pending_total(self):
+        with self._lock:
+            return self._pending_total
+
+    def flush(self):
+        """Write all buffered increments and return the number of rows touched"""
+        with self._lock:
+            pending = self._pending
+            self._pending = defaultdict(int)
+            self._pending_total = 0
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+
+        by_amount = defaultdict(list)
+        for pk, amount in pending.items():
+            by_amount[amount].append(pk)
+        try:
+            for amount, pks in by_amount.items():
+                self.model.objects.filter(pk__in=pks).update(**{self.field: F(self.field) + amount})
+                for pk in pks:
+                    del pending[pk]
+        except Exception:
+            # Put back whatever was not written so it goes out with the next flush
+            with self._lock:
+                for pk, amount in pending.items():
+                    self._pending[pk] += amount
+                    self._pending_total += amount
+            raise
+        return sum(len(pks) for pks in by_amount.values())
+
+
+material_downloads = BufferedCounter(Material, 'download_count')
+video_views = BufferedCounter(Video, 'view_count')
+
+
+def flush_all_counters():
+    return sum(counter.flush() for counter in _registry)
+
+
+def _flush_periodically():
+    while True:
+        time.sleep(COUNTER_FLUSH_INTERVAL)
+        try:
+            close_old_connections()
+            flush_all_counters()
+        except Exception:
+            # Counts stay buffered and are retried on the next tick
+            pass
+        finally:
+            close_old_connections()
+
+
+def _start_flusher():
+    """Start the background flush thread the first time anything is counted"""
+    global _flusher
+    if _flusher is not None:
+        return
+    with _flusher_lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_periodically, name='counter-flusher', daemon=True)
+            _flusher.start()
+
+
+def count_once_per_session(request, counter, pk, window=VIEW_DEDUP_WINDOW):
+    """Increment the counter unless this session already counted the row within the window.
+
+    Returns True when the hit was counted.
+    """
+    session_key = f'counted_{counter.model._meta.model_name}_{counter.field}'
+    now = time.time()
+    stored = request.session.get(session_key, {})
+    seen = {key: counted_at for key, counted_at in stored.items() if now - counted_at < window}
+    key = str(pk)
+    counted = key not in seen
+    if counted:
+        counter.increment(pk)
+        seen[key] = now
+    # Only write the session back when something changed
+    if counted or len(seen) != len(stored):
+        request.session[session_key] = seen
+    return counted
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        close_old_connections()
+        flush_all_counters()
+    except Exception:
+        # The database may already be gone during interpreter shutdown
+        pass
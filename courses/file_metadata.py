@@ -0,0 +1,161 @@
+import datetime
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import struct
+import subprocess
+
+CHUNK_SIZE = 1024 * 1024
+
+# Models that carry file metadata, mapped to the file field it describes
+FILE_FIELDS = {
+    'courses.material': 'file',
+    'courses.video': 'video_file',
+}
+
+
+def format_file_size(size):
+    """Format a size in bytes the way the list pages display it"""
+    if size is None:
+        return 'N/A'
+    if size < 1024:
+        return f"{size} bytes"
+    elif size < 1024 * 1024:
+        return f"{size // 1024} KB"
+    else:
+        return f"{size // (1024 * 1024)} MB"
+
+
+def empty_metadata():
+    return {
+        'file_size_bytes': None,
+        'mime_type': '',
+        'checksum': '',
+        'extension': '',
+    }
+
+
+def extract_file_metadata(field_file):
+    """Read size, MIME type, SHA-256 checksum and extension of a stored file.
+
+    The file is streamed in chunks, so this is safe for large videos.
+    """
+    if not field_file:
+        return empty_metadata()
+
+    name = field_file.name
+    storage = field_file.storage
+    # A content-addressed storage already knows the checksum
+    checksum = storage.checksum(name) if hasattr(storage, 'checksum') else None
+    if checksum is None:
+        digest = hashlib.sha256()
+        with storage.open(name, 'rb') as fh:
+            for chunk in iter(lambda: fh.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+        checksum = digest.hexdigest()
+
+    mime_type, _ = mimetypes.guess_type(name)
+    return {
+        'file_size_bytes': storage.size(name),
+        'mime_type': mime_type or 'application/octet-stream',
+        'checksum': checksum,
+        'extension': os.path.splitext(name)[1].lstrip('.').lower()[:20],
+    }
+
+
+def get_metadata_file(instance):
+    """Return the FieldFile whose metadata is stored on this instance"""
+    return getattr(instance, FILE_FIELDS[instance._meta.label_lower])
+
+
+def update_file_metadata(instance):
+    """Extract metadata for the instance's file and store it on the row.
+
+    Uses a queryset update so no save signals fire again.
+    """
+    try:
+        metadata = extract_file_metadata(get_metadata_file(instance))
+    except OSError:
+        # The file is missing from storage; keep whatever we had
+        return None
+
+    type(instance).objects.filter(pk=instance.pk).update(**metadata)
+    for field, value in metadata.items():
+        setattr(instance, field, value)
+    return metadata
+
+
+def _iter_boxes(fh, end):
+    """Yield (type, payload_start, box_end) for the ISO media boxes up to `end`"""
+    position = fh.tell()
+    while position + 8 <= end:
+        fh.seek(position)
+        size, kind = struct.unpack('>I4s', fh.read(8))
+        header = 8
+        if size == 1:
+            size = struct.unpack('>Q', fh.read(8))[0]
+            header = 16
+        elif size == 0:
+            size = end - position
+        if size < header:
+            return
+        yield kind, position + header, position + size
+        position += size
+
+
+def read_mp4_duration(fh, size):
+    """Read the duration from the movie header of an MP4/MOV file, or None"""
+    for kind, start, end in _iter_boxes(fh, size):
+        if kind != b'moov':
+            continue
+        fh.seek(start)
+        for inner_kind, inner_start, _ in _iter_boxes(fh, end):
+            if inner_kind != b'mvhd':
+                continue
+            fh.seek(inner_start)
+            version = fh.read(4)[0]
+            if version == 1:
+                fh.seek(16, os.SEEK_CUR)
+                timescale, duration = struct.unpack('>IQ', fh.read(12))
+            else:
+                fh.seek(8, os.SEEK_CUR)
+                timescale, duration = struct.unpack('>II', fh.read(8))
+            if timescale:
+                return datetime.timedelta(seconds=round(duration / timescale))
+            return None
+    return None
+
+
+def probe_duration(field_file):
+    """Return the running time of a stored video, or None if it cannot be read.
+
+    MP4/MOV headers are parsed directly; other formats use ffprobe when it
+    is installed.
+    """
+    name = field_file.name
+    extension = os.path.splitext(name)[1].lstrip('.').lower()
+    if extension in ('mp4', 'm4v', 'mov'):
+        with field_file.storage.open(name, 'rb') as fh:
+            try:
+                return read_mp4_duration(fh, field_file.storage.size(name))
+            except (struct.error, IndexError):
+                return None
+
+    ffprobe = shutil.which('ffprobe')
+    if ffprobe is None:
+        return None
+    try:
+        path = field_file.storage.path(name)
+    except NotImplementedError:
+        return None
+    result = subprocess.run(
+        [ffprobe, '-v', 'error', '-show_entries', 'format=duration', '-of', 'json', path],
+        capture_output=True, text=True, timeout=60,
+    )
+    try:
+        seconds = float(json.loads(result.stdout)['format']['duration'])
+    except (ValueError, KeyError):
+        return None
+    return datetime.timedelta(seconds=round(seconds))
@@ -0,0 +1,171 @@
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .file_metadata import probe_duration, update_file_metadata
+from .models import MediaJob, Video
+from .thumbnails import delete_renditions, generate_renditions
+
+logger = logging.getLogger(__name__)
+
+# A running job whose worker has not finished within this many seconds is
+# assumed lost and becomes visible to other workers again
+JOB_VISIBILITY_TIMEOUT = 10 * 60
+# Failed jobs are retried after this many seconds, doubling with each attempt
+JOB_RETRY_DELAY = 30
+# Idle workers look for new jobs this often (seconds)
+JOB_POLL_INTERVAL = 2
+
+TASKS = {}
+
+
+def task(name):
+    """Register a function as a queue task under `name`"""
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+def enqueue(task_name, max_attempts=5, **payload):
+    """Queue a task with JSON-serialisable keyword arguments.
+
+    The job row is written in the caller's transaction, so it is only picked
+    up if the upload that queued it commits. With MEDIA_JOBS_EAGER the task
+    runs in-process after commit instead, for development and tests.
+    """
+    if task_name not in TASKS:
+        raise KeyError(f'Unknown task {task_name!r}')
+    if getattr(settings, 'MEDIA_JOBS_EAGER', False):
+        transaction.on_commit(lambda: TASKS[task_name](**payload))
+        return None
+    return MediaJob.objects.create(task=task_name, payload=payload, max_attempts=max_attempts)
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim_job(worker, visibility_timeout=JOB_VISIBILITY_TIMEOUT):
+    """Take the next due job, or one whose visibility timeout expired.
+
+    The claim is a conditional UPDATE keyed on the attempt count, so two
+    workers racing for the same row cannot both win it.
+    """
+    now = timezone.now()
+    candidates = MediaJob.objects.filter(
+        Q(status='queued', run_after__lte=now) | Q(status='running', locked_until__lt=now)
+    ).order_by('run_after', 'id').values_list('id', 'attempts')[:10]
+
+    for job_id, attempts in candidates:
+        claimed = MediaJob.objects.filter(
+            Q(status='queued') | Q(status='running', locked_until__lt=now),
+            id=job_id,
+            attempts=attempts,
+        ).update(
+            status='running',
+            attempts=F('attempts') + 1,
+            locked_by=worker,
+            locked_until=now + timedelta(seconds=visibility_timeout),
+        )
+        if claimed:
+            return MediaJob.objects.get(id=job_id)
+    return None
+
+
+def run_job(job):
+    """Run a claimed job and record the outcome; returns True on success"""
+    # Only the worker holding the current attempt may record its result
+    current = MediaJob.objects.filter(id=job.id, attempts=job.attempts, status='running')
+
+    try:
+        if job.attempts > job.max_attempts:
+            raise RuntimeError('Job exceeded its attempts after its worker was lost')
+        TASKS[job.task](**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning('Job %s (%s) failed on attempt %s', job.id, job.task, job.attempts)
+        if job.attempts >= job.max_attempts:
+            current.update(status='failed', locked_until=None, last_error=error)
+        else:
+            delay = JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            current.update(
+                status='queued',
+                locked_until=None,
+                run_after=timezone.now() + timedelta(seconds=delay),
+                last_error=error,
+            )
+        return False
+
+    current.update(status='done', locked_until=None, last_error='')
+    return True
+
+
+def work(visibility_timeout=JOB_VISIBILITY_TIMEOUT, poll_interval=JOB_POLL_INTERVAL, once=False):
+    """Process jobs until interrupted; with `once`, stop when the queue is empty.
+
+    Returns the number of jobs processed.
+    """
+    worker = worker_name()
+    processed = 0
+    try:
+        while True:
+            close_old_connections()
+            job = claim_job(worker, visibility_timeout)
+            if job is None:
+                if once:
+                    break
+                time.sleep(poll_interval)
+                continue
+            run_job(job)
+            processed += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        close_old_connections()
+    return processed
+
+
+def _get_instance(model, pk):
+    return apps.get_model(model).objects.filter(pk=pk).first()
+
+
+@task('file_metadata')
+def extract_metadata(model, pk):
+    """Store size, MIME type, checksum and extension for a material or video"""
+    instance = _get_instance(model, pk)
+    if instance is not None:
+        update_file_metadata(instance)
+
+
+@task('video_duration')
+def extract_video_duration(pk):
+    """Fill in Video.duration from the uploaded file when it was left blank"""
+    video = Video.objects.filter(pk=pk).first()
+    if video is None or not video.video_file or video.duration:
+        return
+    duration = probe_duration(video.video_file)
+    if duration is not None:
+        Video.objects.filter(pk=pk, duration__isnull=True).update(duration=duration)
+
+
+@task('thumbnails')
+def build_thumbnails(model, pk, field, replaced_name=''):
+    """Render resized copies of an uploaded image and remove those of the image it replaced"""
+    instance = _get_instance(model, pk)
+    if instance is None:
+        return
+    image = getattr(instance, field)
+    if replaced_name and replaced_name != image.name:
+        delete_renditions(image.storage, replaced_name)
+    if image:
+        generate_renditions(image)
@@ -0,0 +1,78 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from courses.file_metadata import extract_file_metadata, get_metadata_file
+from courses.models import Material, Video
+
+
+class Command(BaseCommand):
+    help = 'Fill in file size, MIME type, checksum and extension for existing materials and videos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Number of files to read in parallel',
+            default=4
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Number of rows written per UPDATE batch',
+            default=200
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Recompute metadata even for rows that already have it',
+            default=False
+        )
+
+    def handle(self, *args, **options):
+        for model, field_name in ((Material, 'file'), (Video, 'video_file')):
+            objects = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            if not options['force']:
+                objects = objects.filter(checksum='')
+            objects = objects.only('id', field_name)
+
+            updated, missing = self.backfill(model, objects, options['workers'], options['batch_size'])
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'{model._meta.verbose_name_plural.title()}: updated {updated}, missing files {missing}'
+                )
+            )
+
+    def backfill(self, model, objects, workers, batch_size):
+        fields = ['file_size_bytes', 'mime_type', 'checksum', 'extension']
+        updated = 0
+        missing = 0
+        pending = []
+
+        def read(instance):
+            try:
+                return instance, extract_file_metadata(get_metadata_file(instance))
+            except OSError:
+                return instance, None
+
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            for instance, metadata in executor.map(read, objects.iterator(chunk_size=batch_size)):
+                if metadata is None:
+                    missing += 1
+                    self.stderr.write(f'  Missing file for {model.__name__} {instance.id}: {get_metadata_file(instance).name}')
+                    continue
+
+                for field, value in metadata.items():
+                    setattr(instance, field, value)
+                pending.append(instance)
+
+                if len(pending) >= batch_size:
+                    model.objects.bulk_update(pending, fields)
+                    updated += len(pending)
+                    pending = []
+
+        if pending:
+            model.objects.bulk_update(pending, fields)
+            updated += len(pending)
+
+        return updated, missing
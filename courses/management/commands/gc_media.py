@@ -0,0 +1,122 @@
+import os
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import models
+
+from courses.file_metadata import format_file_size
+from courses.models import ChunkedUpload, ContentBlob
+from courses.storage import BLOB_DIRECTORY
+from courses.thumbnails import IMAGE_FIELDS, THUMBNAIL_FORMATS, get_widths, rendition_name
+
+
+def walk_files(root):
+    """Yield (relative name, size, mtime) for every file below root, one directory at a time"""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    name = os.path.relpath(entry.path, root).replace(os.sep, '/')
+                    yield name, stat.st_size, stat.st_mtime
+
+
+class Command(BaseCommand):
+    help = 'Find and delete media files that no database row refers to'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report orphaned files, do not delete them',
+            default=False
+        )
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            help='Ignore files modified within this many minutes (uploads still being saved)',
+            default=60
+        )
+
+    def referenced_names(self):
+        """Build the set of every stored name a file field points at"""
+        names = set()
+        image_fields = {
+            (label, field) for label, fields in IMAGE_FIELDS.items() for field in fields
+        }
+        for model in apps.get_models():
+            for field in model._meta.get_fields():
+                if not isinstance(field, models.FileField):
+                    continue
+                values = model._default_manager.exclude(**{field.name: ''}).exclude(
+                    **{f'{field.name}__isnull': True}
+                ).values_list(field.name, flat=True)
+                has_renditions = (model._meta.label_lower, field.name) in image_fields
+                for name in values.iterator(chunk_size=2000):
+                    names.add(name)
+                    if has_renditions:
+                        for width in get_widths():
+                            for extension in THUMBNAIL_FORMATS:
+                                names.add(rendition_name(name, width, extension))
+
+        # Chunked uploads that may still be attached to a video
+        names.update(
+            ChunkedUpload.objects.filter(status__in=['uploading', 'complete']).values_list('file_name', flat=True)
+        )
+        return names
+
+    def handle(self, *args, **options):
+        root = str(settings.MEDIA_ROOT)
+        if not os.path.isdir(root):
+            self.stdout.write(self.style.WARNING(f'MEDIA_ROOT {root} does not exist'))
+            return
+
+        dry_run = options['dry_run']
+        cutoff = time.time() - options['min_age'] * 60
+        referenced = self.referenced_names()
+        blob_prefix = BLOB_DIRECTORY + '/'
+
+        orphans = 0
+        orphan_bytes = 0
+        for name, size, mtime in walk_files(root):
+            if name.startswith(blob_prefix) or name in referenced or mtime > cutoff:
+                continue
+            orphans += 1
+            orphan_bytes += size
+            self.stdout.write(f'  {"Would delete" if dry_run else "Deleting"} {name} ({format_file_size(size)})')
+            if not dry_run:
+                # Goes through the storage so content-addressed references are released
+                default_storage.delete(name)
+
+        # Blobs no name refers to any more (e.g. left by an interrupted save)
+        blobs = 0
+        blob_root = os.path.join(root, BLOB_DIRECTORY)
+        if os.path.isdir(blob_root):
+            live_blobs = set(ContentBlob.objects.filter(ref_count__gt=0).values_list('sha256', flat=True))
+            for name, size, mtime in walk_files(blob_root):
+                sha256 = os.path.basename(name)
+                if mtime > cutoff or sha256 in live_blobs:
+                    continue
+                blobs += 1
+                orphan_bytes += size
+                self.stdout.write(f'  {"Would delete" if dry_run else "Deleting"} blob {sha256} ({format_file_size(size)})')
+                if not dry_run:
+                    os.remove(os.path.join(blob_root, name))
+                    ContentBlob.objects.filter(sha256=sha256).delete()
+
+        if not dry_run:
+            ContentBlob.objects.filter(ref_count=0, files__isnull=True).delete()
+
+        action = 'Found' if dry_run else 'Deleted'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{action} {orphans} orphaned files and {blobs} unreferenced blobs ({format_file_size(orphan_bytes)})'
+            )
+        )
@@ -0,0 +1,56 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from courses.thumbnails import IMAGE_FIELDS, generate_renditions, get_renditions
+
+
+class Command(BaseCommand):
+    help = 'Generate resized renditions for course thumbnails, video thumbnails and profile pictures'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Number of images to resize in parallel',
+            default=4
+        )
+        parser.add_argument(
+            '--missing-only',
+            action='store_true',
+            help='Skip images that already have renditions',
+            default=False
+        )
+
+    def handle(self, *args, **options):
+        images = []
+        for label, fields in IMAGE_FIELDS.items():
+            model = apps.get_model(label)
+            for field in fields:
+                objects = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True}).only('id', field)
+                for instance in objects.iterator():
+                    image = getattr(instance, field)
+                    if options['missing_only'] and get_renditions(image):
+                        continue
+                    images.append(image)
+
+        def render(image):
+            try:
+                return image, generate_renditions(image), None
+            except OSError as exc:
+                return image, None, exc
+
+        generated = 0
+        failed = 0
+        with ThreadPoolExecutor(max_workers=max(options['workers'], 1)) as executor:
+            for image, widths, error in executor.map(render, images):
+                if error is not None:
+                    failed += 1
+                    self.stderr.write(f'  Could not process {image.name}: {error}')
+                else:
+                    generated += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Generated renditions for {generated} images, {failed} failed')
+        )
@@ -0,0 +1,79 @@
+import multiprocessing
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+def _worker_main(visibility_timeout, poll_interval, once):
+    # Spawned (not forked) processes start without a configured Django
+    django.setup()
+    from courses.jobs import work
+
+    work(visibility_timeout=visibility_timeout, poll_interval=poll_interval, once=once)
+
+
+class Command(BaseCommand):
+    help = 'Run media processing jobs (file metadata, video duration, thumbnails) from the queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            help='Number of worker processes',
+            default=getattr(settings, 'MEDIA_WORKER_PROCESSES', 2)
+        )
+        parser.add_argument(
+            '--visibility-timeout',
+            type=int,
+            help='Seconds before a job whose worker died is handed to another worker',
+            default=None
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            help='Seconds an idle worker waits before checking for new jobs',
+            default=None
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once the queue is empty instead of waiting for new jobs',
+            default=False
+        )
+
+    def handle(self, *args, **options):
+        from courses.jobs import JOB_POLL_INTERVAL, JOB_VISIBILITY_TIMEOUT, work
+
+        visibility_timeout = options['visibility_timeout'] or JOB_VISIBILITY_TIMEOUT
+        poll_interval = options['poll_interval'] or JOB_POLL_INTERVAL
+        processes = max(options['processes'], 1)
+
+        if processes == 1:
+            processed = work(visibility_timeout=visibility_timeout, poll_interval=poll_interval, once=options['once'])
+            self.stdout.write(self.style.SUCCESS(f'Processed {processed} jobs'))
+            return
+
+        # Children must not share the parent's database connections
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(
+                target=_worker_main,
+                args=(visibility_timeout, poll_interval, options['once']),
+                name=f'media-worker-{index}',
+            )
+            for index in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f'Started {processes} workers')
+
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            # Workers receive the same interrupt and stop after their current job
+            for worker in workers:
+                worker.join()
+        self.stdout.write(self.style.SUCCESS('Workers stopped'))
@@ -1,5 +1,11 @@
+import uuid
+
 from django.db import models
+from django.db.models.functions import Lower
+from django.utils import timezone
 from django.contrib.auth.models import User
+from django.urls import reverse
+from .file_metadata import format_file_size
 
 class Category(models.Model):
     name = models.CharField(max_length=100)
@@ -23,12 +29,31 @@ class Course(models.Model):
     thumbnail = models.ImageField(upload_to='course_thumbnails/', blank=True, null=True)
     price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     is_published = models.BooleanField(default=False)
+    # Optional seat limit; seats_taken counts enrollments that are not dropped
+    max_seats = models.PositiveIntegerField(blank=True, null=True)
+    seats_taken = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        # seats_taken only moves through F() updates; a form save must not overwrite it
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'seats_taken'
+            ]
+        super().save(*args, **kwargs)
+
+    class Meta:
+        indexes = [
+            # Case-insensitive prefix search (admin_panel.autocomplete) compares Lower() ranges
+            models.Index(Lower('code'), name='course_code_lower'),
+            models.Index(Lower('title'), name='course_title_lower'),
+        ]
+
 
 class Module(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='modules')
@@ -82,6 +107,11 @@ class Material(models.Model):
     module = models.ForeignKey(Module, on_delete=models.CASCADE, related_name='materials', null=True, blank=True)
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE)
     download_count = models.PositiveIntegerField(default=0)
+    # File metadata captured once after upload (see courses.file_metadata)
+    file_size_bytes = models.BigIntegerField(blank=True, null=True, editable=False)
+    mime_type = models.CharField(max_length=100, blank=True, editable=False)
+    checksum = models.CharField(max_length=64, blank=True, editable=False)
+    extension = models.CharField(max_length=20, blank=True, editable=False)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -91,21 +121,15 @@ class Material(models.Model):
 
     @property
     def file_extension(self):
+        if self.extension:
+            return self.extension.upper()
         if self.file:
             return self.file.name.split('.')[-1].upper()
         return 'N/A'
 
     @property
     def file_size(self):
-        if self.file:
-            size = self.file.size
-            if size < 1024:
-                return f"{size} bytes"
-            elif size < 1024 * 1024:
-                return f"{size // 1024} KB"
-            else:
-                return f"{size // (1024 * 1024)} MB"
-        return 'N/A'
+        return format_file_size(self.file_size_bytes)
 
 
 class Video(models.Model):
@@ -130,6 +154,11 @@ class Video(models.Model):
     thumbnail = models.ImageField(upload_to='video_thumbnails/', blank=True, null=True)
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE)
     view_count = models.PositiveIntegerField(default=0)
+    # File metadata captured once after upload (see courses.file_metadata)
+    file_size_bytes = models.BigIntegerField(blank=True, null=True, editable=False)
+    mime_type = models.CharField(max_length=100, blank=True, editable=False)
+    checksum = models.CharField(max_length=64, blank=True, editable=False)
+    extension = models.CharField(max_length=20, blank=True, editable=False)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -139,26 +168,96 @@ class Video(models.Model):
 
     @property
     def file_extension(self):
+        if self.extension:
+            return self.extension.upper()
         if self.video_file:
             return self.video_file.name.split('.')[-1].upper()
         return 'N/A'
 
     @property
     def file_size(self):
-        if self.video_file:
-            size = self.video_file.size
-            if size < 1024:
-                return f"{size} bytes"
-            elif size < 1024 * 1024:
-                return f"{size // 1024} KB"
-            else:
-                return f"{size // (1024 * 1024)} MB"
-        return 'N/A'
+        return format_file_size(self.file_size_bytes)
 
     def get_video_source(self):
-        """Return either the uploaded file URL or the external URL"""
+        """Return either the streaming URL for the uploaded file or the external URL"""
         if self.video_file:
-            return self.video_file.url
+            return reverse('students:video_stream', args=[self.id])
         elif self.video_url:
             return self.video_url
         return None
+
+
+class ChunkedUpload(models.Model):
+    """A video file being uploaded in chunks (see courses.uploads)"""
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('complete', 'Complete'),
+        ('attached', 'Attached'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chunked_uploads')
+    filename = models.CharField(max_length=255)
+    file_name = models.CharField(max_length=255)  # Storage name the chunks are written to
+    total_size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    expected_checksum = models.CharField(max_length=64, blank=True)
+    checksum = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='uploading')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.total_size})"
+
+
+class MediaJob(models.Model):
+    """Queued post-upload work, run by the run_workers command (see courses.jobs)"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    task = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(blank=True, null=True)  # Visibility timeout of a running job
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.id} ({self.status})"
+
+
+class ContentBlob(models.Model):
+    """A unique file body in the content-addressed media store (see courses.storage)"""
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256} ({self.ref_count} references)"
+
+
+class StoredFile(models.Model):
+    """A media file name that is a hard link to a ContentBlob"""
+    name = models.CharField(max_length=255, primary_key=True)
+    blob = models.ForeignKey(ContentBlob, on_delete=models.PROTECT, related_name='files')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,82 @@
+import datetime
+
+from django.core.cache import cache
+
+from .models import Lesson, Module
+
+# Outlines are invalidated explicitly, the timeout only bounds memory use
+OUTLINE_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _outline_key(course_id):
+    return f'courses:outline:{course_id}'
+
+
+def build_course_outline(course_id):
+    """Build the ordered module/lesson tree for a course.
+
+    Returns a dict of plain values so it can be cached:
+        modules: [{id, title, description, lessons, published_lessons, duration}]
+            where each lesson is {id, title, duration, is_published}
+        navigation: {lesson_id: {prev: lesson or None, next: lesson or None}}
+        lesson_count, published_lesson_count, total_duration
+    Durations only count published lessons. Previous/next pointers follow the
+    published lessons in module order and run across module boundaries.
+    """
+    modules = []
+    by_id = {}
+    for module in Module.objects.filter(course_id=course_id).order_by('order', 'id'):
+        entry = {
+            'id': module.id,
+            'title': module.title,
+            'description': module.description,
+            'lessons': [],
+            'published_lessons': [],
+            'duration': datetime.timedelta(0),
+        }
+        modules.append(entry)
+        by_id[module.id] = entry
+
+    lessons = Lesson.objects.filter(
+        module__course_id=course_id
+    ).order_by('order', 'id').values('id', 'module_id', 'title', 'duration', 'is_published')
+    lesson_count = 0
+    for lesson in lessons:
+        module = by_id[lesson.pop('module_id')]
+        module['lessons'].append(lesson)
+        lesson_count += 1
+        if lesson['is_published']:
+            module['published_lessons'].append(lesson)
+            if lesson['duration']:
+                module['duration'] += lesson['duration']
+
+    published = [lesson for module in modules for lesson in module['published_lessons']]
+    navigation = {}
+    for index, lesson in enumerate(published):
+        navigation[lesson['id']] = {
+            'prev': published[index - 1] if index > 0 else None,
+            'next': published[index + 1] if index < len(published) - 1 else None,
+        }
+
+    return {
+        'course_id': course_id,
+        'modules': modules,
+        'navigation': navigation,
+        'lesson_count': lesson_count,
+        'published_lesson_count': len(published),
+        'total_duration': sum((module['duration'] for module in modules), datetime.timedelta(0)),
+    }
+
+
+def get_course_outline(course_id):
+    """Return the cached outline for a course, building it on a miss"""
+    key = _outline_key(course_id)
+    outline = cache.get(key)
+    if outline is None:
+        outline = build_course_outline(course_id)
+        cache.set(key, outline, OUTLINE_CACHE_TIMEOUT)
+    return outline
+
+
+def invalidate_course_outline(course_id):
+    cache.delete(_outline_key(course_id))
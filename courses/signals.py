@@ -0,0 +1,89 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .catalog import invalidate_catalog
+from .file_metadata import FILE_FIELDS, empty_metadata, get_metadata_file
+from .jobs import enqueue
+from .models import Category, Course, Lesson, Material, Module, Video
+from .outline import invalidate_course_outline
+from .thumbnails import IMAGE_FIELDS
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=Module)
+@receiver([post_save, post_delete], sender=Lesson)
+@receiver([post_save, post_delete], sender='instructors.Instructor')
+def refresh_catalog_cache(sender, **kwargs):
+    """Invalidate every cached catalog page when catalog content changes"""
+    invalidate_catalog()
+
+
+@receiver([post_save, post_delete], sender=Module)
+def refresh_module_outline(sender, instance, **kwargs):
+    invalidate_course_outline(instance.course_id)
+
+
+@receiver([post_save, post_delete], sender=Lesson)
+def refresh_lesson_outline(sender, instance, **kwargs):
+    course_id = Module.objects.filter(id=instance.module_id).values_list('course_id', flat=True).first()
+    if course_id is not None:
+        invalidate_course_outline(course_id)
+
+
+@receiver(post_init, sender=Material)
+@receiver(post_init, sender=Video)
+def remember_file_name(sender, instance, **kwargs):
+    # Reading a deferred file field would cost a query per instance
+    if FILE_FIELDS[sender._meta.label_lower] not in instance.get_deferred_fields():
+        instance._metadata_file_name = get_metadata_file(instance).name
+
+
+@receiver(post_save, sender=Material)
+@receiver(post_save, sender=Video)
+def extract_file_metadata_on_upload(sender, instance, **kwargs):
+    """Queue size, MIME type, checksum and duration extraction when the file changes"""
+    if not hasattr(instance, '_metadata_file_name'):
+        return
+    name = get_metadata_file(instance).name
+    if name == instance._metadata_file_name:
+        return
+    instance._metadata_file_name = name
+    # Chunked uploads arrive with their metadata already computed
+    if not getattr(instance, '_file_metadata_known', False):
+        # Clear the old file's size and checksum so nothing serves them for the new file
+        metadata = empty_metadata()
+        sender.objects.filter(pk=instance.pk).update(**metadata)
+        for field, value in metadata.items():
+            setattr(instance, field, value)
+        enqueue('file_metadata', model=sender._meta.label_lower, pk=instance.pk)
+    if sender is Video and name:
+        enqueue('video_duration', pk=instance.pk)
+
+
+@receiver(post_init, sender=Course)
+@receiver(post_init, sender=Video)
+@receiver(post_init, sender='students.Student')
+@receiver(post_init, sender='instructors.Instructor')
+def remember_image_names(sender, instance, **kwargs):
+    deferred = instance.get_deferred_fields()
+    instance._thumbnail_image_names = {
+        field: getattr(instance, field).name
+        for field in IMAGE_FIELDS[sender._meta.label_lower]
+        if field not in deferred
+    }
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Video)
+@receiver(post_save, sender='students.Student')
+@receiver(post_save, sender='instructors.Instructor')
+def generate_thumbnails_on_upload(sender, instance, **kwargs):
+    """Queue resized copies of a new or replaced image"""
+    previous = getattr(instance, '_thumbnail_image_names', {})
+    for field, old_name in previous.items():
+        image = getattr(instance, field)
+        if image.name == old_name:
+            continue
+        enqueue('thumbnails', model=sender._meta.label_lower, pk=instance.pk, field=field, replaced_name=old_name or '')
+        previous[field] = image.name
@@ -0,0 +1,116 @@
+import hashlib
+import os
+import shutil
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+# Blobs live inside MEDIA_ROOT so names can be hard links to them
+BLOB_DIRECTORY = '.blobs'
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+@deconstructible(path='courses.storage.ContentAddressedStorage')
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that keeps a single copy of each distinct file body.
+
+    A saved body is stored once under .blobs/ by its SHA-256 and the name the
+    caller asked for becomes a hard link to it, so URLs and paths work as
+    before. ContentBlob.ref_count tracks how many names point at a blob;
+    deleting a name only removes the blob with its last reference.
+    Files saved before this storage was enabled are deleted as plain files.
+    """
+
+    def blob_name(self, sha256):
+        return f'{BLOB_DIRECTORY}/{sha256[:2]}/{sha256[2:4]}/{sha256}'
+
+    def checksum(self, name):
+        """Return the stored SHA-256 of a file, or None if it is not content-addressed"""
+        from .models import StoredFile
+
+        return StoredFile.objects.filter(name=name).values_list('blob_id', flat=True).first()
+
+    def _save(self, name, content):
+        from .models import ContentBlob, StoredFile
+
+        digest = hashlib.sha256()
+        size = 0
+        for chunk in content.chunks(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+        sha256 = digest.hexdigest()
+
+        with transaction.atomic():
+            blob, _ = ContentBlob.objects.select_for_update().get_or_create(sha256=sha256, defaults={'size': size})
+            blob_path = self.path(self.blob_name(sha256))
+            # Known content is not written again, only linked
+            if not os.path.exists(blob_path):
+                super()._save(self.blob_name(sha256), content)
+            name = self._link(blob_path, name)
+            StoredFile.objects.create(name=name, blob=blob)
+            ContentBlob.objects.filter(sha256=sha256).update(ref_count=F('ref_count') + 1)
+        return name
+
+    def _link(self, source, name):
+        while True:
+            full_path = self.path(name)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            try:
+                os.link(source, full_path)
+            except FileExistsError:
+                name = self.get_available_name(name)
+                continue
+            except OSError:
+                # The filesystem cannot hard link: keep working with a plain copy
+                shutil.copyfile(source, full_path)
+            return str(name).replace('\\', '/')
+
+    def adopt(self, name, sha256):
+        """Take over a file that was written in place at `name` (e.g. a chunked upload).
+
+        If the content is already stored the new copy is replaced by a link
+        to the existing blob; otherwise the file becomes the blob.
+        """
+        from .models import ContentBlob, StoredFile
+
+        full_path = self.path(name)
+        with transaction.atomic():
+            if StoredFile.objects.filter(name=name).exists():
+                return
+            blob, _ = ContentBlob.objects.select_for_update().get_or_create(
+                sha256=sha256,
+                defaults={'size': os.path.getsize(full_path)},
+            )
+            blob_path = self.path(self.blob_name(sha256))
+            try:
+                if os.path.exists(blob_path):
+                    temporary = f'{full_path}.link'
+                    os.link(blob_path, temporary)
+                    os.replace(temporary, full_path)
+                else:
+                    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                    os.link(full_path, blob_path)
+            except OSError:
+                # The filesystem cannot hard link: keep the file as written
+                return
+            StoredFile.objects.create(name=name, blob=blob)
+            ContentBlob.objects.filter(sha256=sha256).update(ref_count=F('ref_count') + 1)
+
+    def delete(self, name):
+        from .models import ContentBlob, StoredFile
+
+        if not name:
+            raise ValueError('The name must be given to delete().')
+        with transaction.atomic():
+            stored = StoredFile.objects.select_for_update().filter(name=name).first()
+            super().delete(name)
+            if stored is None:
+                return
+            stored.delete()
+            ContentBlob.objects.filter(sha256=stored.blob_id).update(ref_count=F('ref_count') - 1)
+            blob = ContentBlob.objects.select_for_update().get(sha256=stored.blob_id)
+            if blob.ref_count == 0:
+                super().delete(self.blob_name(blob.sha256))
+                blob.delete()
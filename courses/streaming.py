@@ -0,0 +1,153 @@
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe, quote_etag
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class RangeFileWrapper:
+    """File-like object that reads at most `length` bytes from `offset`"""
+
+    def __init__(self, filelike, offset, length, block_size=STREAM_CHUNK_SIZE):
+        self.filelike = filelike
+        self.remaining = length
+        self.block_size = block_size
+        self.filelike.seek(offset)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = min(self.remaining, self.block_size)
+        data = self.filelike.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.filelike.close()
+
+
+def parse_range_header(header, size):
+    """Return (start, end) for a single 'bytes=' range, or None if unusable.
+
+    Raises ValueError when the range is syntactically valid but cannot be
+    satisfied for a file of this size.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        # Multiple ranges or another unit: fall back to the whole file
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError('Empty suffix range')
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError('Range not satisfiable')
+    return start, min(end, size - 1)
+
+
+def file_etag(instance, field_file):
+    if getattr(instance, 'checksum', ''):
+        return quote_etag(instance.checksum)
+    return quote_etag(f'{field_file.name}-{instance.updated_at.timestamp():.0f}')
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    # Only an exact date validates the range; any other date means the client's copy is of another version
+    parsed = parse_http_date_safe(if_range)
+    return parsed is not None and parsed == int(last_modified.timestamp())
+
+
+def _offload_response(field_file, content_type):
+    mode = getattr(settings, 'MEDIA_SERVE_MODE', 'django')
+    response = HttpResponse(content_type=content_type)
+    # Percent-encode the path so spaces, non-ASCII names and newlines cannot break the header
+    if mode == 'x-sendfile':
+        response['X-Sendfile'] = quote(field_file.path)
+    elif mode == 'x-accel-redirect':
+        prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = quote(prefix.rstrip('/') + '/' + field_file.name)
+    else:
+        return None
+    return response
+
+
+def serve_file(request, instance, field_file, content_type=None, as_attachment=False, filename=None):
+    """Serve a stored file with Range, If-Range and web-server offload support.
+
+    `instance` is the model row owning the file; its stored checksum, size and
+    updated_at are used for validators so no extra storage stat is needed
+    when file metadata has been captured.
+    """
+    content_type = content_type or getattr(instance, 'mime_type', '') or 'application/octet-stream'
+    etag = file_etag(instance, field_file)
+    last_modified = instance.updated_at
+
+    # Revalidation with If-None-Match / If-Modified-Since answers 304
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()),
+    )
+    if response is not None:
+        return response
+
+    response = _offload_response(field_file, content_type)
+    if response is None:
+        size = getattr(instance, 'file_size_bytes', None)
+        if size is None:
+            size = field_file.storage.size(field_file.name)
+
+        byte_range = None
+        range_header = request.META.get('HTTP_RANGE')
+        if range_header and _if_range_matches(request, etag, last_modified):
+            try:
+                byte_range = parse_range_header(range_header, size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{size}'
+                return response
+
+        filelike = field_file.storage.open(field_file.name, 'rb')
+        if byte_range:
+            start, end = byte_range
+            length = end - start + 1
+            response = FileResponse(
+                RangeFileWrapper(filelike, start, length),
+                status=206,
+                content_type=content_type,
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        else:
+            length = size
+            response = FileResponse(filelike, content_type=content_type)
+        response.block_size = STREAM_CHUNK_SIZE
+        response['Content-Length'] = str(length)
+        response['Accept-Ranges'] = 'bytes'
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified.timestamp())
+    if as_attachment or filename:
+        response['Content-Disposition'] = content_disposition_header(
+            as_attachment, filename or field_file.name.rsplit('/', 1)[-1]
+        )
+    return response
@@ -0,0 +1,57 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from courses.thumbnails import THUMBNAIL_FORMATS, get_renditions, rendition_name
+
+register = template.Library()
+
+
+@register.simple_tag
+def thumbnail(image, size, alt='', css_class='', style=''):
+    """Render an <picture> for an image shown `size` CSS pixels wide.
+
+    Offers the WebP and JPEG renditions through srcset so the browser picks
+    the smallest file that is sharp at the device pixel ratio. Falls back
+    to the original while renditions have not been generated yet.
+    """
+    if not image:
+        return ''
+
+    widths = get_renditions(image)
+    if not widths:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" style="{}" loading="lazy">',
+            image.url, alt, css_class, style,
+        )
+
+    storage = image.storage
+    size = int(size)
+    sizes = f'{size}px'
+
+    def srcset(extension):
+        return ', '.join(
+            f'{storage.url(rendition_name(image.name, width, extension))} {width}w'
+            for width in widths
+        )
+
+    # The plain src is the smallest rendition that still covers the display size
+    src_width = next((width for width in widths if width >= size), widths[-1])
+    sources = format_html_join(
+        '',
+        '<source type="{}" srcset="{}" sizes="{}">',
+        (
+            (mime_type, srcset(extension), sizes)
+            for extension, (_, mime_type, _) in THUMBNAIL_FORMATS.items()
+            if extension != 'jpg'
+        ),
+    )
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" style="{}" loading="lazy"></picture>',
+        sources,
+        storage.url(rendition_name(image.name, src_width, 'jpg')),
+        srcset('jpg'),
+        sizes,
+        alt,
+        css_class,
+        style,
+    )
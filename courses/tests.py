@@ -1,3 +1,406 @@
-from django.test import TestCase
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import BytesIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from instructors.models import Instructor
+from students.models import Enrollment, Student
+
+from .jobs import TASKS, claim_job, run_job
+from .models import Category, ChunkedUpload, ContentBlob, Course, Material, MediaJob, StoredFile
+from .storage import ContentAddressedStorage
+from .streaming import RangeFileWrapper, parse_range_header, serve_file
+from .uploads import UploadError, complete_upload, start_upload, write_chunk
+
+
+class TempMediaMixin:
+    """Point MEDIA_ROOT at a temporary directory for the duration of each test"""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class ParseRangeHeaderTest(SimpleTestCase):
+
+    def test_closed_range(self):
+        self.assertEqual(parse_range_header('bytes=0-99', 1000), (0, 99))
+
+    def test_suffix_range(self):
+        self.assertEqual(parse_range_header('bytes=-500', 1000), (500, 999))
+        # A suffix longer than the file means the whole file
+        self.assertEqual(parse_range_header('bytes=-5000', 1000), (0, 999))
+
+    def test_empty_suffix_is_not_satisfiable(self):
+        with self.assertRaises(ValueError):
+            parse_range_header('bytes=-0', 1000)
+
+    def test_open_ended_range(self):
+        self.assertEqual(parse_range_header('bytes=100-', 1000), (100, 999))
+
+    def test_end_past_eof_is_clamped(self):
+        self.assertEqual(parse_range_header('bytes=900-5000', 1000), (900, 999))
+
+    def test_unsatisfiable_ranges(self):
+        for header in ('bytes=1000-', 'bytes=1000-1100', 'bytes=500-100'):
+            with self.assertRaises(ValueError, msg=header):
+                parse_range_header(header, 1000)
+
+    def test_unusable_headers_fall_back_to_the_whole_file(self):
+        for header in ('bytes=0-99,200-299', 'items=0-99', 'bytes=-', 'bytes=abc-def', ''):
+            self.assertIsNone(parse_range_header(header, 1000), header)
+
+
+class RangeFileWrapperTest(SimpleTestCase):
+
+    def test_reads_only_the_requested_slice(self):
+        wrapper = RangeFileWrapper(BytesIO(bytes(range(100))), 10, 25, block_size=10)
+        chunks = []
+        while True:
+            chunk = wrapper.read()
+            if not chunk:
+                break
+            chunks.append(chunk)
+        self.assertEqual([len(chunk) for chunk in chunks], [10, 10, 5])
+        self.assertEqual(b''.join(chunks), bytes(range(10, 35)))
+
+    def test_sized_reads_never_pass_the_end_of_the_slice(self):
+        wrapper = RangeFileWrapper(BytesIO(bytes(range(100))), 90, 5)
+        self.assertEqual(wrapper.read(2), bytes([90, 91]))
+        self.assertEqual(wrapper.read(1000), bytes([92, 93, 94]))
+        self.assertEqual(wrapper.read(10), b'')
+
+    def test_close_closes_the_file(self):
+        filelike = BytesIO(b'data')
+        RangeFileWrapper(filelike, 0, 4).close()
+        self.assertTrue(filelike.closed)
+
+
+class ServeFileRangeTest(SimpleTestCase):
+    CONTENT = bytes(range(256)) * 4
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        storage = FileSystemStorage(location=self.root)
+        name = storage.save('video.bin', BytesIO(self.CONTENT))
+        self.field_file = SimpleNamespace(name=name, storage=storage, path=storage.path(name))
+        self.instance = SimpleNamespace(
+            checksum='abc123',
+            mime_type='video/mp4',
+            file_size_bytes=len(self.CONTENT),
+            updated_at=datetime(2030, 1, 1, tzinfo=dt_timezone.utc),
+        )
+        self.factory = RequestFactory()
+
+    def get(self, **headers):
+        request = self.factory.get('/stream/', **headers)
+        response = serve_file(request, self.instance, self.field_file)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, body
+
+    def test_suffix_range_returns_the_tail(self):
+        response, body = self.get(HTTP_RANGE='bytes=-100')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 924-1023/{len(self.CONTENT)}')
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertEqual(body, self.CONTENT[-100:])
+
+    def test_open_ended_range_runs_to_the_end(self):
+        response, body = self.get(HTTP_RANGE='bytes=1000-')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 1000-1023/1024')
+        self.assertEqual(body, self.CONTENT[1000:])
+
+    def test_range_past_eof_is_416(self):
+        response, body = self.get(HTTP_RANGE='bytes=2000-3000')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */1024')
+
+    def test_multiple_ranges_fall_back_to_the_whole_file(self):
+        response, body = self.get(HTTP_RANGE='bytes=0-9,20-29')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Length'], '1024')
+        self.assertEqual(body, self.CONTENT)
+
+    def test_stale_if_range_serves_the_whole_file(self):
+        response, body = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"other"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.CONTENT)
+
+        response, body = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"abc123"')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.CONTENT[:10])
+
+    def test_if_range_date_must_match_exactly(self):
+        response, body = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='Tue, 01 Jan 2030 00:00:00 GMT')
+        self.assertEqual(response.status_code, 206)
+        # A later date is not the version the client holds
+        response, body = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='Wed, 02 Jan 2030 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.CONTENT)
+
+    def test_offloaded_paths_are_quoted(self):
+        self.field_file.name = 'course videos/leçon 1.mp4'
+        with self.settings(MEDIA_SERVE_MODE='x-accel-redirect', MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/'):
+            response, body = self.get()
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/course%20videos/le%C3%A7on%201.mp4')
+        self.field_file.path = '/srv/media/course videos/leçon 1.mp4'
+        with self.settings(MEDIA_SERVE_MODE='x-sendfile'):
+            response, body = self.get()
+        self.assertEqual(response['X-Sendfile'], '/srv/media/course%20videos/le%C3%A7on%201.mp4')
+
+    def test_matching_etag_is_304(self):
+        response, body = self.get(HTTP_IF_NONE_MATCH='"abc123"')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(body, b'')
+
+
+class ChunkedUploadTest(TempMediaMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.upload = start_upload(User.objects.create_user('uploader'), 'lecture.mp4', 10)
+
+    def test_chunks_are_written_in_order(self):
+        upload = write_chunk(self.upload.id, 0, BytesIO(b'01234'))
+        self.assertEqual(upload.offset, 5)
+        with self.assertRaises(UploadError) as error:
+            write_chunk(self.upload.id, 0, BytesIO(b'01234'))
+        self.assertEqual(error.exception.status, 409)
+
+        upload = write_chunk(self.upload.id, 5, BytesIO(b'56789'))
+        self.assertEqual(complete_upload(upload).status, 'complete')
+
+    def test_a_chunk_that_loses_the_race_is_rejected(self):
+        upload_id = self.upload.id
+
+        class RacingStream(BytesIO):
+            def read(self, size=-1):
+                # Another request for the same offset commits while this one is still writing
+                ChunkedUpload.objects.filter(id=upload_id).update(offset=5)
+                return super().read(size)
+
+        with self.assertRaises(UploadError) as error:
+            write_chunk(upload_id, 0, RacingStream(b'01234'))
+        self.assertEqual(error.exception.status, 409)
+        self.assertEqual(ChunkedUpload.objects.get(id=upload_id).offset, 5)
+
+
+class ContentAddressedStorageTest(TempMediaMixin, TestCase):
+    BODY = b'lecture notes'
+    SHA256 = hashlib.sha256(BODY).hexdigest()
+
+    def setUp(self):
+        super().setUp()
+        self.storage = ContentAddressedStorage()
+
+    def test_identical_saves_share_one_blob(self):
+        first = self.storage.save('notes/a.txt', ContentFile(self.BODY))
+        second = self.storage.save('notes/b.txt', ContentFile(self.BODY))
+
+        blob = ContentBlob.objects.get()
+        self.assertEqual(blob.sha256, self.SHA256)
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(os.stat(self.storage.path(first)).st_ino, os.stat(self.storage.path(second)).st_ino)
+        self.assertEqual(self.storage.checksum(second), self.SHA256)
+
+    def test_blob_is_removed_with_its_last_name(self):
+        first = self.storage.save('notes/a.txt', ContentFile(self.BODY))
+        second = self.storage.save('notes/b.txt', ContentFile(self.BODY))
+        blob_name = self.storage.blob_name(self.SHA256)
+
+        self.storage.delete(first)
+        self.assertFalse(self.storage.exists(first))
+        self.assertTrue(self.storage.exists(blob_name))
+        self.assertEqual(ContentBlob.objects.get().ref_count, 1)
+        with self.storage.open(second) as fh:
+            self.assertEqual(fh.read(), self.BODY)
+
+        self.storage.delete(second)
+        self.assertFalse(self.storage.exists(blob_name))
+        self.assertFalse(ContentBlob.objects.exists())
+        self.assertFalse(StoredFile.objects.exists())
+
+    def test_adopt_links_a_known_checksum_to_the_existing_blob(self):
+        saved = self.storage.save('notes/a.txt', ContentFile(self.BODY))
+        # A chunked upload writes its file in place, outside storage.save()
+        path = self.storage.path('uploads/b.txt')
+        os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as fh:
+            fh.write(self.BODY)
+
+        self.storage.adopt('uploads/b.txt', self.SHA256)
+        self.assertEqual(ContentBlob.objects.get().ref_count, 2)
+        self.assertEqual(os.stat(path).st_ino, os.stat(self.storage.path(saved)).st_ino)
+
+        # Adopting the same name twice does not add a reference
+        self.storage.adopt('uploads/b.txt', self.SHA256)
+        self.assertEqual(ContentBlob.objects.get().ref_count, 2)
+
+
+class MediaJobTest(TestCase):
+
+    def setUp(self):
+        self.calls = []
+        tasks = mock.patch.dict(TASKS, {'record': self.record, 'explode': self.explode})
+        tasks.start()
+        self.addCleanup(tasks.stop)
+
+    def record(self, **payload):
+        self.calls.append(payload)
+
+    def explode(self):
+        raise ValueError('boom')
+
+    def test_successful_job_is_marked_done(self):
+        job = MediaJob.objects.create(task='record', payload={'pk': 7})
+        claimed = claim_job('worker-1')
+        self.assertEqual((claimed.id, claimed.status, claimed.attempts), (job.id, 'running', 1))
+        self.assertIsNone(claim_job('worker-2'))
+
+        self.assertTrue(run_job(claimed))
+        self.assertEqual(self.calls, [{'pk': 7}])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_until), ('done', None))
+
+    def test_failing_job_is_retried_then_marked_failed(self):
+        job = MediaJob.objects.create(task='explode', max_attempts=2)
+        with self.assertLogs('courses.jobs', 'WARNING'):
+            self.assertFalse(run_job(claim_job('worker-1')))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'queued')
+        self.assertIn('boom', job.last_error)
+        # The retry waits for its backoff delay
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIsNone(claim_job('worker-1'))
+
+        MediaJob.objects.filter(id=job.id).update(run_after=timezone.now())
+        with self.assertLogs('courses.jobs', 'WARNING'):
+            self.assertFalse(run_job(claim_job('worker-1')))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertIsNone(claim_job('worker-1'))
+
+    def test_expired_lock_is_reclaimed(self):
+        job = MediaJob.objects.create(task='record')
+        lost = claim_job('worker-1')
+        self.assertIsNone(claim_job('worker-2'))
+
+        MediaJob.objects.filter(id=job.id).update(locked_until=timezone.now() - timedelta(seconds=1))
+        reclaimed = claim_job('worker-2')
+        self.assertEqual((reclaimed.id, reclaimed.locked_by, reclaimed.attempts), (job.id, 'worker-2', 2))
+
+        # The lost worker's attempt can no longer record a result
+        run_job(lost)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'running')
+        self.assertTrue(run_job(reclaimed))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+
+
+class FileMetadataSignalTest(TempMediaMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        user = User.objects.create_user('trainer')
+        instructor = Instructor.objects.create(
+            user=user, instructor_id='I-1', first_name='Tess', last_name='Trainer', email='tess@example.com'
+        )
+        self.course = Course.objects.create(
+            title='Media', code='MED-1', description='', category=Category.objects.create(name='Testing'),
+            instructor=instructor,
+        )
+        self.user = user
+
+    def test_replacing_a_file_clears_its_metadata_and_queues_a_job(self):
+        material = Material.objects.create(
+            title='Notes', course=self.course, uploaded_by=self.user, file=ContentFile(b'old', name='notes.txt')
+        )
+        Material.objects.filter(pk=material.pk).update(file_size_bytes=3, checksum='old', mime_type='text/plain')
+        material.refresh_from_db()
+        MediaJob.objects.all().delete()
+
+        material.file = ContentFile(b'new body', name='notes.txt')
+        material.save()
+        self.assertEqual(
+            Material.objects.filter(pk=material.pk).values('file_size_bytes', 'checksum', 'mime_type').get(),
+            {'file_size_bytes': None, 'checksum': '', 'mime_type': ''},
+        )
+        self.assertEqual(MediaJob.objects.get().task, 'file_metadata')
+
+        # Saving without a new file keeps the metadata
+        Material.objects.filter(pk=material.pk).update(checksum='new')
+        material.refresh_from_db()
+        material.save()
+        self.assertEqual(Material.objects.get(pk=material.pk).checksum, 'new')
+
+
+class CatalogConditionalGetTest(TestCase):
+
+    def setUp(self):
+        # The catalog version lives in the cache, which outlives each test's rollback
+        cache.clear()
+        self.addCleanup(cache.clear)
+        instructor = Instructor.objects.create(
+            instructor_id='I-1', first_name='Tess', last_name='Trainer', email='tess@example.com'
+        )
+        self.course = Course.objects.create(
+            title='Catalog', code='CAT-1', description='', category=Category.objects.create(name='Testing'),
+            instructor=instructor, is_published=True,
+        )
+        self.user = User.objects.create_user('learner')
+        self.student = Student.objects.create(
+            user=self.user, student_id='S-1', first_name='Lee', last_name='Learner', email='lee@example.com'
+        )
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_repeat_requests_are_304(self):
+        for url in (reverse('courses:course_list'), reverse('courses:course_detail', args=[self.course.pk])):
+            etag = self.client.get(url)['ETag']
+            response = self.revalidate(url, etag)
+            self.assertEqual(response.status_code, 304, url)
+            self.assertEqual(response.content, b'')
+
+    def test_editing_a_course_changes_the_etag(self):
+        urls = (reverse('courses:course_list'), reverse('courses:course_detail', args=[self.course.pk]))
+        etags = [self.client.get(url)['ETag'] for url in urls]
+
+        self.course.title = 'Renamed'
+        self.course.save()
+        for url, etag in zip(urls, etags):
+            response = self.revalidate(url, etag)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertNotEqual(response['ETag'], etag)
+            self.assertContains(response, 'Renamed')
+
+    def test_enrolling_changes_the_detail_etag(self):
+        self.client.force_login(self.user)
+        url = reverse('courses:course_detail', args=[self.course.pk])
+        etag = self.client.get(url)['ETag']
+
+        Enrollment.objects.create(student=self.student, course=self.course)
+        response = self.revalidate(url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, 'You are enrolled in this course.')
@@ -0,0 +1,118 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Image fields that get resized renditions, by model label
+IMAGE_FIELDS = {
+    'courses.course': ['thumbnail'],
+    'courses.video': ['thumbnail'],
+    'students.student': ['profile_picture'],
+    'instructors.instructor': ['profile_picture'],
+}
+
+# Each width is rendered in every format; formats are listed in order of preference
+THUMBNAIL_WIDTHS = (40, 80, 160, 320, 640, 1280)
+THUMBNAIL_FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# Known rendition widths are cached per original; regenerating overwrites the entry
+RENDITION_CACHE_TIMEOUT = 60 * 60 * 24
+# Until renditions exist (they are written by a queue worker) look again soon
+MISSING_RENDITION_CACHE_TIMEOUT = 60
+
+
+def get_widths():
+    return tuple(getattr(settings, 'THUMBNAIL_WIDTHS', THUMBNAIL_WIDTHS))
+
+
+def rendition_name(name, width, extension):
+    """Renditions are stored next to the original: photo.jpg -> photo.320w.webp"""
+    root, _ = os.path.splitext(name)
+    return f'{root}.{width}w.{extension}'
+
+
+def _renditions_key(name):
+    return f'thumbnails:{name}'
+
+
+def _flatten(image):
+    """Return an RGB copy of the image with any transparency composited on white"""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def generate_renditions(field_file):
+    """Write every rendition for an image file and return the widths produced.
+
+    Widths larger than the original are skipped so images are never upscaled.
+    Raises OSError if the original is missing or is not a readable image.
+    """
+    storage = field_file.storage
+    name = field_file.name
+    with storage.open(name, 'rb') as fh:
+        try:
+            image = Image.open(fh)
+            image.load()
+        except UnidentifiedImageError as exc:
+            raise OSError(f'{name} is not an image') from exc
+
+    image = ImageOps.exif_transpose(image)
+    keeps_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    original_width, original_height = image.size
+
+    widths = []
+    for width in get_widths():
+        if width > original_width:
+            break
+        height = max(round(original_height * width / original_width), 1)
+        resized = image.resize((width, height), Image.LANCZOS)
+        for extension, (pil_format, _, options) in THUMBNAIL_FORMATS.items():
+            if pil_format == 'WEBP' and keeps_alpha:
+                output = resized.convert('RGBA')
+            else:
+                output = _flatten(resized)
+            buffer = BytesIO()
+            output.save(buffer, pil_format, **options)
+
+            target = rendition_name(name, width, extension)
+            if storage.exists(target):
+                storage.delete(target)
+            storage.save(target, ContentFile(buffer.getvalue()))
+        widths.append(width)
+
+    cache.set(_renditions_key(name), widths, RENDITION_CACHE_TIMEOUT)
+    return widths
+
+
+def delete_renditions(storage, name):
+    for width in get_widths():
+        for extension in THUMBNAIL_FORMATS:
+            target = rendition_name(name, width, extension)
+            if storage.exists(target):
+                storage.delete(target)
+    cache.delete(_renditions_key(name))
+
+
+def get_renditions(field_file):
+    """Return the rendition widths available for an image, smallest first"""
+    key = _renditions_key(field_file.name)
+    widths = cache.get(key)
+    if widths is None:
+        # Not cached yet: look for renditions written by an earlier process
+        storage = field_file.storage
+        widths = [
+            width for width in get_widths()
+            if storage.exists(rendition_name(field_file.name, width, 'jpg'))
+        ]
+        cache.set(key, widths, RENDITION_CACHE_TIMEOUT if widths else MISSING_RENDITION_CACHE_TIMEOUT)
+    return widths
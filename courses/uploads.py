@@ -0,0 +1,170 @@
+import hashlib
+import mimetypes
+import os
+
+from django.conf import settings
+from django.utils import timezone
+
+from .file_metadata import CHUNK_SIZE
+from .models import ChunkedUpload, Video
+
+# Largest chunk accepted in one request; clients may send smaller ones
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+# Request bodies are copied to the file in blocks of this size
+WRITE_BLOCK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """Raised when an upload request cannot be applied; carries the HTTP status"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def get_chunk_size():
+    return getattr(settings, 'CHUNKED_UPLOAD_CHUNK_SIZE', UPLOAD_CHUNK_SIZE)
+
+
+def _video_field():
+    return Video._meta.get_field('video_file')
+
+
+def _local_path(name):
+    try:
+        return _video_field().storage.path(name)
+    except NotImplementedError:
+        raise UploadError('Chunked uploads need storage with local file paths.', status=501)
+
+
+def start_upload(user, filename, total_size, expected_checksum=''):
+    """Reserve the final storage name for a video and return a new ChunkedUpload.
+
+    An empty file is saved under the name the video will keep, so chunks are
+    written in place and nothing is copied when the upload completes.
+    """
+    if total_size < 0:
+        raise UploadError('File size must not be negative.')
+    if expected_checksum and len(expected_checksum) != 64:
+        raise UploadError('Checksum must be a hex SHA-256 digest.')
+
+    # Create the file directly rather than through storage.save(): the chunks
+    # are written into it in place, so it must not share a content-addressed blob
+    field = _video_field()
+    name = field.generate_filename(None, filename)
+    while True:
+        name = field.storage.get_available_name(name)
+        path = _local_path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            with open(path, 'xb'):
+                break
+        except FileExistsError:
+            continue
+    return ChunkedUpload.objects.create(
+        uploaded_by=user,
+        filename=os.path.basename(filename),
+        file_name=name,
+        total_size=total_size,
+        expected_checksum=expected_checksum.lower(),
+    )
+
+
+def write_chunk(upload_id, offset, stream, chunk_checksum=''):
+    """Append the bytes read from `stream` at `offset` and return the updated upload.
+
+    Chunks must arrive in order: a client that lost its place asks for the
+    upload status and resumes from the returned offset. If `chunk_checksum`
+    is given and does not match, the chunk is discarded.
+    """
+    # No transaction or row lock while the body is read: with IMMEDIATE
+    # transactions that would hold the database write lock for the whole chunk
+    upload = ChunkedUpload.objects.get(id=upload_id)
+    if upload.status != 'uploading':
+        raise UploadError(f'Upload is {upload.status}.', status=409)
+    if offset != upload.offset:
+        raise UploadError(f'Expected offset {upload.offset}.', status=409)
+
+    limit = min(get_chunk_size(), upload.total_size - offset)
+    digest = hashlib.sha256()
+    written = 0
+    with open(_local_path(upload.file_name), 'r+b') as fh:
+        fh.seek(offset)
+        while True:
+            block = stream.read(WRITE_BLOCK_SIZE)
+            if not block:
+                break
+            written += len(block)
+            if written > limit:
+                fh.truncate(offset)
+                raise UploadError(f'Chunk exceeds {limit} bytes.', status=413)
+            digest.update(block)
+            fh.write(block)
+
+        if chunk_checksum and digest.hexdigest() != chunk_checksum.lower():
+            fh.truncate(offset)
+            raise UploadError('Chunk checksum mismatch.')
+
+    # Only the request that still finds the upload at `offset` moves it on. A
+    # concurrent request for the same offset has already written its bytes
+    # there, so the loser leaves the file alone and the client asks for the status
+    updated_at = timezone.now()
+    moved = ChunkedUpload.objects.filter(id=upload.id, offset=offset, status='uploading').update(
+        offset=offset + written,
+        updated_at=updated_at,
+    )
+    if not moved:
+        raise UploadError('Upload changed while the chunk was written.', status=409)
+    upload.offset = offset + written
+    upload.updated_at = updated_at
+    return upload
+
+
+def complete_upload(upload):
+    """Verify a fully received upload and mark it ready to attach"""
+    if upload.status != 'uploading':
+        raise UploadError(f'Upload is {upload.status}.', status=409)
+    if upload.offset != upload.total_size:
+        raise UploadError(f'Received {upload.offset} of {upload.total_size} bytes.', status=409)
+
+    digest = hashlib.sha256()
+    with open(_local_path(upload.file_name), 'rb') as fh:
+        for chunk in iter(lambda: fh.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    upload.checksum = digest.hexdigest()
+
+    if upload.expected_checksum and upload.checksum != upload.expected_checksum:
+        upload.status = 'failed'
+        upload.save(update_fields=['checksum', 'status', 'updated_at'])
+        raise UploadError('File checksum mismatch.')
+
+    # Deduplicate against files already in a content-addressed store
+    storage = _video_field().storage
+    if hasattr(storage, 'adopt'):
+        storage.adopt(upload.file_name, upload.checksum)
+
+    upload.status = 'complete'
+    upload.save(update_fields=['checksum', 'status', 'updated_at'])
+    return upload
+
+
+def attach_upload(video, upload):
+    """Point the video at a completed upload's file; the caller saves the video.
+
+    File metadata is filled in from the upload, so no job is queued to read
+    the file again.
+    """
+    if upload.status != 'complete':
+        raise UploadError(f'Upload is {upload.status}.', status=409)
+
+    name = upload.file_name
+    video.video_file.name = name
+    video.file_size_bytes = upload.total_size
+    video.mime_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    video.checksum = upload.checksum
+    video.extension = os.path.splitext(name)[1].lstrip('.').lower()[:20]
+    video._file_metadata_known = True
+
+    upload.status = 'attached'
+    upload.save(update_fields=['status', 'updated_at'])
+    return video
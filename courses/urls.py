@@ -7,4 +7,8 @@ urlpatterns = [
     path('', views.course_list, name='course_list'),
     path('<int:course_id>/', views.course_detail, name='course_detail'),
     path('lesson/<int:lesson_id>/', views.lesson_detail, name='lesson_detail'),
+    path('lesson/<int:lesson_id>/complete/', views.complete_lesson, name='complete_lesson'),
+    path('uploads/', views.start_chunked_upload, name='start_upload'),
+    path('uploads/<uuid:upload_id>/', views.upload_chunk, name='upload_chunk'),
+    path('uploads/<uuid:upload_id>/complete/', views.complete_chunked_upload, name='complete_upload'),
 ]
\ No newline at end of file
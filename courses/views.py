@@ -1,29 +1,79 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
+from django.core.exceptions import PermissionDenied
 from django.core.paginator import Paginator
-from .models import Course, Category, Module, Lesson
-from students.models import Enrollment
+from django.urls import reverse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_http_methods, require_POST
+from .models import Course, Category, Module, Lesson, ChunkedUpload, Video
+from .catalog import catalog_etag, get_catalog_state, get_categories, get_course_page, get_published_course
+from .outline import get_course_outline
+from .uploads import UploadError, attach_upload, complete_upload, get_chunk_size, start_upload, write_chunk
+from students.enrollments import waitlist_position
+from students.models import Enrollment, LessonProgress, Student
+from students.progress import mark_lesson_complete, mark_lesson_incomplete
+from instructors.models import Instructor
 
 
-def course_list(request):
-    courses = Course.objects.filter(is_published=True).select_related('category', 'instructor')
-    categories = Category.objects.all()
-    
-    # Filter by category if provided
+def _catalog_filters(request):
     category_id = request.GET.get('category')
-    if category_id:
-        courses = courses.filter(category_id=category_id)
-    
-    # Search functionality
-    search_query = request.GET.get('search')
-    if search_query:
-        courses = courses.filter(title__icontains=search_query)
+    try:
+        category_id = int(category_id) if category_id else None
+    except ValueError:
+        category_id = None
+    return category_id, request.GET.get('search'), request.GET.get('page')
+
+
+def _course_list_etag(request):
+    return catalog_etag('list', *_catalog_filters(request))
+
+
+def _catalog_last_modified(request, *args, **kwargs):
+    return get_catalog_state()['last_modified']
+
+
+def _is_enrolled(request, course_id):
+    # Memoised on the request so the ETag check and the view share one query
+    if not hasattr(request, '_is_enrolled'):
+        request._is_enrolled = request.user.is_authenticated and Enrollment.objects.filter(
+            student__user=request.user,
+            course_id=course_id
+        ).exists()
+    return request._is_enrolled
+
+
+def _waitlist_position(request, course_id):
+    # Memoised like _is_enrolled; None unless the viewer is waiting for a seat
+    if not hasattr(request, '_waitlist_position'):
+        request._waitlist_position = None
+        if request.user.is_authenticated and not _is_enrolled(request, course_id):
+            student = Student.objects.filter(user=request.user).first()
+            if student is not None:
+                request._waitlist_position = waitlist_position(student, course_id)
+    return request._waitlist_position
+
+
+def _course_detail_etag(request, course_id):
+    # The page shows enroll/login buttons and the waitlist place, so the viewer is part of the tag
+    return catalog_etag(
+        'detail',
+        course_id,
+        request.user.pk,
+        _is_enrolled(request, course_id),
+        _waitlist_position(request, course_id),
+    )
+
+
+@cache_control(public=True, max_age=60)
+@condition(etag_func=_course_list_etag, last_modified_func=_catalog_last_modified)
+def course_list(request):
+    category_id, search_query, page_number = _catalog_filters(request)
     
-    paginator = Paginator(courses, 6)  # Show 6 courses per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Courses, categories and the page are served from the catalog cache
+    page_obj = get_course_page(category_id, search_query, page_number)
+    categories = get_categories()
     
     context = {
         'page_obj': page_obj,
@@ -34,28 +84,33 @@ def course_list(request):
     return render(request, 'courses/course_list.html', context)
 
 
+@cache_control(private=True, max_age=0, must_revalidate=True)
+@condition(etag_func=_course_detail_etag)
 def course_detail(request, course_id):
-    course = get_object_or_404(Course, id=course_id, is_published=True)
-    modules = course.modules.all().prefetch_related('lessons')
+    course = get_published_course(course_id)
+    if course is None:
+        raise Http404('No course matches the given query.')
+    outline = get_course_outline(course.id)
     
     # Check if student is enrolled
-    is_enrolled = False
-    if request.user.is_authenticated:
-        is_enrolled = Enrollment.objects.filter(
-            student__user=request.user, 
-            course=course
-        ).exists()
+    is_enrolled = _is_enrolled(request, course.id)
     
     context = {
         'course': course,
-        'modules': modules,
+        'outline': outline,
+        'modules': outline['modules'],
         'is_enrolled': is_enrolled,
+        'waitlist_position': _waitlist_position(request, course.id),
     }
     return render(request, 'courses/course_detail.html', context)
 
 
 def lesson_detail(request, lesson_id):
-    lesson = get_object_or_404(Lesson, id=lesson_id, is_published=True)
+    lesson = get_object_or_404(
+        Lesson.objects.select_related('module__course'),
+        id=lesson_id,
+        is_published=True
+    )
     course = lesson.module.course
     
     # Check if student is enrolled
@@ -63,33 +118,146 @@ def lesson_detail(request, lesson_id):
         messages.warning(request, 'You need to be logged in to access lessons.')
         return redirect('courses:course_detail', course_id=course.id)
     
-    is_enrolled = Enrollment.objects.filter(
+    enrollment = Enrollment.objects.filter(
         student__user=request.user, 
         course=course
-    ).exists()
+    ).first()
     
-    if not is_enrolled:
+    if enrollment is None:
         messages.warning(request, 'You need to be enrolled in this course to access lessons.')
         return redirect('courses:course_detail', course_id=course.id)
     
-    # Get next and previous lessons
-    module = lesson.module
-    lessons = Lesson.objects.filter(module=module, is_published=True).order_by('order')
-    lesson_ids = list(lessons.values_list('id', flat=True))
-    current_index = lesson_ids.index(lesson.id)
-    
-    prev_lesson = None
-    next_lesson = None
-    
-    if current_index > 0:
-        prev_lesson = lessons[current_index - 1]
-    if current_index < len(lesson_ids) - 1:
-        next_lesson = lessons[current_index + 1]
+    # Navigation and prev/next pointers come from the cached course outline
+    outline = get_course_outline(course.id)
+    navigation = outline['navigation'].get(lesson.id, {})
     
     context = {
         'lesson': lesson,
         'course': course,
-        'prev_lesson': prev_lesson,
-        'next_lesson': next_lesson,
+        'outline': outline,
+        'enrollment': enrollment,
+        'is_completed': LessonProgress.objects.filter(enrollment=enrollment, lesson=lesson).exists(),
+        'prev_lesson': navigation.get('prev'),
+        'next_lesson': navigation.get('next'),
     }
     return render(request, 'courses/lesson_detail.html', context)
+
+
+@login_required
+@require_POST
+def complete_lesson(request, lesson_id):
+    lesson = get_object_or_404(Lesson.objects.select_related('module'), id=lesson_id, is_published=True)
+    enrollment = get_object_or_404(
+        Enrollment.objects.exclude(completion_status='dropped'),
+        student__user=request.user,
+        course_id=lesson.module.course_id
+    )
+    
+    # Toggle the completion; progress and status are updated incrementally
+    if request.POST.get('completed') == '0':
+        mark_lesson_incomplete(enrollment, lesson)
+    elif mark_lesson_complete(enrollment, lesson) and enrollment.completion_status == 'completed':
+        messages.success(request, 'Congratulations, you have completed this course!')
+    
+    next_lesson = get_course_outline(lesson.module.course_id)['navigation'].get(lesson.id, {}).get('next')
+    if next_lesson and request.POST.get('completed') != '0':
+        return redirect('courses:lesson_detail', lesson_id=next_lesson['id'])
+    return redirect('courses:lesson_detail', lesson_id=lesson.id)
+
+
+def _can_upload(user):
+    return user.is_staff or Instructor.objects.filter(user=user).exists()
+
+
+def _upload_status(upload):
+    return {
+        'upload_id': str(upload.id),
+        'filename': upload.filename,
+        'offset': upload.offset,
+        'total_size': upload.total_size,
+        'chunk_size': get_chunk_size(),
+        'status': upload.status,
+        'checksum': upload.checksum,
+        'upload_url': reverse('courses:upload_chunk', args=[upload.id]),
+        'complete_url': reverse('courses:complete_upload', args=[upload.id]),
+    }
+
+
+def _upload_error(error):
+    return JsonResponse({'error': str(error)}, status=error.status)
+
+
+@login_required
+@require_POST
+def start_chunked_upload(request):
+    """Begin a resumable video upload; expects filename, size and an optional sha256"""
+    if not _can_upload(request.user):
+        raise PermissionDenied
+    
+    filename = request.POST.get('filename', '').strip()
+    try:
+        total_size = int(request.POST.get('size', ''))
+    except ValueError:
+        return JsonResponse({'error': 'A numeric size is required.'}, status=400)
+    if not filename:
+        return JsonResponse({'error': 'A filename is required.'}, status=400)
+    
+    try:
+        upload = start_upload(request.user, filename, total_size, request.POST.get('sha256', ''))
+    except UploadError as error:
+        return _upload_error(error)
+    return JsonResponse(_upload_status(upload), status=201)
+
+
+@login_required
+@require_http_methods(['GET', 'PUT'])
+def upload_chunk(request, upload_id):
+    """GET reports the current offset; PUT writes the raw request body at Upload-Offset"""
+    upload = get_object_or_404(ChunkedUpload, id=upload_id, uploaded_by=request.user)
+    if request.method == 'GET':
+        return JsonResponse(_upload_status(upload))
+    
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return JsonResponse({'error': 'Upload-Offset header is required.'}, status=400)
+    
+    # The body is streamed straight into the file, bypassing upload handlers
+    try:
+        upload = write_chunk(upload.id, offset, request, request.headers.get('Upload-Checksum', ''))
+    except UploadError as error:
+        response = _upload_error(error)
+        response['Upload-Offset'] = ChunkedUpload.objects.get(id=upload.id).offset
+        return response
+    
+    response = JsonResponse(_upload_status(upload))
+    response['Upload-Offset'] = upload.offset
+    return response
+
+
+@login_required
+@require_POST
+def complete_chunked_upload(request, upload_id):
+    """Verify the checksum and, if video_id is given, attach the file to that video"""
+    upload = get_object_or_404(ChunkedUpload, id=upload_id, uploaded_by=request.user)
+    
+    video = None
+    video_id = request.POST.get('video_id')
+    if video_id:
+        videos = Video.objects.select_related('course')
+        if not request.user.is_staff:
+            videos = videos.filter(course__instructor__user=request.user)
+        video = get_object_or_404(videos, id=video_id)
+    
+    try:
+        if upload.status == 'uploading':
+            complete_upload(upload)
+        if video is not None:
+            attach_upload(video, upload)
+            video.save()
+    except UploadError as error:
+        return _upload_error(error)
+    
+    data = _upload_status(upload)
+    data['video_id'] = video.id if video is not None else None
+    return JsonResponse(data)
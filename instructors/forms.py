@@ -1,13 +1,32 @@
 from django import forms
+from django.utils import timezone
 from .models import ScheduleEvent
+from .recurrence import MAX_OCCURRENCES, MAX_SERIES_DAYS, Rule, WEEKDAY_CHOICES, parse_exceptions
+from .scheduling import conflict_horizon, find_conflicts, normalize_location
 from courses.models import Course
 from students.models import Assignment
-from datetime import datetime
+from datetime import date, datetime
 
 class ScheduleEventForm(forms.ModelForm):
+    recurrence_weekdays = forms.MultipleChoiceField(
+        choices=WEEKDAY_CHOICES,
+        required=False,
+        widget=forms.CheckboxSelectMultiple,
+        help_text='Weekly events repeat on these days (defaults to the day of the first event)'
+    )
+    recurrence_exceptions = forms.CharField(
+        required=False,
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'YYYY-MM-DD, YYYY-MM-DD'}),
+        help_text='Dates to skip, separated by commas'
+    )
+
     class Meta:
         model = ScheduleEvent
-        fields = ['course', 'title', 'description', 'event_type', 'start_time', 'end_time', 'location']
+        fields = [
+            'course', 'title', 'description', 'event_type', 'start_time', 'end_time', 'location',
+            'recurrence_frequency', 'recurrence_interval', 'recurrence_weekdays', 'recurrence_until',
+            'recurrence_count', 'recurrence_exceptions',
+        ]
         widgets = {
             'course': forms.Select(attrs={'class': 'form-control'}),
             'title': forms.TextInput(attrs={'class': 'form-control'}),
@@ -22,10 +41,28 @@ class ScheduleEventForm(forms.ModelForm):
                 format='%Y-%m-%dT%H:%M'
             ),
             'location': forms.TextInput(attrs={'class': 'form-control'}),
+            'recurrence_frequency': forms.Select(attrs={'class': 'form-control'}),
+            'recurrence_interval': forms.NumberInput(attrs={'class': 'form-control', 'min': 1}),
+            'recurrence_until': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}, format='%Y-%m-%d'),
+            'recurrence_count': forms.NumberInput(attrs={'class': 'form-control', 'min': 1}),
+        }
+        labels = {
+            'recurrence_frequency': 'Repeats',
+            'recurrence_interval': 'Every',
+            'recurrence_weekdays': 'On',
+            'recurrence_until': 'Until',
+            'recurrence_count': 'Occurrences',
+            'recurrence_exceptions': 'Except on',
         }
     
     def __init__(self, instructor=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.instructor = instructor
+        if self.instance.pk:
+            self.initial['recurrence_weekdays'] = [
+                day for day in self.instance.recurrence_weekdays.split(',') if day
+            ]
+            self.initial['recurrence_exceptions'] = ', '.join(self.instance.recurrence_exceptions)
         # Filter courses to only those taught by this instructor
         if instructor:
             self.fields['course'].queryset = Course.objects.filter(instructor=instructor)
@@ -35,6 +72,88 @@ class ScheduleEventForm(forms.ModelForm):
             # For new events, set some default times
             pass
 
+    def clean_recurrence_weekdays(self):
+        return ','.join(sorted(self.cleaned_data['recurrence_weekdays']))
+
+    def clean_recurrence_exceptions(self):
+        try:
+            exceptions = parse_exceptions(self.cleaned_data['recurrence_exceptions'])
+        except ValueError:
+            raise forms.ValidationError('Enter dates as YYYY-MM-DD separated by commas.')
+        return [day.isoformat() for day in exceptions]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_time = cleaned_data.get('start_time')
+        end_time = cleaned_data.get('end_time')
+        if not start_time or not end_time:
+            return cleaned_data
+        if end_time <= start_time:
+            self.add_error('end_time', 'The event must end after it starts.')
+            return cleaned_data
+
+        frequency = cleaned_data.get('recurrence_frequency')
+        until = cleaned_data.get('recurrence_until')
+        if frequency and until and until < timezone.localtime(start_time).date():
+            self.add_error('recurrence_until', 'The series must end after its first event.')
+            return cleaned_data
+        # Keep series short enough to expand; saving walks every occurrence to find the last one
+        if frequency and until and (until - timezone.localtime(start_time).date()).days > MAX_SERIES_DAYS:
+            self.add_error('recurrence_until', f'A series can run for at most {MAX_SERIES_DAYS // 366} years.')
+        count = cleaned_data.get('recurrence_count')
+        if frequency and count and count > MAX_OCCURRENCES:
+            self.add_error('recurrence_count', f'A series can have at most {MAX_OCCURRENCES} occurrences.')
+        if self.errors:
+            return cleaned_data
+
+        if frequency:
+            horizon_start, horizon_end = conflict_horizon()
+            intervals = Rule(
+                start_time,
+                end_time,
+                frequency,
+                interval=cleaned_data.get('recurrence_interval'),
+                weekdays=[int(day) for day in cleaned_data.get('recurrence_weekdays', '').split(',') if day],
+                until=until,
+                count=cleaned_data.get('recurrence_count'),
+                exceptions=[date.fromisoformat(day) for day in cleaned_data.get('recurrence_exceptions', [])],
+            ).occurrences(horizon_start, horizon_end)
+        else:
+            intervals = [(start_time, end_time)]
+
+        # Reject overlaps with the instructor's other events, the course's events and the room
+        instructor = self.instructor or getattr(self.instance, 'instructor', None)
+        course = cleaned_data.get('course')
+        conflicts = find_conflicts(
+            intervals,
+            instructor_id=instructor.pk if instructor else None,
+            course_id=course.pk if course else None,
+            location=cleaned_data.get('location', ''),
+            exclude_id=self.instance.pk,
+        )
+        for event in conflicts[:5]:
+            if event.is_recurring:
+                when = f'{event.get_recurrence_frequency_display().lower()} from {timezone.localtime(event.start_time):%b %d, %H:%M}'
+            else:
+                when = f'{timezone.localtime(event.start_time):%b %d, %H:%M} - {timezone.localtime(event.end_time):%H:%M}'
+            self.add_error(
+                None,
+                f'Conflicts with "{event.title}" ({when}){self._conflict_reason(event, instructor, course)}.'
+            )
+        if len(conflicts) > 5:
+            self.add_error(None, f'... and {len(conflicts) - 5} more conflicting events.')
+        return cleaned_data
+
+    def _conflict_reason(self, event, instructor, course):
+        location = normalize_location(self.cleaned_data.get('location'))
+        if instructor and event.instructor_id == instructor.pk:
+            return ''
+        if course and event.course_id == course.pk:
+            return ' for the same course'
+        if location and normalize_location(event.location) == location:
+            return f' in {event.location}'
+        return ''
+
 
 class AssignmentForm(forms.ModelForm):
     class Meta:
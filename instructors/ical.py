@@ -0,0 +1,100 @@
+import hashlib
+from datetime import timezone as dt_timezone
+
+from django.contrib.auth.models import User
+from django.core import signing
+from django.db.models import Count, Max
+
+from .scheduling import events_in_window, expand
+
+# Default and largest number of weeks a calendar feed covers
+FEED_WEEKS = 8
+MAX_FEED_WEEKS = 52
+FEED_SALT = 'instructors.calendar_feed'
+
+
+def feed_token(user):
+    """Return the user's calendar feed token; it does not expire"""
+    return signing.Signer(salt=FEED_SALT).sign(str(user.pk))
+
+
+def user_for_token(token):
+    """Return the active user a feed token belongs to, or None"""
+    try:
+        user_id = signing.Signer(salt=FEED_SALT).unsign(token)
+    except signing.BadSignature:
+        return None
+    return User.objects.filter(pk=user_id, is_active=True).first()
+
+
+def feed_etag(events, start, end, name=''):
+    """Fingerprint the events in a window without loading them.
+
+    Course codes and the calendar name are part of the feed too, so a renamed
+    course or user changes the tag.
+    """
+    summary = events_in_window(events, start, end).aggregate(
+        count=Count('id'),
+        changed=Max('updated_at'),
+        course_changed=Max('course__updated_at'),
+    )
+    changed = [summary[field].timestamp() if summary[field] else 0 for field in ('changed', 'course_changed')]
+    key = f'{start.isoformat()}:{end.isoformat()}:{summary["count"]}:{changed[0]}:{changed[1]}:{name}'
+    return '"' + hashlib.md5(key.encode()).hexdigest() + '"'
+
+
+def _escape(text):
+    return (
+        (text or '')
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def _fold(line):
+    """Fold a content line to 75 octets as RFC 5545 requires"""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    while encoded:
+        limit = 75 if not parts else 74
+        # Do not split inside a multi-byte character
+        while limit < len(encoded) and (encoded[limit] & 0xC0) == 0x80:
+            limit -= 1
+        parts.append(encoded[:limit].decode())
+        encoded = encoded[limit:]
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _stamp(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def calendar_lines(events, start, end, name, host):
+    """Yield the lines of an iCalendar document with one VEVENT per occurrence"""
+    yield _fold('BEGIN:VCALENDAR')
+    yield _fold('VERSION:2.0')
+    yield _fold('PRODID:-//LMS//Schedule//EN')
+    yield _fold('CALSCALE:GREGORIAN')
+    yield _fold(f'X-WR-CALNAME:{_escape(name)}')
+    for occurrence in expand(events, start, end):
+        yield _fold('BEGIN:VEVENT')
+        yield _fold(f'UID:event-{occurrence.pk}-{_stamp(occurrence.start_time)}@{host}')
+        yield _fold(f'DTSTAMP:{_stamp(occurrence.updated_at)}')
+        yield _fold(f'DTSTART:{_stamp(occurrence.start_time)}')
+        yield _fold(f'DTEND:{_stamp(occurrence.end_time)}')
+        summary = occurrence.title
+        if occurrence.course:
+            summary = f'{summary} ({occurrence.course.code})'
+        yield _fold(f'SUMMARY:{_escape(summary)}')
+        if occurrence.description:
+            yield _fold(f'DESCRIPTION:{_escape(occurrence.description)}')
+        if occurrence.location:
+            yield _fold(f'LOCATION:{_escape(occurrence.location)}')
+        yield _fold(f'CATEGORIES:{_escape(occurrence.get_event_type_display())}')
+        yield _fold('END:VEVENT')
+    yield _fold('END:VCALENDAR')
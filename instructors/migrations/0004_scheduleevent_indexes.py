@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_content_addressed_storage'),
+        ('instructors', '0003_scheduleevent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='scheduleevent',
+            index=models.Index(fields=['start_time', 'end_time'], name='instructors_start_t_77936a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scheduleevent',
+            index=models.Index(fields=['instructor', 'start_time'], name='instructors_instruc_7db4fb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scheduleevent',
+            index=models.Index(fields=['course', 'start_time'], name='instructors_course__e6c5da_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scheduleevent',
+            index=models.Index(fields=['location', 'start_time'], name='instructors_locatio_9a6845_idx'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:56
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_series_end(apps, schema_editor):
+    ScheduleEvent = apps.get_model('instructors', 'ScheduleEvent')
+    ScheduleEvent.objects.update(series_end=F('end_time'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_content_addressed_storage'),
+        ('instructors', '0004_scheduleevent_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='scheduleevent',
+            name='instructors_start_t_77936a_idx',
+        ),
+        migrations.AddField(
+            model_name='scheduleevent',
+            name='recurrence_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='scheduleevent',
+            name='recurrence_exceptions',
+            field=models.JSONField(blank=True, default=list, help_text='Skipped dates (YYYY-MM-DD)'),
+        ),
+        migrations.AddField(
+            model_name='scheduleevent',
+            name='recurrence_frequency',
+            field=models.CharField(blank=True, choices=[('', 'Does not repeat'), ('daily', 'Daily'), ('weekly', 'Weekly')], max_length=10),
+        ),
+        migrations.AddField(
+            model_name='scheduleevent',
+            name='recurrence_interval',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='scheduleevent',
+            name='recurrence_until',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='scheduleevent',
+            name='recurrence_weekdays',
+            field=models.CharField(blank=True, help_text='Comma separated weekdays, 0 = Monday', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='scheduleevent',
+            name='rule_version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='scheduleevent',
+            name='series_end',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='scheduleevent',
+            index=models.Index(fields=['start_time', 'series_end'], name='instructors_start_t_8e39f4_idx'),
+        ),
+        migrations.RunPython(fill_series_end, migrations.RunPython.noop),
+    ]
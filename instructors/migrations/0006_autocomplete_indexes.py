@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instructors', '0005_scheduleevent_recurrence'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='instructor',
+            name='email',
+            field=models.EmailField(db_index=True, max_length=254),
+        ),
+        migrations.AlterField(
+            model_name='instructor',
+            name='first_name',
+            field=models.CharField(db_index=True, max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='instructor',
+            name='last_name',
+            field=models.CharField(db_index=True, max_length=50),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:26
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instructors', '0006_autocomplete_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='instructor',
+            name='email',
+            field=models.EmailField(max_length=254),
+        ),
+        migrations.AlterField(
+            model_name='instructor',
+            name='first_name',
+            field=models.CharField(max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='instructor',
+            name='last_name',
+            field=models.CharField(max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='instructor',
+            index=models.Index(django.db.models.functions.text.Lower('instructor_id'), name='instructor_instructor_id_lower'),
+        ),
+        migrations.AddIndex(
+            model_name='instructor',
+            index=models.Index(django.db.models.functions.text.Lower('first_name'), name='instructor_first_name_lower'),
+        ),
+        migrations.AddIndex(
+            model_name='instructor',
+            index=models.Index(django.db.models.functions.text.Lower('last_name'), name='instructor_last_name_lower'),
+        ),
+        migrations.AddIndex(
+            model_name='instructor',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='instructor_email_lower'),
+        ),
+    ]
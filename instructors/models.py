@@ -1,6 +1,11 @@
+from datetime import date
+
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import User
 
+from .recurrence import FREQUENCY_CHOICES, Rule
+
 class Instructor(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True)
     instructor_id = models.CharField(max_length=20, unique=True)
@@ -22,6 +27,15 @@ class Instructor(models.Model):
     def full_name(self):
         return f"{self.first_name} {self.last_name}"
 
+    class Meta:
+        indexes = [
+            # Case-insensitive prefix search (admin_panel.autocomplete) compares Lower() ranges
+            models.Index(Lower('instructor_id'), name='instructor_instructor_id_lower'),
+            models.Index(Lower('first_name'), name='instructor_first_name_lower'),
+            models.Index(Lower('last_name'), name='instructor_last_name_lower'),
+            models.Index(Lower('email'), name='instructor_email_lower'),
+        ]
+
 
 class ScheduleEvent(models.Model):
     EVENT_TYPES = [
@@ -41,11 +55,51 @@ class ScheduleEvent(models.Model):
     end_time = models.DateTimeField()
     location = models.CharField(max_length=200, blank=True)
     is_recurring = models.BooleanField(default=False)
+    # Recurrence rule; start_time/end_time describe the first occurrence
+    recurrence_frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, blank=True)
+    recurrence_interval = models.PositiveSmallIntegerField(default=1)
+    recurrence_weekdays = models.CharField(max_length=20, blank=True, help_text='Comma separated weekdays, 0 = Monday')
+    recurrence_until = models.DateField(null=True, blank=True)
+    recurrence_count = models.PositiveIntegerField(null=True, blank=True)
+    recurrence_exceptions = models.JSONField(default=list, blank=True, help_text='Skipped dates (YYYY-MM-DD)')
+    # End of the last occurrence, null while a recurring series has no end
+    series_end = models.DateTimeField(null=True, blank=True)
+    rule_version = models.PositiveIntegerField(default=1)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.title} - {self.start_time}"
 
+    def get_rule(self):
+        """Return the recurrence Rule, or None for a one-off event"""
+        if not self.recurrence_frequency:
+            return None
+        return Rule(
+            self.start_time,
+            self.end_time,
+            self.recurrence_frequency,
+            interval=self.recurrence_interval,
+            weekdays=[int(day) for day in self.recurrence_weekdays.split(',') if day.strip()],
+            until=self.recurrence_until,
+            count=self.recurrence_count,
+            exceptions=[date.fromisoformat(day) for day in self.recurrence_exceptions],
+        )
+
+    def save(self, *args, **kwargs):
+        rule = self.get_rule()
+        self.is_recurring = rule is not None
+        self.series_end = rule.last_end() if rule else self.end_time
+        # Cached expansions are keyed by version, so any edit retires them
+        if self.pk:
+            self.rule_version += 1
+        super().save(*args, **kwargs)
+
     class Meta:
-        ordering = ['start_time']
\ No newline at end of file
+        ordering = ['start_time']
+        indexes = [
+            models.Index(fields=['start_time', 'series_end']),
+            models.Index(fields=['instructor', 'start_time']),
+            models.Index(fields=['course', 'start_time']),
+            models.Index(fields=['location', 'start_time']),
+        ]
\ No newline at end of file
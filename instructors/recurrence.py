@@ -0,0 +1,133 @@
+from datetime import date, datetime, timedelta
+
+from django.utils import timezone
+
+DAILY = 'daily'
+WEEKLY = 'weekly'
+FREQUENCY_CHOICES = [
+    ('', 'Does not repeat'),
+    (DAILY, 'Daily'),
+    (WEEKLY, 'Weekly'),
+]
+WEEKDAY_CHOICES = [
+    ('0', 'Mon'),
+    ('1', 'Tue'),
+    ('2', 'Wed'),
+    ('3', 'Thu'),
+    ('4', 'Fri'),
+    ('5', 'Sat'),
+    ('6', 'Sun'),
+]
+# Longest series the schedule form accepts, by COUNT and by UNTIL
+MAX_OCCURRENCES = 2000
+MAX_SERIES_DAYS = 5 * 366
+
+
+class Rule:
+    """An RRULE-style recurrence: FREQ=DAILY|WEEKLY with INTERVAL, BYDAY, UNTIL, COUNT and EXDATE.
+
+    Occurrences keep the local wall-clock time of the first one, so a 10:00
+    lecture stays at 10:00 across daylight saving changes. `until` and the
+    exception dates are local dates; `until` is inclusive.
+    """
+
+    def __init__(self, start, end, frequency, interval=1, weekdays=(), until=None, count=None, exceptions=()):
+        self.start = timezone.localtime(start)
+        self.duration = end - start
+        self.frequency = frequency
+        self.interval = max(interval or 1, 1)
+        self.weekdays = sorted(set(weekdays)) or [self.start.weekday()]
+        self.until = until
+        self.count = count
+        self.exceptions = frozenset(exceptions)
+
+    def _dates(self, from_date):
+        """Yield candidate dates in order, starting at the period containing from_date.
+
+        The generator ends at the end of the calendar (date.max) instead of
+        overflowing, so an open-ended or far-reaching series always stops.
+        """
+        first = self.start.date()
+        if self.frequency == DAILY:
+            step = self.interval
+            skip = max((from_date - first).days // step, 0)
+            current = first + timedelta(days=skip * step)
+            while True:
+                yield current
+                if (date.max - current).days < step:
+                    return
+                current += timedelta(days=step)
+        else:
+            anchor = first - timedelta(days=first.weekday())
+            step = 7 * self.interval
+            skip = max((from_date - anchor).days // step, 0)
+            week = anchor + timedelta(days=skip * step)
+            while True:
+                for weekday in self.weekdays:
+                    if (date.max - week).days < weekday:
+                        return
+                    current = week + timedelta(days=weekday)
+                    if current >= first:
+                        yield current
+                if (date.max - week).days < step:
+                    return
+                week += timedelta(days=step)
+
+    def _occurrence(self, day):
+        naive = datetime.combine(day, self.start.time().replace(tzinfo=None))
+        start = timezone.make_aware(naive, self.start.tzinfo)
+        return start, start + self.duration
+
+    def occurrences(self, window_start=None, window_end=None):
+        """Lazily yield (start, end) pairs overlapping [window_start, window_end).
+
+        Without a COUNT the expansion jumps straight to the window, so asking
+        for one week of a year-long series only builds that week.
+        """
+        if self.count:
+            from_date = self.start.date()
+        elif window_start is not None:
+            from_date = (timezone.localtime(window_start) - self.duration).date()
+        else:
+            from_date = self.start.date()
+
+        produced = 0
+        for day in self._dates(from_date):
+            if self.until and day > self.until:
+                return
+            if self.count and produced >= self.count:
+                return
+            produced += 1
+            start, end = self._occurrence(day)
+            if window_end is not None and start >= window_end:
+                return
+            if day in self.exceptions:
+                continue
+            if window_start is not None and end <= window_start:
+                continue
+            yield start, end
+
+    def last_end(self):
+        """End of the final occurrence, or None when the series never ends"""
+        if not self.until and not self.count:
+            return None
+        last = None
+        produced = 0
+        for day in self._dates(self.start.date()):
+            if self.until and day > self.until:
+                break
+            if self.count and produced >= self.count:
+                break
+            last = day
+            produced += 1
+        return self._occurrence(last)[1] if last else None
+
+
+def parse_exceptions(value):
+    """Parse a comma separated list of YYYY-MM-DD dates"""
+    exceptions = []
+    for part in (value or '').replace('\n', ',').split(','):
+        part = part.strip()
+        if part:
+            exceptions.append(date.fromisoformat(part))
+    return sorted(set(exceptions))
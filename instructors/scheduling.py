@@ -0,0 +1,268 @@
+import threading
+from bisect import bisect_left
+from datetime import date, datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ScheduleEvent
+
+SCHEDULE_VERSION_KEY = 'instructors:schedule:version'
+# Default length of an upcoming window, e.g. for calendar feeds
+SCHEDULE_WINDOW_DAYS = 28
+# Recurring series are checked for conflicts this many days either side of today
+CONFLICT_HORIZON_DAYS = 366
+# Expansions are keyed by rule version, the timeout only bounds memory use
+OCCURRENCE_CACHE_TIMEOUT = 60 * 60
+
+
+class IntervalTree:
+    """Static interval tree over half-open [start, end) intervals.
+
+    Intervals are sorted by start and laid out as an implicit binary tree in
+    which every node stores the largest end time below it. An overlap query
+    only visits subtrees that can still contain a match, so it costs
+    O(log n + k) for k results.
+    """
+
+    def __init__(self, intervals):
+        self.items = sorted(intervals, key=lambda item: (item[0], item[1]))
+        self.starts = [item[0] for item in self.items]
+        self.size = len(self.items)
+        self.max_end = [None] * (2 * self.size)
+        for index, item in enumerate(self.items):
+            self.max_end[self.size + index] = item[1]
+        for node in range(self.size - 1, 0, -1):
+            self.max_end[node] = max(self.max_end[2 * node], self.max_end[2 * node + 1])
+
+    def __len__(self):
+        return self.size
+
+    def overlapping(self, start, end):
+        """Return the payloads of all intervals overlapping [start, end)"""
+        # Only intervals starting before `end` can overlap
+        limit = bisect_left(self.starts, end)
+        if limit == 0:
+            return []
+        found = []
+        self._collect(0, limit, start, found)
+        return found
+
+    def _collect(self, low, high, start, found):
+        # Walk the leaves [low, high) in blocks aligned to tree nodes,
+        # skipping any block whose largest end is not after `start`
+        low += self.size
+        high += self.size
+        nodes = []
+        while low < high:
+            if low & 1:
+                nodes.append(low)
+                low += 1
+            if high & 1:
+                high -= 1
+                nodes.append(high)
+            low >>= 1
+            high >>= 1
+        for node in nodes:
+            self._descend(node, start, found)
+
+    def _descend(self, node, start, found):
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if self.max_end[node] <= start:
+                continue
+            if node >= self.size:
+                found.append(self.items[node - self.size][2])
+            else:
+                stack.append(2 * node)
+                stack.append(2 * node + 1)
+
+
+class ScheduleIndex:
+    """Per-process interval trees of events keyed by instructor, course or location.
+
+    Trees are built on first use and dropped when the schedule version (bumped
+    on every ScheduleEvent change) moves on, so all processes stay in step.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._trees = {}
+
+    def _current(self):
+        version = cache.get(SCHEDULE_VERSION_KEY)
+        if version is None:
+            version = 1
+            cache.add(SCHEDULE_VERSION_KEY, version, None)
+        with self._lock:
+            if version != self._version:
+                self._version = version
+                self._trees = {}
+        return version
+
+    def tree(self, kind, value):
+        self._current()
+        key = (kind, value)
+        with self._lock:
+            tree = self._trees.get(key)
+        if tree is None:
+            events = ScheduleEvent.objects.all()
+            if kind == 'location':
+                events = events.filter(location__iexact=value)
+            else:
+                events = events.filter(**{f'{kind}_id': value})
+            horizon_start, horizon_end = conflict_horizon()
+            intervals = []
+            for event in events_in_window(events, horizon_start, horizon_end):
+                for start, end in occurrence_times(event, horizon_start, horizon_end):
+                    intervals.append((start.timestamp(), end.timestamp(), event.id))
+            tree = IntervalTree(intervals)
+            with self._lock:
+                self._trees[key] = tree
+        return tree
+
+
+index = ScheduleIndex()
+
+
+def invalidate_schedule():
+    try:
+        cache.incr(SCHEDULE_VERSION_KEY)
+    except ValueError:
+        cache.set(SCHEDULE_VERSION_KEY, 2, None)
+
+
+def normalize_location(location):
+    return (location or '').strip().lower()
+
+
+def events_in_window(queryset, start, end):
+    """Events and recurring series overlapping [start, end), answered with an indexed range query"""
+    return queryset.filter(
+        Q(series_end__gt=start) | Q(series_end__isnull=True),
+        start_time__lt=end,
+    )
+
+
+def conflict_horizon():
+    today = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=CONFLICT_HORIZON_DAYS), today + timedelta(days=CONFLICT_HORIZON_DAYS)
+
+
+def occurrence_times(event, start, end):
+    """Return the (start, end) pairs of an event inside [start, end).
+
+    One-off events are answered directly; a recurring series is expanded
+    lazily for the window only and the result is cached per rule version.
+    """
+    rule = event.get_rule()
+    if rule is None:
+        if event.start_time < end and event.end_time > start:
+            return [(event.start_time, event.end_time)]
+        return []
+    key = f'instructors:occurrences:{event.pk}:{event.rule_version}:{start.timestamp()}:{end.timestamp()}'
+    times = cache.get(key)
+    if times is None:
+        times = list(rule.occurrences(start, end))
+        cache.set(key, times, OCCURRENCE_CACHE_TIMEOUT)
+    return times
+
+
+class Occurrence:
+    """One occurrence of a ScheduleEvent; other attributes come from the event"""
+
+    def __init__(self, event, start_time, end_time):
+        self.event = event
+        self.start_time = start_time
+        self.end_time = end_time
+
+    def __getattr__(self, name):
+        return getattr(self.event, name)
+
+
+def expand(events, start, end):
+    """Return the occurrences of `events` inside [start, end), ordered by start time"""
+    occurrences = [
+        Occurrence(event, occurrence_start, occurrence_end)
+        for event in events_in_window(events, start, end)
+        for occurrence_start, occurrence_end in occurrence_times(event, start, end)
+    ]
+    occurrences.sort(key=lambda occurrence: (occurrence.start_time, occurrence.event.pk))
+    return occurrences
+
+
+def upcoming_window(days=SCHEDULE_WINDOW_DAYS):
+    """Return the default [start, end) window: from the start of today for `days` days"""
+    start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    return start, start + timedelta(days=days)
+
+
+def _window_dates(view, day):
+    """Return (first, last, previous, label) of the week or month containing `day`"""
+    if view == 'month':
+        first = day.replace(day=1)
+        last = (first + timedelta(days=32)).replace(day=1)
+        previous = (first - timedelta(days=1)).replace(day=1)
+        label = first.strftime('%B %Y')
+    else:
+        first = day - timedelta(days=day.weekday())
+        last = first + timedelta(days=7)
+        previous = first - timedelta(days=7)
+        label = f'{first:%b %d} - {last - timedelta(days=1):%b %d, %Y}'
+    return first, last, previous, label
+
+
+def schedule_window(request):
+    """Resolve the ?view=week|month&date=YYYY-MM-DD window of a schedule page.
+
+    Weeks start on Monday; a missing or malformed date, or one too close
+    to the ends of the calendar to step around, means today.
+    """
+    view = request.GET.get('view', 'week')
+    if view not in ('week', 'month'):
+        view = 'week'
+    today = timezone.localdate()
+    try:
+        day = date.fromisoformat(request.GET.get('date', ''))
+        first, last, previous, label = _window_dates(view, day)
+    except (ValueError, OverflowError):
+        first, last, previous, label = _window_dates(view, today)
+
+    tz = timezone.get_current_timezone()
+    return {
+        'view': view,
+        'start': timezone.make_aware(datetime.combine(first, time.min), tz),
+        'end': timezone.make_aware(datetime.combine(last, time.min), tz),
+        'date': first,
+        'previous_date': previous,
+        'next_date': last,
+        'today': today,
+        'label': label,
+    }
+
+
+def find_conflicts(intervals, instructor_id=None, course_id=None, location='', exclude_id=None):
+    """Return the events overlapping any (start, end) interval for the same instructor, course or location"""
+    keys = []
+    if instructor_id:
+        keys.append(('instructor', instructor_id))
+    if course_id:
+        keys.append(('course', course_id))
+    location = normalize_location(location)
+    if location:
+        keys.append(('location', location))
+
+    trees = [index.tree(kind, value) for kind, value in keys]
+    conflict_ids = set()
+    for start, end in intervals:
+        for tree in trees:
+            conflict_ids.update(tree.overlapping(start.timestamp(), end.timestamp()))
+    conflict_ids.discard(exclude_id)
+    if not conflict_ids:
+        return []
+    return list(
+        ScheduleEvent.objects.filter(id__in=conflict_ids).select_related('course', 'instructor').order_by('start_time')
+    )
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ScheduleEvent
+from .scheduling import invalidate_schedule
+
+
+@receiver([post_save, post_delete], sender=ScheduleEvent)
+def refresh_schedule_index(sender, instance, **kwargs):
+    """Rebuild the interval trees after any schedule change"""
+    invalidate_schedule()
@@ -1,3 +1,304 @@
-from django.test import TestCase
+import random
+from datetime import date, datetime, timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from courses.models import Category, Course
+
+from .forms import ScheduleEventForm
+from .ical import feed_token
+from .models import Instructor, ScheduleEvent
+from .recurrence import DAILY, MAX_OCCURRENCES, WEEKLY, Rule, parse_exceptions
+from .scheduling import IntervalTree, expand, find_conflicts, index, invalidate_schedule
+
+
+def aware(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+class IntervalTreeTest(SimpleTestCase):
+
+    def test_touching_intervals_do_not_overlap(self):
+        tree = IntervalTree([(0, 10, 'a'), (10, 20, 'b')])
+        self.assertEqual(tree.overlapping(10, 20), ['b'])
+        self.assertEqual(tree.overlapping(5, 10), ['a'])
+        self.assertEqual(sorted(tree.overlapping(9, 11)), ['a', 'b'])
+        self.assertEqual(tree.overlapping(20, 30), [])
+
+    def test_queries_outside_all_intervals(self):
+        tree = IntervalTree([(5, 10, 'a'), (12, 15, 'b')])
+        self.assertEqual(tree.overlapping(0, 5), [])
+        self.assertEqual(tree.overlapping(10, 12), [])
+        self.assertEqual(tree.overlapping(15, 100), [])
+
+    def test_empty_tree(self):
+        tree = IntervalTree([])
+        self.assertEqual(len(tree), 0)
+        self.assertEqual(tree.overlapping(0, 100), [])
+
+    def test_long_interval_is_found_behind_short_ones(self):
+        # The long interval starts first, so only its subtree's max end reveals it
+        tree = IntervalTree([(0, 100, 'long')] + [(i, i + 1, i) for i in range(1, 20)])
+        self.assertEqual(sorted(tree.overlapping(50, 60), key=str), ['long'])
+
+    def test_matches_brute_force(self):
+        rng = random.Random(42)
+        # Sizes around powers of two exercise the unbalanced edges of the implicit tree
+        for size in [1, 2, 3, 7, 8, 9, 31, 32, 33, 100]:
+            intervals = []
+            for payload in range(size):
+                start = rng.randint(0, 200)
+                intervals.append((start, start + rng.randint(1, 40), payload))
+            tree = IntervalTree(intervals)
+            for _ in range(50):
+                start = rng.randint(-10, 250)
+                end = start + rng.randint(1, 60)
+                expected = sorted(p for s, e, p in intervals if s < end and e > start)
+                self.assertEqual(sorted(tree.overlapping(start, end)), expected, (size, start, end))
+
+
+class ScheduleConflictTest(TestCase):
+
+    def setUp(self):
+        # Trees live in a module-level index; start every test from a fresh version
+        invalidate_schedule()
+        self.instructor = Instructor.objects.create(
+            instructor_id='I-1', first_name='Tess', last_name='Trainer', email='tess@example.com'
+        )
+        self.other = Instructor.objects.create(
+            instructor_id='I-2', first_name='Olga', last_name='Other', email='olga@example.com'
+        )
+        # Inside the conflict horizon, which is centred on today
+        self.day = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=7)
+
+    def event(self, start_hour, end_hour, instructor=None, **kwargs):
+        return ScheduleEvent.objects.create(
+            instructor=instructor or self.instructor,
+            title='Lecture',
+            start_time=self.day + timedelta(hours=start_hour),
+            end_time=self.day + timedelta(hours=end_hour),
+            **kwargs
+        )
+
+    def conflicts(self, start_hour, end_hour, **kwargs):
+        kwargs.setdefault('instructor_id', self.instructor.pk)
+        interval = (self.day + timedelta(hours=start_hour), self.day + timedelta(hours=end_hour))
+        return [event.pk for event in find_conflicts([interval], **kwargs)]
+
+    def test_overlap_and_touching_boundaries(self):
+        event = self.event(10, 12)
+        self.assertEqual(self.conflicts(11, 13), [event.pk])
+        self.assertEqual(self.conflicts(9, 10), [])
+        self.assertEqual(self.conflicts(12, 13), [])
+        # Another instructor's event is not a conflict
+        self.assertEqual(self.conflicts(11, 13, instructor_id=self.other.pk), [])
+
+    def test_exclude_id_skips_the_event_being_edited(self):
+        event = self.event(10, 12)
+        self.assertEqual(self.conflicts(10, 12, exclude_id=event.pk), [])
+
+    def test_location_is_matched_case_insensitively(self):
+        event = self.event(10, 12, instructor=self.other, location='Room 1')
+        self.assertEqual(self.conflicts(11, 13, location='  room 1 '), [event.pk])
+        self.assertEqual(self.conflicts(11, 13, location='Room 2'), [])
+
+    def test_deleted_and_moved_events_leave_the_index(self):
+        event = self.event(10, 12)
+        self.assertEqual(self.conflicts(11, 13), [event.pk])
+
+        event.start_time += timedelta(hours=4)
+        event.end_time += timedelta(hours=4)
+        event.save()
+        self.assertEqual(self.conflicts(11, 13), [])
+        self.assertEqual(self.conflicts(14, 15), [event.pk])
+
+        event.delete()
+        self.assertEqual(self.conflicts(14, 15), [])
+
+    def test_index_is_reused_until_the_version_moves(self):
+        tree = index.tree('instructor', self.instructor.pk)
+        self.assertIs(index.tree('instructor', self.instructor.pk), tree)
+
+        # Another process bumping the shared version retires this process's trees
+        invalidate_schedule()
+        self.assertIsNot(index.tree('instructor', self.instructor.pk), tree)
+
+    def test_recurring_series_conflicts_on_later_occurrences(self):
+        series = self.event(10, 12, recurrence_frequency=DAILY, recurrence_count=5)
+        interval = (self.day + timedelta(days=3, hours=11), self.day + timedelta(days=3, hours=13))
+        self.assertEqual(
+            [event.pk for event in find_conflicts([interval], instructor_id=self.instructor.pk)],
+            [series.pk],
+        )
+        interval = (self.day + timedelta(days=5, hours=11), self.day + timedelta(days=5, hours=13))
+        self.assertEqual(find_conflicts([interval], instructor_id=self.instructor.pk), [])
+
+    def test_expand_orders_occurrences_by_start(self):
+        single = self.event(15, 16)
+        series = self.event(10, 11, recurrence_frequency=DAILY, recurrence_count=2)
+        occurrences = expand(ScheduleEvent.objects.all(), self.day, self.day + timedelta(days=2))
+        self.assertEqual(
+            [(occurrence.pk, occurrence.start_time - self.day) for occurrence in occurrences],
+            [
+                (series.pk, timedelta(hours=10)),
+                (single.pk, timedelta(hours=15)),
+                (series.pk, timedelta(days=1, hours=10)),
+            ],
+        )
+
+
+class RuleTest(SimpleTestCase):
+
+    def days(self, rule, window_start=None, window_end=None):
+        return [start.date() for start, end in rule.occurrences(window_start, window_end)]
+
+    def test_count_limits_the_series(self):
+        rule = Rule(aware(2030, 1, 1, 10), aware(2030, 1, 1, 11), DAILY, count=3)
+        self.assertEqual(self.days(rule), [date(2030, 1, 1), date(2030, 1, 2), date(2030, 1, 3)])
+        self.assertEqual(rule.last_end(), aware(2030, 1, 3, 11))
+
+    def test_until_is_inclusive(self):
+        rule = Rule(aware(2030, 1, 1, 10), aware(2030, 1, 1, 11), DAILY, until=date(2030, 1, 3))
+        self.assertEqual(self.days(rule), [date(2030, 1, 1), date(2030, 1, 2), date(2030, 1, 3)])
+
+    def test_count_and_until_stop_at_whichever_comes_first(self):
+        start, end = aware(2030, 1, 1, 10), aware(2030, 1, 1, 11)
+        self.assertEqual(len(self.days(Rule(start, end, DAILY, count=10, until=date(2030, 1, 2)))), 2)
+        self.assertEqual(len(self.days(Rule(start, end, DAILY, count=2, until=date(2030, 1, 10)))), 2)
+
+    def test_count_is_taken_from_the_series_start_not_the_window(self):
+        rule = Rule(aware(2030, 1, 1, 10), aware(2030, 1, 1, 11), DAILY, count=4)
+        self.assertEqual(
+            self.days(rule, aware(2030, 1, 3), aware(2030, 2, 1)),
+            [date(2030, 1, 3), date(2030, 1, 4)],
+        )
+
+    def test_exceptions_are_skipped_but_still_use_up_the_count(self):
+        rule = Rule(aware(2030, 1, 1, 10), aware(2030, 1, 1, 11), DAILY, count=3, exceptions=[date(2030, 1, 2)])
+        self.assertEqual(self.days(rule), [date(2030, 1, 1), date(2030, 1, 3)])
+
+    def test_weekly_byday_skips_weekdays_before_the_start(self):
+        # 2030-01-02 is a Wednesday; the Monday of that week is before the series
+        rule = Rule(aware(2030, 1, 2, 10), aware(2030, 1, 2, 11), WEEKLY, weekdays=[0, 2], count=4)
+        self.assertEqual(
+            self.days(rule),
+            [date(2030, 1, 2), date(2030, 1, 7), date(2030, 1, 9), date(2030, 1, 14)],
+        )
+
+    def test_weekly_defaults_to_the_start_weekday_and_honours_interval(self):
+        rule = Rule(aware(2030, 1, 2, 10), aware(2030, 1, 2, 11), WEEKLY, interval=2, count=3)
+        self.assertEqual(self.days(rule), [date(2030, 1, 2), date(2030, 1, 16), date(2030, 1, 30)])
+
+    def test_series_crosses_month_ends(self):
+        daily = Rule(aware(2024, 1, 30, 10), aware(2024, 1, 30, 11), DAILY, until=date(2024, 2, 1))
+        self.assertEqual(self.days(daily), [date(2024, 1, 30), date(2024, 1, 31), date(2024, 2, 1)])
+        # Leap day, with UNTIL on the last day of the month
+        weekly = Rule(aware(2024, 1, 31, 10), aware(2024, 1, 31, 11), WEEKLY, weekdays=[2, 3], until=date(2024, 2, 29))
+        self.assertEqual(
+            self.days(weekly, aware(2024, 2, 20), aware(2024, 3, 31)),
+            [date(2024, 2, 21), date(2024, 2, 22), date(2024, 2, 28), date(2024, 2, 29)],
+        )
+
+    def test_window_clipping(self):
+        rule = Rule(aware(2030, 1, 1, 10), aware(2030, 1, 1, 12), DAILY)
+        # Ending exactly at the window start or starting at its end is outside
+        self.assertEqual(self.days(rule, aware(2030, 1, 2, 12), aware(2030, 1, 4, 10)), [date(2030, 1, 3)])
+        # Partly inside at either edge is inside
+        self.assertEqual(
+            self.days(rule, aware(2030, 1, 2, 11), aware(2030, 1, 4, 11)),
+            [date(2030, 1, 2), date(2030, 1, 3), date(2030, 1, 4)],
+        )
+
+    def test_open_ended_series_jumps_to_the_window(self):
+        rule = Rule(aware(2030, 1, 1, 10), aware(2030, 1, 1, 11), DAILY)
+        self.assertIsNone(rule.last_end())
+        self.assertEqual(self.days(rule, aware(2035, 6, 1), aware(2035, 6, 3)), [date(2035, 6, 1), date(2035, 6, 2)])
+
+    def test_series_stops_at_the_end_of_the_calendar(self):
+        rule = Rule(aware(9999, 12, 1, 10), aware(9999, 12, 1, 11), DAILY, interval=7, until=date.max)
+        self.assertEqual(rule.last_end(), aware(9999, 12, 29, 11))
+        weekly = Rule(aware(2030, 1, 1, 10), aware(2030, 1, 1, 11), WEEKLY, weekdays=[0, 6])
+        self.assertEqual(self.days(weekly, aware(9999, 12, 20)), [date(9999, 12, 20), date(9999, 12, 26), date(9999, 12, 27)])
+
+    def test_wall_clock_time_survives_daylight_saving(self):
+        with timezone.override('Europe/Berlin'):
+            start = timezone.make_aware(datetime(2030, 3, 25, 10))
+            rule = Rule(start, start + timedelta(hours=1), WEEKLY, count=3)
+            # The clocks go forward on 2030-03-31
+            hours = [timezone.localtime(start).hour for start, end in rule.occurrences()]
+        self.assertEqual(hours, [10, 10, 10])
+
+    def test_parse_exceptions(self):
+        self.assertEqual(
+            parse_exceptions('2030-01-03, 2030-01-01\n2030-01-03'),
+            [date(2030, 1, 1), date(2030, 1, 3)],
+        )
+        with self.assertRaises(ValueError):
+            parse_exceptions('next tuesday')
+
+
+class ScheduleEventFormTest(TestCase):
+
+    def setUp(self):
+        self.instructor = Instructor.objects.create(
+            instructor_id='I-1', first_name='Tess', last_name='Trainer', email='tess@example.com'
+        )
+
+    def form(self, **data):
+        data = {
+            'title': 'Lecture',
+            'event_type': 'lecture',
+            'start_time': '2030-01-01T10:00',
+            'end_time': '2030-01-01T11:00',
+            'recurrence_frequency': DAILY,
+            'recurrence_interval': 1,
+            **data,
+        }
+        return ScheduleEventForm(self.instructor, data=data)
+
+    def test_series_length_is_capped(self):
+        form = self.form(recurrence_count=MAX_OCCURRENCES + 1)
+        self.assertIn('recurrence_count', form.errors)
+        form = self.form(recurrence_until='9999-12-31')
+        self.assertIn('recurrence_until', form.errors)
+
+    def test_series_within_the_caps_is_valid(self):
+        self.assertTrue(self.form(recurrence_count=MAX_OCCURRENCES).is_valid())
+        self.assertTrue(self.form(recurrence_until='2031-01-01').is_valid())
+
+
+class CalendarFeedTest(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user('trainer')
+        self.instructor = Instructor.objects.create(
+            user=user, instructor_id='I-1', first_name='Tess', last_name='Trainer', email='tess@example.com'
+        )
+        self.course = Course.objects.create(
+            title='Feeds', code='FEED-1', description='', category=Category.objects.create(name='Testing'),
+            instructor=self.instructor,
+        )
+        start = timezone.localtime().replace(hour=10, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        ScheduleEvent.objects.create(
+            instructor=self.instructor, course=self.course, title='Lecture',
+            start_time=start, end_time=start + timedelta(hours=1),
+        )
+        self.url = reverse('instructors:calendar_feed', args=[feed_token(user)])
+
+    def test_unchanged_feed_is_304(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_renaming_the_course_changes_the_etag(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertIn('(FEED-1)', b''.join(response.streaming_content).decode())
+
+        self.course.code = 'FEED-2'
+        self.course.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('(FEED-2)', b''.join(response.streaming_content).decode())
@@ -22,6 +22,7 @@ urlpatterns = [
     path('schedule/add/', views.add_schedule_event, name='add_schedule_event'),
     path('schedule/<int:event_id>/edit/', views.edit_schedule_event, name='edit_schedule_event'),
     path('schedule/<int:event_id>/delete/', views.delete_schedule_event, name='delete_schedule_event'),
+    path('calendar/<str:token>.ics', views.calendar_feed, name='calendar_feed'),
     path('messages/', views.messages_view, name='messages'),
     path('settings/', views.settings, name='settings'),
     path('about/', views.about, name='about'),
@@ -3,13 +3,21 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.paginator import Paginator
 from django.db.models import Q, Count
+from django.http import Http404, StreamingHttpResponse
+from django.urls import reverse
 from django.utils import timezone
-from courses.models import Course, Category, Material, Video
+from django.utils.cache import get_conditional_response
+from courses.models import Course, Category, Module, Lesson, Material, Video
+from courses.outline import get_course_outline
 from students.models import Student, Enrollment, AssignmentSubmission, Assignment, Attendance, TrainerAttendance
 from instructors.models import Instructor, ScheduleEvent
+from students.feed import student_events
 from students.forms import AttendanceForm, BulkAttendanceForm
 from .forms import AssignmentForm, ScheduleEventForm
+from .ical import FEED_WEEKS, MAX_FEED_WEEKS, calendar_lines, feed_etag, feed_token, user_for_token
+from .scheduling import expand, schedule_window, upcoming_window
 from admin_panel.forms import MaterialForm, VideoForm
+from lms.tracing import trace
 
 @login_required
 def dashboard(request):
@@ -94,13 +102,18 @@ def course_detail(request, course_id):
         return redirect('instructors:dashboard')
     
     # Get the course (must be taught by this instructor)
-    course = get_object_or_404(Course, id=course_id, instructor=instructor)
-    modules = Module.objects.filter(course=course).prefetch_related('lessons')
+    course = get_object_or_404(
+        Course.objects.select_related('category', 'instructor'),
+        id=course_id,
+        instructor=instructor
+    )
+    outline = get_course_outline(course.id)
     
     context = {
         'instructor': instructor,
         'course': course,
-        'modules': modules,
+        'outline': outline,
+        'modules': outline['modules'],
     }
     return render(request, 'instructors/course_detail.html', context)
 
@@ -327,15 +340,10 @@ def materials(request):
         course__instructor=instructor
     ).select_related('course', 'module').order_by('-created_at')
     
-    # Debug information
-    print(f"Instructor: {instructor}")
-    print(f"Materials count: {materials.count()}")
-    for material in materials:
-        print(f"Material: {material.title}, Course: {material.course.title}, Instructor: {material.course.instructor}")
-    
     paginator = Paginator(materials, 12)  # Show 12 materials per page
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    trace(request, 'instructor=%s materials=%s page=%s', instructor.id, paginator.count, page_obj.number)
     
     context = {
         'instructor': instructor,
@@ -358,15 +366,10 @@ def videos(request):
         course__instructor=instructor
     ).select_related('course', 'module').order_by('-created_at')
     
-    # Debug information
-    print(f"Instructor: {instructor}")
-    print(f"Videos count: {videos.count()}")
-    for video in videos:
-        print(f"Video: {video.title}, Course: {video.course.title}, Instructor: {video.course.instructor}")
-    
     paginator = Paginator(videos, 12)  # Show 12 videos per page
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    trace(request, 'instructor=%s videos=%s page=%s', instructor.id, paginator.count, page_obj.number)
     
     context = {
         'instructor': instructor,
@@ -384,16 +387,59 @@ def schedule(request):
         messages.error(request, 'Instructor profile not found.')
         return redirect('instructors:dashboard')
     
-    # Get schedule events for this instructor
-    events = ScheduleEvent.objects.filter(instructor=instructor).select_related('course').order_by('start_time')
+    # Get this instructor's events in the requested week or month, with recurring series expanded
+    window = schedule_window(request)
+    events = expand(ScheduleEvent.objects.filter(instructor=instructor).select_related('course'), window['start'], window['end'])
     
     context = {
         'instructor': instructor,
         'events': events,
+        'window': window,
+        'feed_url': request.build_absolute_uri(reverse('instructors:calendar_feed', args=[feed_token(request.user)])),
     }
     return render(request, 'instructors/schedule.html', context)
 
 
+def calendar_feed(request, token):
+    """iCalendar feed of the next weeks of a user's schedule, authenticated by its token"""
+    user = user_for_token(token)
+    if user is None:
+        raise Http404('Unknown calendar feed.')
+
+    # Get the events of the instructor, or of the courses the student is enrolled in
+    instructor = Instructor.objects.filter(user=user).first()
+    student = Student.objects.filter(user=user).first()
+    if instructor:
+        events = ScheduleEvent.objects.filter(instructor=instructor).select_related('course')
+        name = f'{instructor.full_name} - Teaching Schedule'
+    elif student:
+        events = student_events(student)
+        name = f'{student.first_name} {student.last_name} - Course Schedule'
+    else:
+        raise Http404('Unknown calendar feed.')
+
+    try:
+        weeks = min(max(int(request.GET.get('weeks', FEED_WEEKS)), 1), MAX_FEED_WEEKS)
+    except ValueError:
+        weeks = FEED_WEEKS
+    window_start, window_end = upcoming_window(weeks * 7)
+
+    # Calendar clients poll; an unchanged window is answered with 304
+    etag = feed_etag(events, window_start, window_end, name)
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        return response
+
+    response = StreamingHttpResponse(
+        calendar_lines(events, window_start, window_end, name, request.get_host().split(':')[0]),
+        content_type='text/calendar; charset=utf-8',
+    )
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, max-age=900'
+    response['Content-Disposition'] = 'inline; filename="schedule.ics"'
+    return response
+
+
 @login_required
 def add_schedule_event(request):
     # Get the instructor profile
@@ -665,7 +711,7 @@ def add_video(request):
         return redirect('instructors:dashboard')
     
     if request.method == 'POST':
-        form = VideoForm(request.POST, request.FILES)
+        form = VideoForm(request.POST, request.FILES, user=request.user)
         if form.is_valid():
             video = form.save(commit=False)
             video.uploaded_by = request.user
@@ -61,7 +61,6 @@ TEMPLATES = [
         'DIRS': [
             BASE_DIR / 'templates',
         ],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -69,10 +68,22 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # The cached loader keeps compiled templates in memory for the
+            # lifetime of the process instead of re-parsing them per request.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
 
+# Compile every template under templates/ when the project starts, so a
+# syntax error stops the deploy instead of surfacing on the first request.
+PRECOMPILE_TEMPLATES = not DEBUG
+
 WSGI_APPLICATION = 'lms.wsgi.application'
 
 
@@ -83,6 +94,29 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock when a transaction starts so concurrent
+            # enrollments queue on the busy timeout instead of failing
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        'TEST': {
+            # A file, not shared-cache memory, so threaded tests can run concurrently
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
+    }
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# The course catalog and admin chart payloads are cached here. Point this at
+# a shared backend (e.g. Redis or Memcached) when running several processes.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'lms-default',
     }
 }
 
@@ -128,6 +162,55 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploaded files are stored once per distinct content under MEDIA_ROOT/.blobs/
+# and linked to their names, so duplicate uploads take no extra space
+STORAGES = {
+    'default': {
+        'BACKEND': 'courses.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# How protected media (video streams, material downloads) is delivered:
+# 'django' streams the file from the application, 'x-sendfile' hands the
+# transfer to Apache/lighttpd and 'x-accel-redirect' to nginx, which must map
+# MEDIA_ACCEL_REDIRECT_PREFIX as an internal location onto MEDIA_ROOT.
+MEDIA_SERVE_MODE = 'django'
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+
+# Resized WebP/JPEG copies of uploaded images are written next to the
+# original at these widths
+THUMBNAIL_WIDTHS = (40, 80, 160, 320, 640, 1280)
+
+# Post-upload work (file metadata, video duration, thumbnails) is queued in
+# the MediaJob table and run by `python manage.py run_workers`. Set
+# MEDIA_JOBS_EAGER to run jobs in the web process after commit instead.
+MEDIA_JOBS_EAGER = False
+MEDIA_WORKER_PROCESSES = 2
+
+# Opt-in request tracing (lms/tracing.py): the fraction of requests whose
+# trace lines are logged to the 'lms.trace' logger, e.g. 0.01 for 1%
+TRACE_SAMPLE_RATE = 0.0
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'lms.trace': {
+            'handlers': ['console'],
+            'level': 'DEBUG',
+            'propagate': False,
+        },
+    },
+}
+
 # Login URL
 LOGIN_URL = '/admin/login/'
 
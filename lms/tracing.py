@@ -0,0 +1,24 @@
+import logging
+import random
+
+from django.conf import settings
+
+logger = logging.getLogger('lms.trace')
+
+
+def is_traced(request):
+    """Decide once per request whether its trace lines are logged.
+
+    Tracing is off unless TRACE_SAMPLE_RATE is above zero and the 'lms.trace'
+    logger is enabled for DEBUG; a sampled request logs all of its lines.
+    """
+    if not hasattr(request, '_traced'):
+        rate = getattr(settings, 'TRACE_SAMPLE_RATE', 0.0)
+        request._traced = rate > 0 and logger.isEnabledFor(logging.DEBUG) and random.random() < rate
+    return request._traced
+
+
+def trace(request, message, *args):
+    """Log a debug line for a sampled request; arguments are only formatted when logged"""
+    if is_traced(request):
+        logger.debug('%s %s ' + message, request.method, request.path, *args)
@@ -0,0 +1,171 @@
+// Chart rendering for the admin dashboard and analytics pages.
+// Series are fetched from the JSON chart endpoints so the pages themselves
+// do not carry the chart data; the browser revalidates them with ETags.
+
+function fetchChart(url) {
+    return fetch(url, { credentials: 'same-origin' }).then(function(response) {
+        if (!response.ok) {
+            throw new Error('Chart request failed: ' + response.status);
+        }
+        return response.json();
+    });
+}
+
+function drawEnrollmentChart(months, enrollmentData) {
+    var ctx = document.getElementById("myAreaChart");
+    var myLineChart = new Chart(ctx, {
+        type: 'line',
+        data: {
+            labels: months,
+            datasets: [{
+                label: "Enrollments",
+                lineTension: 0.3,
+                backgroundColor: "rgba(78, 115, 223, 0.05)",
+                borderColor: "rgba(78, 115, 223, 1)",
+                pointRadius: 3,
+                pointBackgroundColor: "rgba(78, 115, 223, 1)",
+                pointBorderColor: "rgba(78, 115, 223, 1)",
+                pointHoverRadius: 3,
+                pointHoverBackgroundColor: "rgba(78, 115, 223, 1)",
+                pointHoverBorderColor: "rgba(78, 115, 223, 1)",
+                pointHitRadius: 10,
+                pointBorderWidth: 2,
+                data: enrollmentData,
+            }],
+        },
+        options: {
+            maintainAspectRatio: false,
+            layout: {
+                padding: {
+                    left: 10,
+                    right: 25,
+                    top: 25,
+                    bottom: 0
+                }
+            },
+            scales: {
+                xAxes: [{
+                    time: {
+                        unit: 'date'
+                    },
+                    gridLines: {
+                        display: false,
+                        drawBorder: false
+                    },
+                    ticks: {
+                        maxTicksLimit: 7
+                    }
+                }],
+                yAxes: [{
+                    ticks: {
+                        maxTicksLimit: 5,
+                        padding: 10,
+                        callback: function(value, index, values) {
+                            return value;
+                        }
+                    },
+                    gridLines: {
+                        color: "rgb(234, 236, 244)",
+                        zeroLineColor: "rgb(234, 236, 244)",
+                        drawBorder: false,
+                        borderDash: [2],
+                        zeroLineBorderDash: [2]
+                    }
+                }],
+            },
+            legend: {
+                display: false
+            },
+            tooltips: {
+                backgroundColor: "rgb(255,255,255)",
+                bodyFontColor: "#858796",
+                titleMarginBottom: 10,
+                titleFontColor: '#6e707e',
+                titleFontSize: 14,
+                borderColor: '#dddfeb',
+                borderWidth: 1,
+                xPadding: 15,
+                yPadding: 15,
+                displayColors: false,
+                intersect: false,
+                mode: 'index',
+                caretPadding: 10,
+                callbacks: {
+                    label: function(tooltipItem, chart) {
+                        var datasetLabel = chart.datasets[tooltipItem.datasetIndex].label || '';
+                        return datasetLabel + ': ' + tooltipItem.yLabel;
+                    }
+                }
+            }
+        }
+    });
+}
+
+function drawCategoryChart(categoryLabels, categoryData, categoryColors) {
+    var ctx = document.getElementById("myPieChart");
+    var myPieChart = new Chart(ctx, {
+        type: 'doughnut',
+        data: {
+            labels: categoryLabels,
+            datasets: [{
+                data: categoryData,
+                backgroundColor: categoryColors,
+                hoverBackgroundColor: categoryColors,
+                hoverBorderColor: "rgba(234, 236, 244, 1)",
+            }],
+        },
+        options: {
+            maintainAspectRatio: false,
+            tooltips: {
+                backgroundColor: "rgb(255,255,255)",
+                bodyFontColor: "#858796",
+                borderColor: '#dddfeb',
+                borderWidth: 1,
+                xPadding: 15,
+                yPadding: 15,
+                displayColors: false,
+                caretPadding: 10,
+            },
+            legend: {
+                display: false
+            },
+            cutoutPercentage: 80,
+        },
+    });
+}
+
+function renderCategoryLegend(container, labels, colors) {
+    if (!container) {
+        return;
+    }
+    container.innerHTML = '';
+    labels.forEach(function(label, i) {
+        var item = document.createElement('span');
+        item.className = 'mr-2';
+        var icon = document.createElement('i');
+        icon.className = 'bi bi-circle-fill';
+        icon.style.color = colors[i] || '#4e73df';
+        item.appendChild(icon);
+        item.appendChild(document.createTextNode(' ' + label));
+        container.appendChild(item);
+    });
+}
+
+function loadAdminCharts(urls) {
+    fetchChart(urls.enrollments)
+        .then(function(payload) {
+            drawEnrollmentChart(payload.labels, payload.data);
+        })
+        .catch(function(e) {
+            console.error('Error loading enrollment chart:', e);
+        });
+
+    fetchChart(urls.categories)
+        .then(function(payload) {
+            drawCategoryChart(payload.labels, payload.data, payload.colors);
+            renderCategoryLegend(document.getElementById('categoryLegend'), payload.labels, payload.colors);
+        })
+        .catch(function(e) {
+            console.error('Error loading category chart:', e);
+        });
+}
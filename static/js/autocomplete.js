@@ -0,0 +1,120 @@
+// Autocomplete for <select data-autocomplete-url="..."> elements.
+// The select only holds its current choice; typing in the search box
+// fetches matching options from the JSON endpoint, and picking one makes
+// it the select's only option. Extra data-autocomplete-* attributes
+// (e.g. data-autocomplete-course) are sent as query parameters.
+
+var AUTOCOMPLETE_DELAY = 200;
+
+function autocompleteParams(select, query) {
+    var params = new URLSearchParams();
+    params.set('q', query);
+    Object.keys(select.dataset).forEach(function(key) {
+        if (key.indexOf('autocomplete') === 0 && key !== 'autocompleteUrl') {
+            var name = key.slice('autocomplete'.length);
+            params.set(name.charAt(0).toLowerCase() + name.slice(1), select.dataset[key]);
+        }
+    });
+    return params.toString();
+}
+
+function autocompleteChoose(select, input, menu, id, text) {
+    var emptyOption = select.querySelector('option[value=""]');
+    Array.prototype.slice.call(select.options).forEach(function(option) {
+        if (option !== emptyOption) {
+            select.removeChild(option);
+        }
+    });
+    if (id !== '') {
+        var option = new Option(text, id, true, true);
+        select.appendChild(option);
+    } else if (emptyOption) {
+        emptyOption.selected = true;
+    }
+    input.value = id !== '' ? text : '';
+    menu.classList.add('d-none');
+    select.dispatchEvent(new Event('change'));
+}
+
+function initAutocomplete(select) {
+    var wrapper = document.createElement('div');
+    wrapper.className = 'position-relative';
+    var input = document.createElement('input');
+    input.type = 'search';
+    input.className = 'form-control';
+    input.autocomplete = 'off';
+    var emptyOption = select.querySelector('option[value=""]');
+    input.placeholder = emptyOption && emptyOption.text !== '---------' ? emptyOption.text : 'Type to search...';
+    if (select.value) {
+        input.value = select.options[select.selectedIndex].text;
+    }
+    var menu = document.createElement('div');
+    menu.className = 'list-group position-absolute w-100 shadow d-none';
+    menu.style.zIndex = 1050;
+    menu.style.maxHeight = '20rem';
+    menu.style.overflowY = 'auto';
+
+    select.parentNode.insertBefore(wrapper, select);
+    wrapper.appendChild(input);
+    wrapper.appendChild(menu);
+    wrapper.appendChild(select);
+    select.classList.add('d-none');
+    if (select.id) {
+        // Keep <label for="..."> pointing at something focusable
+        input.id = select.id + '_search';
+        var label = document.querySelector('label[for="' + select.id + '"]');
+        if (label) {
+            label.htmlFor = input.id;
+        }
+    }
+
+    var timer = null;
+    var latest = 0;
+    input.addEventListener('input', function() {
+        clearTimeout(timer);
+        var query = input.value.trim();
+        if (!query) {
+            autocompleteChoose(select, input, menu, '', '');
+            return;
+        }
+        timer = setTimeout(function() {
+            var request = ++latest;
+            fetch(select.dataset.autocompleteUrl + '?' + autocompleteParams(select, query), {credentials: 'same-origin'})
+                .then(function(response) { return response.json(); })
+                .then(function(data) {
+                    // Ignore answers to searches the user has already typed past
+                    if (request !== latest) {
+                        return;
+                    }
+                    menu.innerHTML = '';
+                    (data.results || []).forEach(function(result) {
+                        var item = document.createElement('button');
+                        item.type = 'button';
+                        item.className = 'list-group-item list-group-item-action';
+                        item.textContent = result.text;
+                        item.addEventListener('mousedown', function(event) {
+                            event.preventDefault();
+                            autocompleteChoose(select, input, menu, String(result.id), result.text);
+                        });
+                        menu.appendChild(item);
+                    });
+                    if (!menu.children.length) {
+                        var empty = document.createElement('div');
+                        empty.className = 'list-group-item text-muted';
+                        empty.textContent = 'No matches';
+                        menu.appendChild(empty);
+                    }
+                    menu.classList.remove('d-none');
+                });
+        }, AUTOCOMPLETE_DELAY);
+    });
+    input.addEventListener('blur', function() {
+        menu.classList.add('d-none');
+        // Leaving the box without picking restores the current choice
+        input.value = select.value ? select.options[select.selectedIndex].text : '';
+    });
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('select[data-autocomplete-url]').forEach(initAutocomplete);
+});
@@ -0,0 +1,138 @@
+// Resumable chunked uploads for the video forms.
+// When a video file is chosen, it is sent to the upload API in chunks.
+// The form is then submitted with the upload id instead of the file.
+// An interrupted upload resumes from the server's offset when the same
+// file is submitted again.
+
+function chunkedUploadKey(file) {
+    return 'chunked-upload:' + file.name + ':' + file.size + ':' + file.lastModified;
+}
+
+function chunkedUploadRequest(url, options) {
+    options.credentials = 'same-origin';
+    return fetch(url, options).then(function(response) {
+        return response.json().then(function(data) {
+            if (!response.ok) {
+                throw new Error(data.error || ('Upload request failed: ' + response.status));
+            }
+            return data;
+        });
+    });
+}
+
+function sha256Hex(buffer) {
+    // SubtleCrypto is only available on secure origins; the checksum is optional
+    if (!window.crypto || !window.crypto.subtle) {
+        return Promise.resolve('');
+    }
+    return window.crypto.subtle.digest('SHA-256', buffer).then(function(digest) {
+        return Array.prototype.map.call(new Uint8Array(digest), function(byte) {
+            return ('0' + byte.toString(16)).slice(-2);
+        }).join('');
+    });
+}
+
+function startOrResumeUpload(startUrl, file, csrfToken) {
+    var statusUrl = localStorage.getItem(chunkedUploadKey(file));
+    var start = function() {
+        var data = new FormData();
+        data.append('filename', file.name);
+        data.append('size', file.size);
+        return chunkedUploadRequest(startUrl, {
+            method: 'POST',
+            headers: { 'X-CSRFToken': csrfToken },
+            body: data
+        }).then(function(status) {
+            localStorage.setItem(chunkedUploadKey(file), status.upload_url);
+            return status;
+        });
+    };
+    if (!statusUrl) {
+        return start();
+    }
+    return chunkedUploadRequest(statusUrl, { method: 'GET' }).then(function(status) {
+        return status.status === 'uploading' || status.status === 'complete' ? status : start();
+    }, start);
+}
+
+function sendChunks(status, file, csrfToken, onProgress) {
+    if (status.status !== 'uploading' || status.offset >= file.size) {
+        return Promise.resolve(status);
+    }
+    var end = Math.min(status.offset + status.chunk_size, file.size);
+    return file.slice(status.offset, end).arrayBuffer().then(function(buffer) {
+        return sha256Hex(buffer).then(function(checksum) {
+            var headers = { 'X-CSRFToken': csrfToken, 'Upload-Offset': status.offset };
+            if (checksum) {
+                headers['Upload-Checksum'] = checksum;
+            }
+            return chunkedUploadRequest(status.upload_url, { method: 'PUT', headers: headers, body: buffer });
+        });
+    }).then(function(next) {
+        onProgress(next.offset, file.size);
+        return sendChunks(next, file, csrfToken, onProgress);
+    });
+}
+
+function initChunkedUpload(form) {
+    var fileInput = form.querySelector('input[type="file"][name="video_file"]');
+    var uploadIdInput = form.querySelector('input[name="upload_id"]');
+    var progress = form.querySelector('.chunked-upload-progress');
+    var progressBar = progress ? progress.querySelector('.progress-bar') : null;
+    var startUrl = form.getAttribute('data-chunked-upload-url');
+    if (!fileInput || !uploadIdInput || !startUrl || !window.fetch || !window.Blob.prototype.arrayBuffer) {
+        return;
+    }
+
+    form.addEventListener('submit', function(event) {
+        var file = fileInput.files[0];
+        if (!file || uploadIdInput.value) {
+            return;
+        }
+        event.preventDefault();
+
+        var csrfToken = form.querySelector('[name="csrfmiddlewaretoken"]').value;
+        var submitButton = form.querySelector('[type="submit"]');
+        if (submitButton) {
+            submitButton.disabled = true;
+        }
+        if (progress) {
+            progress.classList.remove('d-none');
+        }
+        var onProgress = function(sent, total) {
+            if (progressBar) {
+                var percent = total ? Math.floor(sent * 100 / total) : 100;
+                progressBar.style.width = percent + '%';
+                progressBar.textContent = percent + '%';
+            }
+        };
+
+        startOrResumeUpload(startUrl, file, csrfToken).then(function(status) {
+            onProgress(status.offset, file.size);
+            return sendChunks(status, file, csrfToken, onProgress);
+        }).then(function(status) {
+            if (status.status === 'complete') {
+                return status;
+            }
+            return chunkedUploadRequest(status.complete_url, {
+                method: 'POST',
+                headers: { 'X-CSRFToken': csrfToken }
+            });
+        }).then(function(status) {
+            localStorage.removeItem(chunkedUploadKey(file));
+            uploadIdInput.value = status.upload_id;
+            // The file is already on the server, so it is not posted again
+            fileInput.value = '';
+            form.submit();
+        }).catch(function(error) {
+            if (submitButton) {
+                submitButton.disabled = false;
+            }
+            alert('Video upload failed: ' + error.message + '\nSubmit the form again to resume.');
+        });
+    });
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('form[data-chunked-upload-url]').forEach(initChunkedUpload);
+});
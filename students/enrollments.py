@@ -0,0 +1,239 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from admin_panel.charts import invalidate_charts
+from courses.models import Course
+
+from .feed import invalidate_course_ids, invalidate_many_course_ids
+from .models import Enrollment, Student, WaitlistEntry
+
+BULK_BATCH_SIZE = 500
+
+# Outcomes of enroll()
+CREATED = 'created'
+EXISTING = 'existing'
+REACTIVATED = 'reactivated'
+FULL = 'full'
+WAITLISTED = 'waitlisted'
+
+
+class CourseFull(Exception):
+    pass
+
+
+def reserve_seat(course_id):
+    """Take a seat with one conditional UPDATE; returns False when the course is full"""
+    return bool(
+        Course.objects.filter(
+            Q(max_seats__isnull=True) | Q(seats_taken__lt=F('max_seats')),
+            pk=course_id,
+        ).update(seats_taken=F('seats_taken') + 1)
+    )
+
+
+def release_seat(course_id):
+    Course.objects.filter(pk=course_id, seats_taken__gt=0).update(seats_taken=F('seats_taken') - 1)
+
+
+def recount_seats(course_id):
+    """Reset a course's seat counter from its rows, e.g. after bulk changes that skip signals"""
+    taken = Enrollment.objects.filter(course=OuterRef('pk')).exclude(
+        completion_status='dropped'
+    ).values('course').annotate(count=Count('id')).values('count')
+    Course.objects.filter(pk=course_id).update(seats_taken=Coalesce(Subquery(taken), 0))
+
+
+def _reactivate(enrollments):
+    """Move dropped enrollments back to enrolled/in progress; returns the number changed"""
+    return enrollments.filter(completion_status='dropped').update(
+        completion_status=Case(
+            When(completed_lessons__gt=0, then=Value('in_progress')),
+            default=Value('enrolled'),
+        ),
+        updated_at=timezone.now(),
+    )
+
+
+def enroll(student, course, waitlist=False):
+    """Enroll a student, returning (enrollment or None, outcome).
+
+    The insert runs first inside a savepoint and the (student, course)
+    unique constraint decides duplicates, so repeated clicks cost one
+    failed insert instead of a check-then-insert race. A seat is then
+    reserved on the course counter; when none is left the savepoint is
+    rolled back and the outcome is FULL, or WAITLISTED if `waitlist` is
+    set. A dropped enrollment is reactivated if a seat is free.
+    """
+    try:
+        with transaction.atomic():
+            enrollment = Enrollment(student=student, course=course)
+            # The seat is counted here, not by the post_save signal
+            enrollment._seat_reserved = True
+            enrollment.save(force_insert=True)
+            if not reserve_seat(course.pk):
+                raise CourseFull
+        WaitlistEntry.objects.filter(student=student, course=course).delete()
+        return enrollment, CREATED
+    except CourseFull:
+        return join_waitlist(student, course) if waitlist else (None, FULL)
+    except IntegrityError:
+        pass
+
+    enrollment = Enrollment.objects.get(student=student, course=course)
+    if enrollment.completion_status != 'dropped':
+        return enrollment, EXISTING
+    with transaction.atomic():
+        reserved = reserve_seat(course.pk)
+        if reserved and not _reactivate(Enrollment.objects.filter(pk=enrollment.pk)):
+            # Someone else reactivated it first
+            release_seat(course.pk)
+            return enrollment, EXISTING
+    if not reserved:
+        return join_waitlist(student, course) if waitlist else (enrollment, FULL)
+    WaitlistEntry.objects.filter(student=student, course=course).delete()
+    invalidate_course_ids(student.pk)
+    # _reactivate() is a queryset update, so the Enrollment receivers did not run
+    invalidate_charts()
+    enrollment.refresh_from_db()
+    return enrollment, REACTIVATED
+
+
+def join_waitlist(student, course):
+    """Queue a student for a full course; returns (enrollment or None, outcome)"""
+    WaitlistEntry.objects.get_or_create(student=student, course=course)
+    # A seat may have been freed after our reservation failed
+    for enrollment in promote_from_waitlist(course.pk):
+        if enrollment.student_id == student.pk:
+            return enrollment, CREATED
+    return None, WAITLISTED
+
+
+def waitlist_position(student, course):
+    """1-based place of the student in the course's waitlist, or None"""
+    entry = WaitlistEntry.objects.filter(student=student, course=course).first()
+    if entry is None:
+        return None
+    return WaitlistEntry.objects.filter(course=course).filter(
+        Q(created_at__lt=entry.created_at) | Q(created_at=entry.created_at, id__lt=entry.id)
+    ).count() + 1
+
+
+def _seat_student(student_id, course_id):
+    """Give an already reserved seat to a student; returns the enrollment or None"""
+    try:
+        with transaction.atomic():
+            enrollment = Enrollment(student_id=student_id, course_id=course_id)
+            enrollment._seat_reserved = True
+            enrollment.save(force_insert=True)
+        return enrollment
+    except IntegrityError:
+        pass
+    enrollments = Enrollment.objects.filter(student_id=student_id, course_id=course_id)
+    if not _reactivate(enrollments):
+        # Enrolled some other way while waiting
+        return None
+    invalidate_course_ids(student_id)
+    # _reactivate() is a queryset update, so the Enrollment receivers did not run
+    invalidate_charts()
+    return enrollments.get()
+
+
+def promote_from_waitlist(course_id):
+    """Enroll the oldest waitlisted students into free seats; returns the new enrollments.
+
+    Each promotion reserves a seat with the same conditional UPDATE as
+    enroll() and claims its waitlist entry with a DELETE, so concurrent
+    promoters never hand out a seat twice or promote a student twice.
+    """
+    promoted = []
+    while True:
+        entry = WaitlistEntry.objects.filter(course_id=course_id).order_by('created_at', 'id').first()
+        if entry is None:
+            break
+        with transaction.atomic():
+            if not reserve_seat(course_id):
+                break
+            claimed, _ = WaitlistEntry.objects.filter(pk=entry.pk).delete()
+            enrollment = _seat_student(entry.student_id, course_id) if claimed else None
+            if enrollment is None:
+                release_seat(course_id)
+                continue
+        promoted.append(enrollment)
+    return promoted
+
+
+def schedule_promotion(course_id):
+    """Promote from the waitlist once the current transaction has freed its seats"""
+    transaction.on_commit(lambda: promote_from_waitlist(course_id))
+
+
+# Statuses a whole cohort can be moved to
+BULK_STATUSES = ('dropped', 'completed')
+
+
+def parse_student_ids(text):
+    """Split pasted or uploaded student IDs on commas, semicolons and whitespace"""
+    for separator in ',;':
+        text = text.replace(separator, ' ')
+    return list(dict.fromkeys(text.split()))
+
+
+def resolve_student_ids(codes):
+    """Map student ID codes to primary keys; returns (pks, unknown codes)"""
+    found = dict(Student.objects.filter(student_id__in=codes).values_list('student_id', 'pk'))
+    unknown = [code for code in codes if code not in found]
+    return list(found.values()), unknown
+
+
+def _invalidate_after_bulk(student_ids):
+    """Bulk writes skip the Enrollment signals, so clear what their receivers would"""
+    invalidate_many_course_ids(student_ids)
+    invalidate_charts()
+
+
+def bulk_enroll(course, student_ids):
+    """Enroll many students in one transaction; returns (inserted, reactivated, skipped).
+
+    `student_ids` is a list of primary keys or a flat values_list() of
+    students, which the lookups then use as a subquery. Dropped enrollments
+    are reactivated and active ones left untouched: the insert ignores
+    conflicts on (student, course) instead of checking each pair first.
+    """
+    pks = list(dict.fromkeys(student_ids))
+    if not pks:
+        return 0, 0, 0
+    enrollments = Enrollment.objects.filter(course=course, student_id__in=student_ids)
+    with transaction.atomic():
+        reactivated = _reactivate(enrollments)
+        before = enrollments.count()
+        Enrollment.objects.bulk_create(
+            [Enrollment(student_id=student_id, course=course) for student_id in pks],
+            batch_size=BULK_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        inserted = enrollments.count() - before
+        # Admin cohorts may overbook; the counter just follows the rows
+        recount_seats(course.pk)
+        transaction.on_commit(lambda: _invalidate_after_bulk(pks))
+    return inserted, reactivated, len(pks) - inserted - reactivated
+
+
+def bulk_set_status(course, student_ids, status):
+    """Drop or complete the enrollments of many students (as for bulk_enroll); returns the number changed"""
+    if status not in BULK_STATUSES:
+        raise ValueError(f'Unsupported bulk status {status!r}')
+    enrollments = Enrollment.objects.filter(course=course, student_id__in=student_ids).exclude(
+        completion_status=status
+    )
+    changes = {'completion_status': status, 'updated_at': timezone.now()}
+    if status == 'completed':
+        changes['completed_at'] = Coalesce(F('completed_at'), Value(timezone.now()))
+    with transaction.atomic():
+        updated = enrollments.update(**changes)
+        recount_seats(course.pk)
+        if status == 'dropped':
+            schedule_promotion(course.pk)
+        transaction.on_commit(lambda: _invalidate_after_bulk(student_ids))
+    return updated
@@ -0,0 +1,96 @@
+import heapq
+
+from django.core.cache import cache
+from django.urls import reverse
+
+from courses.models import Material, Video
+from instructors.models import ScheduleEvent
+
+from .models import Enrollment
+
+# Course-ID sets are invalidated on enrollment changes, the timeout only bounds memory use
+COURSE_IDS_CACHE_TIMEOUT = 60 * 60
+FEED_LIMIT = 10
+
+
+def _course_ids_key(student_id):
+    return f'students:course_ids:{student_id}'
+
+
+def active_enrollments(student):
+    """Enrollments that still give access to course content"""
+    return Enrollment.objects.filter(student=student).exclude(completion_status='dropped')
+
+
+def get_course_ids(student):
+    """Return the cached set of course IDs the student is actively enrolled in"""
+    key = _course_ids_key(student.pk)
+    course_ids = cache.get(key)
+    if course_ids is None:
+        course_ids = frozenset(active_enrollments(student).values_list('course_id', flat=True))
+        cache.set(key, course_ids, COURSE_IDS_CACHE_TIMEOUT)
+    return course_ids
+
+
+def invalidate_course_ids(student_id):
+    cache.delete(_course_ids_key(student_id))
+
+
+def invalidate_many_course_ids(student_ids):
+    """For bulk writes, which skip the enrollment signals"""
+    cache.delete_many([_course_ids_key(student_id) for student_id in student_ids])
+
+
+def for_student(queryset, student):
+    """Limit a queryset of course content to the student's courses in the same query"""
+    return queryset.filter(course_id__in=active_enrollments(student).values('course_id'))
+
+
+def student_materials(student):
+    return for_student(Material.objects.filter(is_active=True), student).select_related('course').order_by('-created_at')
+
+
+def student_videos(student):
+    return for_student(Video.objects.filter(is_active=True), student).select_related('course').order_by('-created_at')
+
+
+def student_events(student):
+    return for_student(ScheduleEvent.objects.all(), student).select_related('course', 'instructor').order_by('start_time')
+
+
+def whats_new(student, limit=FEED_LIMIT):
+    """Newest materials, videos and schedule events across the student's courses.
+
+    Each source contributes at most `limit` rows and the sorted streams are
+    merged, so the feed costs three small queries however much content
+    the courses hold.
+    """
+    def items(queryset, kind, url):
+        for obj in queryset.select_related('course').order_by('-created_at')[:limit]:
+            yield {
+                'kind': kind,
+                'title': obj.title,
+                'course': obj.course,
+                'created_at': obj.created_at,
+                'url': url(obj),
+            }
+
+    streams = [
+        items(
+            for_student(Material.objects.filter(is_active=True), student),
+            'material',
+            lambda material: reverse('students:material_download', args=[material.id]) + '?inline=1',
+        ),
+        items(
+            for_student(Video.objects.filter(is_active=True), student),
+            'video',
+            lambda video: reverse('students:video_detail', args=[video.id]),
+        ),
+        items(
+            for_student(ScheduleEvent.objects.all(), student),
+            'event',
+            lambda event: reverse('students:schedule'),
+        ),
+    ]
+    merged = heapq.merge(*streams, key=lambda item: item['created_at'], reverse=True)
+    return [item for _, item in zip(range(limit), merged)]
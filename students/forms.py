@@ -1,7 +1,8 @@
 from django import forms
-from .models import Attendance, TrainerAttendance
+from .models import Attendance, Student, TrainerAttendance
 from courses.models import Course
 from instructors.models import Instructor
+from admin_panel.widgets import AutocompleteSelect
 
 
 class AttendanceForm(forms.ModelForm):
@@ -9,8 +10,8 @@ class AttendanceForm(forms.ModelForm):
         model = Attendance
         fields = ['student', 'course', 'session_date', 'status', 'notes']
         widgets = {
-            'student': forms.Select(attrs={'class': 'form-control'}),
-            'course': forms.Select(attrs={'class': 'form-control'}),
+            'student': AutocompleteSelect('students'),
+            'course': AutocompleteSelect('courses'),
             'session_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
             'status': forms.Select(attrs={'class': 'form-control'}),
             'notes': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
@@ -22,9 +23,11 @@ class AttendanceForm(forms.ModelForm):
         
         if course:
             # Filter students to only those enrolled in this course
-            self.fields['student'].queryset = course.enrollments.filter(
-                completion_status__in=['enrolled', 'in_progress']
-            ).select_related('student').values_list('student', flat=True)
+            self.fields['student'].queryset = Student.objects.filter(
+                enrollments__course=course,
+                enrollments__completion_status__in=['enrolled', 'in_progress']
+            )
+            self.fields['student'].widget.params = {'course': course.pk}
             self.fields['course'].initial = course
             self.fields['course'].widget = forms.HiddenInput()
 
@@ -61,8 +64,8 @@ class TrainerAttendanceForm(forms.ModelForm):
         model = TrainerAttendance
         fields = ['trainer', 'course', 'session_date', 'status', 'notes']
         widgets = {
-            'trainer': forms.Select(attrs={'class': 'form-control'}),
-            'course': forms.Select(attrs={'class': 'form-control'}),
+            'trainer': AutocompleteSelect('instructors'),
+            'course': AutocompleteSelect('courses'),
             'session_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
             'status': forms.Select(attrs={'class': 'form-control'}),
             'notes': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
@@ -0,0 +1,213 @@
+import asyncio
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+DEFAULT_PATHS = [
+    '/students/dashboard/',
+    '/students/my-courses/',
+    '/students/assignments/',
+    '/students/materials/',
+    '/students/videos/',
+]
+HOST = 'localhost'
+
+
+def _wsgi_call(handler, path, cookie):
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': HOST,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': HOST,
+        'HTTP_COOKIE': cookie,
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': BytesIO(),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    statuses = []
+    start = time.perf_counter()
+    response = handler(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    try:
+        for _ in response:
+            pass
+    finally:
+        response.close()
+    return time.perf_counter() - start, statuses[0]
+
+
+async def _asgi_call(handler, path, cookie):
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', HOST.encode()), (b'cookie', cookie.encode())],
+        'client': ('127.0.0.1', 0),
+        'server': (HOST, 80),
+    }
+    received = False
+    finished = asyncio.Event()
+    status = None
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await finished.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        elif not message.get('more_body'):
+            finished.set()
+
+    start = time.perf_counter()
+    await handler(scope, receive, send)
+    return time.perf_counter() - start, status
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def _http_call(base_url, path, cookie):
+    request = urllib.request.Request(base_url.rstrip('/') + path, headers={'Cookie': cookie})
+    start = time.perf_counter()
+    # Redirects are not followed, so a login redirect shows up as a 302
+    opener = urllib.request.build_opener(_NoRedirect)
+    try:
+        with opener.open(request) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as exc:
+        status = exc.code
+    return time.perf_counter() - start, status
+
+
+class Command(BaseCommand):
+    help = 'Measure p50/p99 latency of the student views under concurrent load through the WSGI and ASGI handlers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Username of a student to request the pages as',
+            required=True
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            help='Number of requests per path and handler',
+            default=200
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            help='Number of requests in flight at once',
+            default=20
+        )
+        parser.add_argument(
+            '--path',
+            action='append',
+            help='Path to request (repeatable, defaults to the student dashboard and list pages)',
+            default=None
+        )
+        parser.add_argument(
+            '--url',
+            action='append',
+            help='Benchmark running servers over HTTP instead, e.g. --url http://127.0.0.1:8000 '
+                 '(gunicorn, WSGI) --url http://127.0.0.1:8001 (uvicorn, ASGI)',
+            default=None
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f'User "{options["user"]}" does not exist.')
+
+        total = max(options['requests'], 1)
+        concurrency = max(options['concurrency'], 1)
+        paths = options['path'] or DEFAULT_PATHS
+
+        # Log the user in once and share the session cookie between all requests
+        client = Client()
+        client.force_login(user)
+        session_key = client.cookies[settings.SESSION_COOKIE_NAME].value
+        cookie = f'{settings.SESSION_COOKIE_NAME}={session_key}'
+
+        if options['url']:
+            targets = [(url, self._run_http, url) for url in options['url']]
+        else:
+            targets = [
+                ('WSGI', self._run_wsgi, WSGIHandler()),
+                ('ASGI', self._run_asgi, ASGIHandler()),
+            ]
+
+        self.stdout.write(f'{total} requests per path, {concurrency} concurrent')
+        self.stdout.write(f'{"Path":<28} {"Handler":<24} {"p50 ms":>8} {"p99 ms":>8} {"req/s":>8} {"Errors":>7}')
+        try:
+            for path in paths:
+                for label, run, target in targets:
+                    # One unmeasured request warms up templates and caches
+                    run(target, path, cookie, 1, 1)
+                    start = time.perf_counter()
+                    results = run(target, path, cookie, total, concurrency)
+                    elapsed = time.perf_counter() - start
+
+                    latencies = sorted(latency * 1000 for latency, _ in results)
+                    percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+                    errors = sum(1 for _, status in results if str(status)[:3] != '200')
+                    self.stdout.write(
+                        f'{path:<28} {label:<24} {percentiles[49]:>8.1f} {percentiles[98]:>8.1f} '
+                        f'{len(results) / elapsed:>8.1f} {errors:>7}'
+                    )
+        finally:
+            Session.objects.filter(session_key=session_key).delete()
+
+    def _run_wsgi(self, handler, path, cookie, total, concurrency):
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(lambda _: _wsgi_call(handler, path, cookie), range(total)))
+
+    def _run_asgi(self, handler, path, cookie, total, concurrency):
+        async def run():
+            limit = asyncio.Semaphore(concurrency)
+
+            async def one():
+                async with limit:
+                    return await _asgi_call(handler, path, cookie)
+
+            return await asyncio.gather(*(one() for _ in range(total)))
+
+        return asyncio.run(run())
+
+    def _run_http(self, base_url, path, cookie, total, concurrency):
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(lambda _: _http_call(base_url, path, cookie), range(total)))
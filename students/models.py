@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import User
 
 
@@ -23,6 +24,15 @@ class Student(models.Model):
     def full_name(self):
         return f"{self.first_name} {self.last_name}"
 
+    class Meta:
+        indexes = [
+            # Case-insensitive prefix search (admin_panel.autocomplete) compares Lower() ranges
+            models.Index(Lower('student_id'), name='student_student_id_lower'),
+            models.Index(Lower('first_name'), name='student_first_name_lower'),
+            models.Index(Lower('last_name'), name='student_last_name_lower'),
+            models.Index(Lower('email'), name='student_email_lower'),
+        ]
+
 
 class Enrollment(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='enrollments')
@@ -39,6 +49,8 @@ class Enrollment(models.Model):
         default='enrolled'
     )
     progress = models.IntegerField(default=0)  # Percentage
+    # Completed published lessons, kept in step with LessonProgress rows
+    completed_lessons = models.PositiveIntegerField(default=0)
     completed_at = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -50,6 +62,34 @@ class Enrollment(models.Model):
         unique_together = ('student', 'course')
 
 
+class WaitlistEntry(models.Model):
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='waitlist_entries')
+    course = models.ForeignKey('courses.Course', on_delete=models.CASCADE, related_name='waitlist')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.student.first_name} {self.student.last_name} - {self.course.title} (waitlist)"
+
+    class Meta:
+        ordering = ['created_at', 'id']
+        unique_together = ('student', 'course')
+        indexes = [
+            models.Index(fields=['course', 'created_at']),
+        ]
+
+
+class LessonProgress(models.Model):
+    enrollment = models.ForeignKey(Enrollment, on_delete=models.CASCADE, related_name='lesson_progress')
+    lesson = models.ForeignKey('courses.Lesson', on_delete=models.CASCADE, related_name='progress_records')
+    completed_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.enrollment} - {self.lesson.title}"
+
+    class Meta:
+        unique_together = ('enrollment', 'lesson')
+
+
 class AssignmentSubmission(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='submissions')
     assignment = models.ForeignKey('Assignment', on_delete=models.CASCADE, related_name='submissions')
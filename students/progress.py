@@ -0,0 +1,96 @@
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Least
+from django.utils import timezone
+
+from courses.models import Lesson
+from courses.outline import get_course_outline
+
+from .models import Enrollment, LessonProgress
+
+
+def published_lesson_total(course_id):
+    """Number of published lessons, read from the cached course outline"""
+    return get_course_outline(course_id)['published_lesson_count']
+
+
+def progress_percent(completed, total):
+    if not total:
+        return 0
+    return min(completed * 100 // total, 100)
+
+
+def _apply_progress(enrollment, delta):
+    """Move the completed-lesson counter by `delta` and update progress and status"""
+    Enrollment.objects.filter(pk=enrollment.pk).update(completed_lessons=F('completed_lessons') + delta)
+    enrollment.completed_lessons = Enrollment.objects.values_list('completed_lessons', flat=True).get(pk=enrollment.pk)
+    enrollment.progress = progress_percent(enrollment.completed_lessons, published_lesson_total(enrollment.course_id))
+
+    # Dropped enrollments keep their status
+    if enrollment.completion_status != 'dropped':
+        if enrollment.progress >= 100:
+            if enrollment.completion_status != 'completed':
+                enrollment.completed_at = timezone.now()
+            enrollment.completion_status = 'completed'
+        else:
+            enrollment.completion_status = 'in_progress' if enrollment.completed_lessons else 'enrolled'
+            enrollment.completed_at = None
+    enrollment.save(update_fields=['completed_lessons', 'progress', 'completion_status', 'completed_at', 'updated_at'])
+
+
+def mark_lesson_complete(enrollment, lesson):
+    """Record a lesson as completed; returns False if it already was.
+
+    Costs a fixed handful of queries however large the course is: the
+    lesson total comes from the cached outline and the completed count is
+    a counter on the enrollment.
+    """
+    if not lesson.is_published:
+        return False
+    with transaction.atomic():
+        _, created = LessonProgress.objects.get_or_create(enrollment=enrollment, lesson=lesson)
+        if created:
+            _apply_progress(enrollment, 1)
+    return created
+
+
+def mark_lesson_incomplete(enrollment, lesson):
+    """Remove a lesson completion; returns False if there was none"""
+    with transaction.atomic():
+        deleted, _ = LessonProgress.objects.filter(enrollment=enrollment, lesson=lesson).delete()
+        if deleted and lesson.is_published:
+            _apply_progress(enrollment, -1)
+    return bool(deleted)
+
+
+def refresh_course_progress(course_id):
+    """Recount completions and progress for every enrollment in a course.
+
+    Only needed when the course's lessons change (publish, unpublish or
+    delete); it runs as set-based UPDATEs rather than per enrollment.
+    """
+    total = Lesson.objects.filter(module__course_id=course_id, is_published=True).count()
+    completed = LessonProgress.objects.filter(
+        enrollment=OuterRef('pk'),
+        lesson__is_published=True,
+    ).values('enrollment').annotate(count=Count('id')).values('count')
+
+    enrollments = Enrollment.objects.filter(course_id=course_id)
+    enrollments.update(completed_lessons=Coalesce(Subquery(completed, output_field=IntegerField()), 0))
+    if total:
+        enrollments.update(progress=Least(F('completed_lessons') * 100 / total, Value(100)))
+    else:
+        enrollments.update(progress=0)
+
+    active = enrollments.exclude(completion_status='dropped')
+    active.filter(progress__gte=100).exclude(completion_status='completed').update(
+        completion_status='completed',
+        completed_at=timezone.now(),
+    )
+    active.filter(progress__lt=100).update(
+        completion_status=Case(
+            When(completed_lessons__gt=0, then=Value('in_progress')),
+            default=Value('enrolled'),
+        ),
+        completed_at=None,
+    )
@@ -0,0 +1,90 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from courses.models import Course, Lesson, Module
+
+from .enrollments import release_seat, schedule_promotion
+from .feed import invalidate_course_ids
+from .models import Enrollment
+from .progress import refresh_course_progress
+
+
+@receiver([post_save, post_delete], sender=Enrollment)
+def refresh_course_ids(sender, instance, **kwargs):
+    """Drop the student's cached course-ID set when an enrollment changes"""
+    invalidate_course_ids(instance.student_id)
+
+
+@receiver(post_init, sender=Enrollment)
+def remember_enrollment_status(sender, instance, **kwargs):
+    if 'completion_status' not in instance.get_deferred_fields():
+        instance._old_status = instance.completion_status
+
+
+@receiver(post_save, sender=Enrollment)
+def count_seat_on_save(sender, instance, created, **kwargs):
+    """Keep Course.seats_taken in step with enrollments saved outside enroll()"""
+    old_status = None if created else getattr(instance, '_old_status', None)
+    instance._old_status = instance.completion_status
+    if getattr(instance, '_seat_reserved', False):
+        instance._seat_reserved = False
+        return
+    was_seated = old_status is not None and old_status != 'dropped'
+    is_seated = instance.completion_status != 'dropped'
+    if is_seated and not was_seated and (created or old_status == 'dropped'):
+        Course.objects.filter(pk=instance.course_id).update(seats_taken=F('seats_taken') + 1)
+    elif was_seated and not is_seated:
+        release_seat(instance.course_id)
+        schedule_promotion(instance.course_id)
+
+
+@receiver(post_delete, sender=Enrollment)
+def release_seat_on_delete(sender, instance, **kwargs):
+    if instance.completion_status != 'dropped':
+        release_seat(instance.course_id)
+        schedule_promotion(instance.course_id)
+
+
+@receiver(post_init, sender=Course)
+def remember_max_seats(sender, instance, **kwargs):
+    if 'max_seats' not in instance.get_deferred_fields():
+        instance._old_max_seats = instance.max_seats
+
+
+@receiver(post_save, sender=Course)
+def promote_on_more_seats(sender, instance, created, **kwargs):
+    """Fill newly added seats from the waitlist when a course's limit is raised or removed"""
+    old_max_seats = getattr(instance, '_old_max_seats', None)
+    instance._old_max_seats = instance.max_seats
+    if created or old_max_seats is None:
+        return
+    if instance.max_seats is None or instance.max_seats > old_max_seats:
+        schedule_promotion(instance.pk)
+
+
+@receiver(post_init, sender=Lesson)
+def remember_lesson_published(sender, instance, **kwargs):
+    if 'is_published' not in instance.get_deferred_fields():
+        instance._was_published = instance.is_published
+
+
+def _refresh_lesson_course(lesson):
+    course_id = Module.objects.filter(id=lesson.module_id).values_list('course_id', flat=True).first()
+    if course_id is not None:
+        refresh_course_progress(course_id)
+
+
+@receiver(post_save, sender=Lesson)
+def refresh_progress_on_publish(sender, instance, created, **kwargs):
+    """Recompute course progress when a lesson is published or unpublished"""
+    was_published = False if created else getattr(instance, '_was_published', None)
+    instance._was_published = instance.is_published
+    if was_published != instance.is_published:
+        _refresh_lesson_course(instance)
+
+
+@receiver(post_delete, sender=Lesson)
+def refresh_progress_on_delete(sender, instance, **kwargs):
+    if instance.is_published:
+        _refresh_lesson_course(instance)
@@ -1,3 +1,301 @@
-from django.test import TestCase
+import threading
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from courses.models import Category, Course, Lesson, Module
+from instructors.models import Instructor
+from admin_panel.forms import CourseForm
+from students.enrollments import (
+    CREATED, EXISTING, FULL, REACTIVATED, WAITLISTED, bulk_enroll, enroll, promote_from_waitlist,
+)
+from students.models import Enrollment, LessonProgress, Student, WaitlistEntry
+from students.progress import mark_lesson_complete, mark_lesson_incomplete
+
+
+def make_course(**kwargs):
+    instructor = Instructor.objects.create(
+        user=User.objects.create_user('trainer'),
+        instructor_id='I-1',
+        first_name='Tess',
+        last_name='Trainer',
+        email='trainer@example.com',
+    )
+    category = Category.objects.create(name='Testing')
+    return Course.objects.create(
+        title='Limited Cohort',
+        code='LIM-1',
+        description='',
+        category=category,
+        instructor=instructor,
+        price=Decimal('0'),
+        is_published=True,
+        **kwargs
+    )
+
+
+def make_student(number):
+    return Student.objects.create(
+        user=User.objects.create_user(f'student{number}'),
+        student_id=f'S-{number}',
+        first_name='Student',
+        last_name=str(number),
+        email=f'student{number}@example.com',
+    )
+
+
+class EnrollCourseConcurrencyTest(TransactionTestCase):
+    """Many students hitting enroll_course at once must never overbook a course"""
+
+    THREADS = 16
+    SEATS = 5
+
+    def setUp(self):
+        self.course = make_course(max_seats=self.SEATS)
+        self.students = [make_student(number) for number in range(self.THREADS)]
+
+    def _hammer(self, students, repeat=1):
+        """Call enroll_course for every student at the same moment from separate threads"""
+        barrier = threading.Barrier(len(students))
+        errors = []
+
+        def worker(student):
+            client = Client()
+            url = reverse('students:enroll_course', args=[self.course.pk])
+            try:
+                client.force_login(student.user)
+                barrier.wait(timeout=30)
+                for _ in range(repeat):
+                    response = client.get(url)
+                    if response.status_code != 302:
+                        errors.append(response.status_code)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(student,)) for student in students]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_seats_are_never_oversold(self):
+        self._hammer(self.students, repeat=2)
+
+        self.course.refresh_from_db()
+        enrolled = Enrollment.objects.filter(course=self.course).exclude(completion_status='dropped')
+        self.assertEqual(enrolled.count(), self.SEATS)
+        self.assertEqual(self.course.seats_taken, self.SEATS)
+        # Everyone else is queued exactly once
+        waitlist = WaitlistEntry.objects.filter(course=self.course)
+        self.assertEqual(waitlist.count(), self.THREADS - self.SEATS)
+        self.assertFalse(waitlist.filter(student__in=enrolled.values('student')).exists())
+
+    def test_dropping_promotes_the_oldest_waitlisted_student(self):
+        self._hammer(self.students)
+        first_waiting = WaitlistEntry.objects.filter(course=self.course).first().student
+
+        enrollment = Enrollment.objects.filter(course=self.course).first()
+        enrollment.completion_status = 'dropped'
+        enrollment.save()
+
+        self.assertTrue(Enrollment.objects.filter(course=self.course, student=first_waiting).exists())
+        self.assertFalse(WaitlistEntry.objects.filter(course=self.course, student=first_waiting).exists())
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.seats_taken, self.SEATS)
+
+        # Deleting an enrollment frees its seat the same way
+        Enrollment.objects.filter(course=self.course).exclude(completion_status='dropped').first().delete()
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.seats_taken, self.SEATS)
+        self.assertEqual(WaitlistEntry.objects.filter(course=self.course).count(), self.THREADS - self.SEATS - 2)
+
+    def test_promotions_race_for_the_same_seats(self):
+        self._hammer(self.students)
+        Course.objects.filter(pk=self.course.pk).update(max_seats=self.SEATS + 3)
+
+        promoted = []
+        barrier = threading.Barrier(4)
+
+        def worker():
+            try:
+                barrier.wait(timeout=30)
+                promoted.extend(promote_from_waitlist(self.course.pk))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(promoted), 3)
+        self.assertEqual(len({enrollment.student_id for enrollment in promoted}), 3)
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.seats_taken, self.SEATS + 3)
+
+
+class BulkEnrollTest(TestCase):
+
+    def setUp(self):
+        self.course = make_course()
+        self.students = [make_student(number) for number in range(4)]
+
+    def test_new_existing_and_dropped_students(self):
+        first, second, third, fourth = self.students
+        Enrollment.objects.create(student=first, course=self.course)
+        Enrollment.objects.create(student=second, course=self.course, completion_status='dropped')
+
+        result = bulk_enroll(self.course, [first.pk, second.pk, third.pk, third.pk])
+        self.assertEqual(result, (1, 1, 1))
+        self.assertEqual(Enrollment.objects.get(student=second, course=self.course).completion_status, 'enrolled')
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.seats_taken, 3)
+
+        # A queryset of students is used as a subquery
+        result = bulk_enroll(self.course, Student.objects.filter(pk__in=[third.pk, fourth.pk]).values_list('pk', flat=True))
+        self.assertEqual(result, (1, 0, 1))
+        self.assertEqual(bulk_enroll(self.course, []), (0, 0, 0))
+
+
+class EnrollOutcomeTest(TestCase):
+
+    def setUp(self):
+        self.course = make_course(max_seats=1)
+        self.first, self.second = make_student(1), make_student(2)
+
+    def seats_taken(self):
+        self.course.refresh_from_db()
+        return self.course.seats_taken
+
+    def drop(self, student):
+        enrollment = Enrollment.objects.get(student=student, course=self.course)
+        enrollment.completion_status = 'dropped'
+        with self.captureOnCommitCallbacks(execute=True):
+            enrollment.save()
+
+    def test_enrolled_existing_full_and_waitlisted(self):
+        enrollment, outcome = enroll(self.first, self.course)
+        self.assertEqual(outcome, CREATED)
+        self.assertEqual(enroll(self.first, self.course), (enrollment, EXISTING))
+        self.assertEqual(enroll(self.second, self.course), (None, FULL))
+        self.assertEqual(enroll(self.second, self.course, waitlist=True), (None, WAITLISTED))
+        self.assertEqual(self.seats_taken(), 1)
+        self.assertFalse(Enrollment.objects.filter(student=self.second).exists())
+
+    def test_dropped_student_is_reactivated(self):
+        enroll(self.first, self.course)
+        self.drop(self.first)
+        self.assertEqual(self.seats_taken(), 0)
+
+        enrollment, outcome = enroll(self.first, self.course)
+        self.assertEqual(outcome, REACTIVATED)
+        self.assertEqual(enrollment.completion_status, 'enrolled')
+        self.assertEqual(self.seats_taken(), 1)
+
+    def test_dropping_promotes_the_waitlist(self):
+        enroll(self.first, self.course)
+        enroll(self.second, self.course, waitlist=True)
+
+        self.drop(self.first)
+        self.assertEqual(Enrollment.objects.get(student=self.second).completion_status, 'enrolled')
+        self.assertFalse(WaitlistEntry.objects.exists())
+        self.assertEqual(self.seats_taken(), 1)
+
+    def test_count_seat_on_save(self):
+        # Enrollments saved outside enroll() are counted by the post_save signal
+        enrollment = Enrollment.objects.create(student=self.first, course=self.course)
+        self.assertEqual(self.seats_taken(), 1)
+        enrollment.save()
+        self.assertEqual(self.seats_taken(), 1)
+
+        self.drop(self.first)
+        self.assertEqual(self.seats_taken(), 0)
+        enrollment = Enrollment.objects.get(pk=enrollment.pk)
+        enrollment.completion_status = 'in_progress'
+        enrollment.save()
+        self.assertEqual(self.seats_taken(), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            enrollment.delete()
+        self.assertEqual(self.seats_taken(), 0)
+
+    def test_course_form_save_keeps_seats_taken(self):
+        stale = Course.objects.get(pk=self.course.pk)
+        enroll(self.first, self.course)
+
+        form = CourseForm(
+            data={
+                'title': 'Renamed',
+                'code': stale.code,
+                'description': 'Updated outline',
+                'category': stale.category_id,
+                'instructor': stale.instructor_id,
+                'price': '0',
+                'max_seats': 2,
+                'is_published': True,
+            },
+            instance=stale,
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        with self.captureOnCommitCallbacks(execute=True):
+            form.save()
+        self.course.refresh_from_db()
+        self.assertEqual((self.course.title, self.course.seats_taken), ('Renamed', 1))
+
+
+class LessonProgressTest(TestCase):
+
+    def setUp(self):
+        self.course = make_course()
+        self.module = Module.objects.create(course=self.course, title='Basics', order=1)
+        self.lessons = [self.lesson(order) for order in range(1, 5)]
+        self.enrollment, _ = enroll(make_student(1), self.course)
+
+    def lesson(self, order, is_published=True):
+        return Lesson.objects.create(
+            module=self.module, title=f'Lesson {order}', content='', order=order, is_published=is_published
+        )
+
+    def progress(self):
+        self.enrollment.refresh_from_db()
+        return self.enrollment.completed_lessons, self.enrollment.progress, self.enrollment.completion_status
+
+    def test_completing_a_lesson_twice_counts_once(self):
+        self.assertTrue(mark_lesson_complete(self.enrollment, self.lessons[0]))
+        self.assertFalse(mark_lesson_complete(self.enrollment, self.lessons[0]))
+        self.assertEqual(self.progress(), (1, 25, 'in_progress'))
+
+        self.assertTrue(mark_lesson_incomplete(self.enrollment, self.lessons[0]))
+        self.assertFalse(mark_lesson_incomplete(self.enrollment, self.lessons[0]))
+        self.assertEqual(self.progress(), (0, 0, 'enrolled'))
+
+    def test_unpublished_lessons_do_not_count(self):
+        draft = self.lesson(5, is_published=False)
+        self.assertFalse(mark_lesson_complete(self.enrollment, draft))
+        self.assertFalse(LessonProgress.objects.exists())
+
+    def test_lesson_changes_move_the_percentage(self):
+        for lesson in self.lessons[:2]:
+            mark_lesson_complete(self.enrollment, lesson)
+        self.assertEqual(self.progress(), (2, 50, 'in_progress'))
+
+        # A fifth published lesson lowers the percentage
+        extra = self.lesson(5)
+        self.assertEqual(self.progress(), (2, 40, 'in_progress'))
+
+        # Deleting a completed lesson removes it from both sides
+        self.lessons[0].delete()
+        self.assertEqual(self.progress(), (1, 25, 'in_progress'))
+
+        # Unpublishing the rest leaves only completed lessons
+        for lesson in self.lessons[2:] + [extra]:
+            lesson.is_published = False
+            lesson.save()
+        self.assertEqual(self.progress(), (1, 100, 'completed'))
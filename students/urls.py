@@ -11,8 +11,10 @@ urlpatterns = [
     path('assignments/<int:assignment_id>/', views.assignment_detail, name='assignment_detail'),
     path('assignments/<int:assignment_id>/submit/', views.submit_assignment, name='submit_assignment'),
     path('materials/', views.materials, name='materials'),
+    path('materials/<int:material_id>/download/', views.material_download, name='material_download'),
     path('videos/', views.videos, name='videos'),
     path('videos/<int:video_id>/', views.video_detail, name='video_detail'),
+    path('videos/<int:video_id>/stream/', views.video_stream, name='video_stream'),
     path('schedule/', views.schedule, name='schedule'),
     path('messages/', views.messages_view, name='messages'),
     path('settings/', views.settings, name='settings'),
@@ -1,46 +1,88 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.paginator import Paginator
-from django.db.models import Q
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q, Sum
+from django.http import Http404
+from django.urls import reverse
 from django.utils import timezone
 from courses.models import Course, Material, Video
+from courses.counters import count_once_per_session, material_downloads, video_views
+from courses.streaming import serve_file
 from students.models import Student, Enrollment, AssignmentSubmission, Assignment, Attendance
-from instructors.models import Instructor, ScheduleEvent
+from students.enrollments import EXISTING, WAITLISTED, enroll, waitlist_position
+from students.feed import get_course_ids, student_events, student_materials, student_videos, whats_new
+from instructors.models import Instructor
+from instructors.ical import feed_token
+from instructors.scheduling import expand, schedule_window
+
+# Async views render through this so lazy template lookups (request.user,
+# messages, related objects) run on the sync thread instead of the event loop
+arender = sync_to_async(render)
+
+
+async def _get_student(request):
+    """Return the logged-in user's student profile, or None, without blocking the event loop"""
+    user = await request.auser()
+    return await Student.objects.filter(user=user).afirst()
+
+
+async def _alist(queryset):
+    return [obj async for obj in queryset]
+
+
+async def _apage(queryset, per_page, number):
+    """Paginator.get_page() for async views"""
+    paginator = Paginator(queryset, per_page)
+    # Prime the cached count so get_page() does not query synchronously
+    paginator.count = await queryset.acount()
+    page_obj = paginator.get_page(number)
+    page_obj.object_list = await _alist(page_obj.object_list)
+    return page_obj
+
+
+async def _average_grade(student):
+    totals = await AssignmentSubmission.objects.filter(student=student, is_graded=True).aaggregate(
+        points=Sum('grade'),
+        max_points=Sum('assignment__max_points'),
+    )
+    if not totals['max_points']:
+        return 0
+    return (totals['points'] or 0) / totals['max_points'] * 100
+
 
 @login_required
-def dashboard(request):
+async def dashboard(request):
     # Get the student associated with the logged-in user
-    try:
-        student = request.user.student
-    except Student.DoesNotExist:
-        student = None
+    student = await _get_student(request)
     
     if student:
-        # Get key metrics
-        total_enrollments = Enrollment.objects.filter(student=student).count()
-        completed_courses = Enrollment.objects.filter(student=student, completion_status='completed').count()
-        
-        # Get pending assignments
-        pending_assignments = Assignment.objects.filter(
-            course__enrollments__student=student,
-            submissions__isnull=True
-        ).count()
-        
-        # Calculate average grade
-        submissions = AssignmentSubmission.objects.filter(student=student, is_graded=True)
-        if submissions.exists():
-            total_points = sum([sub.grade for sub in submissions if sub.grade])
-            max_points = sum([sub.assignment.max_points for sub in submissions if sub.assignment.max_points])
-            if max_points > 0:
-                average_grade = (total_points / max_points) * 100
-            else:
-                average_grade = 0
-        else:
-            average_grade = 0
+        enrollments = Enrollment.objects.filter(student=student)
         
-        # Get recent enrollments
-        recent_enrollments = Enrollment.objects.filter(student=student).select_related('course__instructor').order_by('-enrollment_date')[:5]
+        # The metrics are independent queries, so wait for them together
+        (
+            total_enrollments,
+            completed_courses,
+            pending_assignments,
+            average_grade,
+            recent_enrollments,
+            feed,
+        ) = await asyncio.gather(
+            enrollments.acount(),
+            enrollments.filter(completion_status='completed').acount(),
+            Assignment.objects.filter(
+                course__enrollments__student=student,
+                submissions__isnull=True
+            ).acount(),
+            _average_grade(student),
+            _alist(enrollments.select_related('course__instructor').order_by('-enrollment_date')[:5]),
+            # Newest content across the student's courses
+            sync_to_async(whats_new)(student),
+        )
         
         context = {
             'student': student,
@@ -49,36 +91,36 @@ def dashboard(request):
             'pending_assignments': pending_assignments,
             'average_grade': round(average_grade, 1),
             'recent_enrollments': recent_enrollments,
+            'feed': feed,
         }
     else:
         context = {
             'student': student,
         }
     
-    return render(request, 'students/dashboard.html', context)
+    return await arender(request, 'students/dashboard.html', context)
 
 
 @login_required
-def my_courses(request):
+async def my_courses(request):
     # Get the student associated with the logged-in user
-    try:
-        student = request.user.student
-    except Student.DoesNotExist:
+    student = await _get_student(request)
+    if student is None:
         messages.error(request, 'Student profile not found.')
         return redirect('students:dashboard')
     
     # Get enrollments for this student
-    enrollments = Enrollment.objects.filter(student=student).select_related('course__category', 'course__instructor')
+    enrollments = Enrollment.objects.filter(student=student).select_related(
+        'course__category', 'course__instructor'
+    ).order_by('-enrollment_date', '-id')
     
-    paginator = Paginator(enrollments, 6)  # Show 6 enrollments per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = await _apage(enrollments, 6, request.GET.get('page'))  # Show 6 enrollments per page
     
     context = {
         'student': student,
         'page_obj': page_obj,
     }
-    return render(request, 'students/my_courses.html', context)
+    return await arender(request, 'students/my_courses.html', context)
 
 
 @login_required
@@ -93,55 +135,49 @@ def enroll_course(request, course_id):
     # Get the course
     course = get_object_or_404(Course, id=course_id, is_published=True)
     
-    # Check if already enrolled
-    if Enrollment.objects.filter(student=student, course=course).exists():
+    # Insert first and let the unique constraint catch repeated clicks
+    enrollment, outcome = enroll(student, course, waitlist=True)
+    if outcome == EXISTING:
         messages.info(request, 'You are already enrolled in this course.')
-        return redirect('courses:course_detail', course_id=course.id)
-    
-    # Create enrollment
-    Enrollment.objects.create(
-        student=student,
-        course=course,
-        completion_status='enrolled',
-        progress=0
-    )
-    
-    messages.success(request, f'You have been successfully enrolled in "{course.title}".')
+    elif outcome == WAITLISTED:
+        position = waitlist_position(student, course)
+        messages.info(
+            request,
+            f'"{course.title}" is full. You are number {position} on the waitlist and will be '
+            'enrolled automatically when a seat opens up.'
+        )
+    else:
+        messages.success(request, f'You have been successfully enrolled in "{course.title}".')
     return redirect('courses:course_detail', course_id=course.id)
 
 
 @login_required
-def assignments(request):
+async def assignments(request):
     # Get the student associated with the logged-in user
-    try:
-        student = request.user.student
-    except Student.DoesNotExist:
+    student = await _get_student(request)
+    if student is None:
         messages.error(request, 'Student profile not found.')
         return redirect('students:dashboard')
     
-    # Get assignments for courses the student is enrolled in
-    assignments = Assignment.objects.filter(
-        course__enrollments__student=student
-    ).select_related('course').order_by('due_date')
+    # Get assignments for courses the student is enrolled in, and the student's submissions
+    assignments, submissions = await asyncio.gather(
+        _alist(Assignment.objects.filter(
+            course__enrollments__student=student
+        ).select_related('course').order_by('due_date')),
+        _alist(AssignmentSubmission.objects.filter(student=student)),
+    )
+    submissions = {submission.assignment_id: submission for submission in submissions}
     
     # Add submission status to each assignment
     for assignment in assignments:
-        try:
-            submission = AssignmentSubmission.objects.get(
-                assignment=assignment,
-                student=student
-            )
-            assignment.submission_status = 'submitted'
-            assignment.submission = submission
-        except AssignmentSubmission.DoesNotExist:
-            assignment.submission_status = 'not_submitted'
-            assignment.submission = None
+        assignment.submission = submissions.get(assignment.id)
+        assignment.submission_status = 'submitted' if assignment.submission else 'not_submitted'
     
     context = {
         'student': student,
         'assignments': assignments,
     }
-    return render(request, 'students/assignments.html', context)
+    return await arender(request, 'students/assignments.html', context)
 
 
 @login_required
@@ -235,53 +271,39 @@ def submit_assignment(request, assignment_id):
 
 
 @login_required
-def materials(request):
+async def materials(request):
     # Get the student associated with the logged-in user
-    try:
-        student = request.user.student
-    except Student.DoesNotExist:
+    student = await _get_student(request)
+    if student is None:
         messages.error(request, 'Student profile not found.')
         return redirect('students:dashboard')
     
     # Get materials for courses the student is enrolled in
-    enrollments = Enrollment.objects.filter(student=student).select_related('course')
-    course_ids = [enrollment.course.id for enrollment in enrollments]
-    materials = Material.objects.filter(course_id__in=course_ids).select_related('course').order_by('-created_at')
-    
-    paginator = Paginator(materials, 10)  # Show 10 materials per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = await _apage(student_materials(student), 10, request.GET.get('page'))  # Show 10 materials per page
     
     context = {
         'student': student,
         'page_obj': page_obj,
     }
-    return render(request, 'students/materials.html', context)
+    return await arender(request, 'students/materials.html', context)
 
 
 @login_required
-def videos(request):
+async def videos(request):
     # Get the student associated with the logged-in user
-    try:
-        student = request.user.student
-    except Student.DoesNotExist:
+    student = await _get_student(request)
+    if student is None:
         messages.error(request, 'Student profile not found.')
         return redirect('students:dashboard')
     
     # Get videos for courses the student is enrolled in
-    enrollments = Enrollment.objects.filter(student=student).select_related('course')
-    course_ids = [enrollment.course.id for enrollment in enrollments]
-    videos = Video.objects.filter(course_id__in=course_ids).select_related('course').order_by('-created_at')
-    
-    paginator = Paginator(videos, 10)  # Show 10 videos per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = await _apage(student_videos(student), 10, request.GET.get('page'))  # Show 10 videos per page
     
     context = {
         'student': student,
         'page_obj': page_obj,
     }
-    return render(request, 'students/videos.html', context)
+    return await arender(request, 'students/videos.html', context)
 
 
 @login_required
@@ -294,9 +316,12 @@ def video_detail(request, video_id):
         return redirect('students:dashboard')
     
     # Get the video (must be for a course the student is enrolled in)
-    enrollments = Enrollment.objects.filter(student=student).select_related('course')
-    course_ids = [enrollment.course.id for enrollment in enrollments]
-    video = get_object_or_404(Video, id=video_id, course_id__in=course_ids)
+    video = get_object_or_404(Video.objects.select_related('course'), id=video_id, is_active=True)
+    if video.course_id not in get_course_ids(student):
+        raise Http404('No video matches the given query.')
+    
+    # Count the view; reloads within the same session are not counted again
+    count_once_per_session(request, video_views, video.id)
     
     context = {
         'student': student,
@@ -305,6 +330,58 @@ def video_detail(request, video_id):
     return render(request, 'students/video_detail.html', context)
 
 
+def _has_course_access(user, course):
+    """Enrolled students, the course instructor and staff may access course files"""
+    if user.is_staff:
+        return True
+    try:
+        student = user.student
+    except Student.DoesNotExist:
+        student = None
+    if student is not None and course.id in get_course_ids(student):
+        return True
+    return Instructor.objects.filter(user=user, id=course.instructor_id).exists()
+
+
+@login_required
+def video_stream(request, video_id):
+    """Stream an uploaded video file with HTTP range support"""
+    video = get_object_or_404(Video.objects.select_related('course'), id=video_id)
+    if not video.video_file:
+        raise Http404('This video has no uploaded file.')
+    
+    if not _has_course_access(request.user, video.course):
+        raise PermissionDenied
+    
+    return serve_file(request, video, video.video_file)
+
+
+@login_required
+def material_download(request, material_id):
+    """Serve a course material to users who may access its course"""
+    materials = Material.objects.select_related('course')
+    if not request.user.is_staff:
+        materials = materials.filter(is_active=True)
+    material = get_object_or_404(materials, id=material_id)
+    if not material.file:
+        raise Http404('This material has no file.')
+    
+    if not _has_course_access(request.user, material.course):
+        raise PermissionDenied
+    
+    response = serve_file(
+        request,
+        material,
+        material.file,
+        as_attachment=not request.GET.get('inline'),
+    )
+    
+    # Only complete transfers count; range requests and 304s do not
+    if response.status_code == 200:
+        material_downloads.increment(material.id)
+    return response
+
+
 @login_required
 def schedule(request):
     # Get the student associated with the logged-in user
@@ -314,14 +391,15 @@ def schedule(request):
         messages.error(request, 'Student profile not found.')
         return redirect('students:dashboard')
     
-    # Get schedule events for courses the student is enrolled in
-    enrollments = Enrollment.objects.filter(student=student).select_related('course')
-    course_ids = [enrollment.course.id for enrollment in enrollments]
-    events = ScheduleEvent.objects.filter(course_id__in=course_ids).select_related('course', 'instructor').order_by('start_time')
+    # Get schedule events in the requested week or month for courses the student is enrolled in
+    window = schedule_window(request)
+    events = expand(student_events(student), window['start'], window['end'])
     
     context = {
         'student': student,
         'events': events,
+        'window': window,
+        'feed_url': request.build_absolute_uri(reverse('instructors:calendar_feed', args=[feed_token(request.user)])),
     }
     return render(request, 'students/schedule.html', context)
 